@@ -0,0 +1,85 @@
+"""
+ALS factor storage precision (src/recommender/quantize.py): float32 vs float16 vs int8 + per-row scales. For each
+mode, reports:
+- factor memory, and how many users fit a --pod-budget-mb factor budget next to the resident item side (stored
+  factors plus the float32 scoring copy that reduced-precision modes keep);
+- top-k scoring throughput of ALSRecommender.recommend_batch over --score-users users;
+- top-k overlap with the float32 lists (|top_q ∩ top_f32| / k, and the share of identical first items).
+
+Factors are synthetic but ALS-like: users and items are drawn around shared latent "taste" clusters, so scores
+have a real spread instead of random ties.
+
+    PYTHONPATH=. python benchmarks/bench_als_quantization.py --users 1e6 --items 5e4 --factors 64
+"""
+import argparse
+
+import numpy as np
+
+from benchmarks.harness import emit, timed
+from src.recommender.quantize import FACTOR_DTYPES
+from src.recommender.train_als import ALSRecommender
+
+
+def make_factors(n_users: int, n_items: int, factors: int, clusters: int, seed: int):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, factors), dtype=np.float32)
+
+    def around(n, spread):
+        out = centers[rng.integers(0, clusters, n)]
+        out += spread * rng.standard_normal((n, factors), dtype=np.float32)
+        # per-row norms vary like trained factors (heavy users / popular items are longer)
+        out *= rng.lognormal(0.0, 0.5, (n, 1)).astype(np.float32)
+        return out / np.sqrt(factors)
+    return around(n_users, 0.7), around(n_items, 0.7)
+
+
+def overlap(a: np.ndarray, b: np.ndarray) -> float:
+    k = a.shape[1]
+    return float((np.sort(a, axis=1)[:, :, None] == np.sort(b, axis=1)[:, None, :]).any(axis=2).sum() / a.size) if k else 1.0
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--users", type=float, default=1e6)
+    ap.add_argument("--items", type=float, default=5e4)
+    ap.add_argument("--factors", type=int, default=64)
+    ap.add_argument("--clusters", type=int, default=50)
+    ap.add_argument("--k", type=int, default=10)
+    ap.add_argument("--score-users", type=int, default=20_000)
+    ap.add_argument("--pod-budget-mb", type=float, default=1024)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--out", help="append JSON result rows to this file")
+    args = ap.parse_args()
+
+    n_users, n_items = int(args.users), int(args.items)
+    users, items = make_factors(n_users, n_items, args.factors, args.clusters, args.seed)
+    user_index = {f"c{i}": i for i in range(n_users)}
+    item_index = {f"p{i}": i for i in range(n_items)}
+    sample = [f"c{i}" for i in np.random.default_rng(args.seed).choice(n_users, min(args.score_users, n_users),
+                                                                       replace=False)]
+    reference = None
+    for dtype in FACTOR_DTYPES:
+        rec = ALSRecommender(users, items, user_index, item_index, factor_dtype=dtype)
+        arrays = [a for a in (rec.user_factors, rec.user_scales) if a is not None]
+        user_mb = sum(a.nbytes for a in arrays) / 2**20
+        item_mb = sum(a.nbytes for a in (rec.item_factors, rec.item_scales) if a is not None) / 2**20
+        # one full chunk untimed: caches the dequantized item side and warms the allocator for the score buffers
+        rec.recommend_batch(sample[:4096], args.k)
+        (top, _), stats = timed(rec.recommend_batch, sample, args.k)
+        reference = top if reference is None else reference
+        bytes_per_user = user_mb * 2**20 / n_users
+        scoring_mb = rec.item_matrix().nbytes / 2**20
+        item_resident_mb = item_mb + (scoring_mb if dtype != "float32" else 0.0)
+        emit({"factor_dtype": dtype, "users": n_users, "items": n_items, "factors": args.factors,
+              "user_factor_mb": round(user_mb, 1), "item_factor_mb": round(item_mb, 1),
+              "item_resident_mb": round(item_resident_mb, 1),
+              "saved_vs_float32": round(1 - bytes_per_user / (4 * args.factors), 3),
+              "users_in_budget": int(max(args.pod_budget_mb - item_resident_mb, 0) * 2**20 / bytes_per_user),
+              "users_per_s": round(len(sample) / stats["wall_s"]),
+              f"overlap_at_{args.k}": round(overlap(top, reference), 4),
+              "same_top1": round(float((top[:, 0] == reference[:, 0]).mean()), 4)}, args.out)
+        del rec
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Bulk CLV scoring through the API: per-record JSON requests to `POST /score/clv` vs one Arrow IPC request to
+`POST /score/clv/bulk` (src/api/bulk.py), in-process over ASGI so only encoding, validation and inference count.
+The router holds the rf model and its flattened form, as in production. JSON is measured up to --json-max-rows
+records (with --concurrency requests in flight) and extrapolated beyond that from its measured rate.
+
+    PYTHONPATH=.:src python benchmarks/bench_bulk_scoring.py --rows 1e4 1e6
+"""
+import argparse
+import asyncio
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_estimators import build_tasks
+from benchmarks.harness import emit
+
+
+def sample_rows(X: pd.DataFrame, n: int, seed: int) -> pd.DataFrame:
+    rows = X.sample(n, replace=len(X) < n, random_state=seed).reset_index(drop=True)
+    return rows.assign(customer_id=[f"c{i}" for i in range(n)])
+
+
+async def json_path(client, rows: pd.DataFrame, features: list[str], concurrency: int) -> float:
+    records = rows[features].to_dict("records")
+    ids = rows["customer_id"].tolist()
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(cid, feats):
+        async with sem:
+            r = await client.post("/score/clv/", json={"customer_id": cid, "features": feats})
+            r.raise_for_status()
+            return r.json()["clv_180d"]
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(c, f) for c, f in zip(ids, records)))
+    return time.perf_counter() - t0
+
+
+async def arrow_path(client, rows: pd.DataFrame, features: list[str]) -> tuple[float, float]:
+    import pyarrow as pa
+    from api.bulk import ARROW_STREAM
+    t0 = time.perf_counter()
+    table = pa.Table.from_pandas(rows[["customer_id"] + features], preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    t1 = time.perf_counter()
+    r = await client.post("/score/clv/bulk", content=sink.getvalue().to_pybytes(),
+                          headers={"content-type": ARROW_STREAM, "accept": ARROW_STREAM})
+    r.raise_for_status()
+    scores = pa.ipc.open_stream(pa.BufferReader(r.content)).read_all()
+    assert scores.num_rows == len(rows)
+    return time.perf_counter() - t0, time.perf_counter() - t1
+
+
+async def run(args):
+    import httpx
+    from fastapi import FastAPI
+    from api.routers import clv
+    from common.estimators import make_estimator
+    from common.schemas import CLV_FEATURES
+    from common.tree_runtime import FlatEnsemble
+
+    X, y = build_tasks(int(args.transactions), args.seed)["regression"]
+    model = make_estimator("regression", "rf").fit(X, y)
+    clv._model, clv._flat, clv._run_id = model, FlatEnsemble.from_sklearn(model, CLV_FEATURES), None
+    app = FastAPI()
+    app.include_router(clv.router, prefix="/score/clv")
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=None) as client:
+        for n in (int(r) for r in args.rows):
+            rows = sample_rows(X, n, args.seed)
+            arrow_s, server_s = await arrow_path(client, rows, CLV_FEATURES)
+            emit({"format": "arrow", "rows": n, "seconds": round(arrow_s, 3), "request_s": round(server_s, 3),
+                  "rows_per_s": round(n / arrow_s)}, args.out)
+            measured = min(n, int(args.json_max_rows))
+            json_s = await json_path(client, rows.iloc[:measured], CLV_FEATURES, args.concurrency)
+            emit({"format": "json", "rows": n, "measured_rows": measured,
+                  "seconds": round(json_s * n / measured, 3), "rows_per_s": round(measured / json_s),
+                  "arrow_speedup": round(json_s * n / measured / arrow_s, 1)}, args.out)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--rows", type=float, nargs="+", default=[1e4, 1e6])
+    ap.add_argument("--json-max-rows", type=float, default=1e4)
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--transactions", type=float, default=1e6, help="synthetic rows for training the rf model")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--out", help="append JSON result rows to this file")
+    args = ap.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
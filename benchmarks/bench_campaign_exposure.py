@@ -0,0 +1,59 @@
+"""
+Campaign exposure attribution: pandas merge on channel + window filter (every event x every campaign of its channel)
+vs the searchsorted interval join of src/campaign_response/exposure.py streaming events in chunks. Both run in-process
+on synthetic events generated chunk by chunk, so generation is part of the streamed timing; the pandas baseline is
+only run up to --merge-max-rows events (it materialises the whole join) and checked against the interval join.
+
+    PYTHONPATH=. python benchmarks/bench_campaign_exposure.py --events 1e6 1e7 1e8
+"""
+import argparse
+
+import pandas as pd
+
+from benchmarks.harness import emit, timed
+from src.campaign_response.exposure import exposure_counts
+from src.common.synthetic import generate_campaigns, generate_customers, iter_events, scale_config
+
+
+def merge_baseline(customers: pd.DataFrame, campaigns: pd.DataFrame, events: pd.DataFrame) -> pd.DataFrame:
+    m = (events.merge(customers[["customer_id", "acquisition_channel"]], on="customer_id")
+         .merge(campaigns, left_on="acquisition_channel", right_on="channel"))
+    ts = pd.to_datetime(m["timestamp"])
+    m = m[(ts >= m["start_date"]) & (ts < m["end_date"] + pd.Timedelta(days=1))]
+    m = m.assign(is_purchase=(m["event_type"] == "purchase").astype(int))
+    return m.groupby(["customer_id", "campaign_id"]).agg(exposures=("event_id", "count"),
+                                                         responses=("is_purchase", "sum")).reset_index()
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--events", type=float, nargs="+", default=[1e6, 1e7, 1e8])
+    ap.add_argument("--chunk-rows", type=float, default=1e6)
+    ap.add_argument("--merge-max-rows", type=float, default=1e6)
+    ap.add_argument("--campaigns", type=int, default=200)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--out", help="append JSON result rows to this file")
+    args = ap.parse_args()
+
+    for n in (int(e) for e in args.events):
+        n_customers = scale_config(n // 3)["n_customers"]
+        customers = generate_customers(n_customers, args.seed)
+        campaigns = generate_campaigns(args.campaigns, args.seed)
+        chunks = iter_events(n, n_customers, chunk_rows=int(args.chunk_rows), seed=args.seed)
+        got, stats = timed(exposure_counts, customers, campaigns, chunks)
+        emit({"method": "interval_join", "events": n, "customers": n_customers, "pairs": len(got),
+              "events_per_s": round(n / stats["wall_s"]), **stats}, args.out)
+        if n > args.merge_max_rows:
+            continue
+        events = pd.concat(iter_events(n, n_customers, chunk_rows=int(args.chunk_rows), seed=args.seed),
+                           ignore_index=True)
+        ref, stats = timed(merge_baseline, customers, campaigns, events)
+        del events
+        key = ["customer_id", "campaign_id"]
+        same = got.sort_values(key).reset_index(drop=True).equals(ref.sort_values(key).reset_index(drop=True)[got.columns])
+        emit({"method": "pandas_merge", "events": n, "customers": n_customers, "pairs": len(ref),
+              "matches_interval_join": same, "events_per_s": round(n / stats["wall_s"]), **stats}, args.out)
+
+
+if __name__ == "__main__":
+    main()
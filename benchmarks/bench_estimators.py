@@ -0,0 +1,101 @@
+"""
+Side-by-side comparison of the estimator backends in src/common/estimators.py on the CLV (regression)
+and campaign propensity (classification) gold tables built from synthetic data:
+fit time, pickled artifact size, load time, single-row and batch predict latency, and accuracy.
+
+    PYTHONPATH=. python benchmarks/bench_estimators.py --transactions 1e6 --backends rf hist_gbm lightgbm xgboost
+"""
+import argparse
+import pickle
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.harness import emit, latency_stats
+from src.common.estimators import BACKENDS, make_estimator
+from src.common.features import build_clv_feature_table, campaign_features
+from src.common.schemas import CLV_FEATURES, CAMPAIGN_FEATURES
+from src.common.synthetic import generate_raw_tables, scale_config
+
+
+def build_tasks(n_transactions: int, seed: int) -> dict:
+    cfg = scale_config(n_transactions)
+    raw = generate_raw_tables(seed=seed, **cfg)
+    clv = build_clv_feature_table(raw["customers"], raw["transactions"], raw["products"], raw["events"])
+    camp = campaign_features(raw["customers"], raw["campaigns"], raw["events"])
+    # same targets/labels as prefect_flows/train_flow.py and src/campaign_response/train.py
+    return {
+        "regression": (clv[CLV_FEATURES].fillna(0.0), clv["clv_180d"].astype(float)),
+        "classification": (camp[CAMPAIGN_FEATURES].fillna(0.0), (camp["events_purchase_count"] > 0).astype(int)),
+    }
+
+
+def accuracy(task: str, model, X_test, y_test) -> dict:
+    from sklearn.metrics import mean_absolute_percentage_error, roc_auc_score
+    if task == "regression":
+        return {"mape": round(float(mean_absolute_percentage_error(y_test, model.predict(X_test))), 5)}
+    if y_test.nunique() < 2:
+        return {"auc": None}
+    return {"auc": round(float(roc_auc_score(y_test, model.predict_proba(X_test)[:, 1])), 5)}
+
+
+def bench(task: str, backend: str, X: pd.DataFrame, y: pd.Series, batch_rows: int, repeat: int) -> dict:
+    from sklearn.model_selection import train_test_split
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    model = make_estimator(task, backend)
+
+    t0 = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_s = time.perf_counter() - t0
+
+    blob = pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL)
+    t0 = time.perf_counter()
+    loaded = pickle.loads(blob)
+    load_s = time.perf_counter() - t0
+
+    predict = loaded.predict_proba if task == "classification" else loaded.predict
+    row = X_test.iloc[:1]
+    batch = X_test.sample(batch_rows, replace=len(X_test) < batch_rows, random_state=0)
+    single = latency_stats(lambda: predict(row), repeat=repeat)
+    t0 = time.perf_counter()
+    predict(batch)
+    batch_s = time.perf_counter() - t0
+
+    return {
+        "fit_s": round(fit_s, 3),
+        "artifact_mb": round(len(blob) / 1e6, 3),
+        "load_ms": round(load_s * 1000, 2),
+        "single_row_p50_ms": single["p50_ms"],
+        "single_row_p99_ms": single["p99_ms"],
+        "batch_rows": batch_rows,
+        "batch_ms": round(batch_s * 1000, 2),
+        "batch_us_per_row": round(batch_s * 1e6 / batch_rows, 3),
+        **accuracy(task, loaded, X_test, y_test),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--transactions", type=float, default=1e6, help="synthetic transaction rows (sets customer count)")
+    ap.add_argument("--backends", nargs="+", default=["rf", "hist_gbm", "lightgbm", "xgboost"])
+    ap.add_argument("--batch-rows", type=int, default=10_000)
+    ap.add_argument("--repeat", type=int, default=200, help="single-row predict calls per backend")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--out", help="append JSON result rows to this file")
+    args = ap.parse_args()
+
+    tasks = build_tasks(int(args.transactions), args.seed)
+    for task, (X, y) in tasks.items():
+        for backend in args.backends:
+            if backend not in BACKENDS[task]:
+                continue
+            try:
+                res = bench(task, backend, X, y, args.batch_rows, args.repeat)
+            except ImportError as ex:
+                res = {"skipped": str(ex)}
+            emit({"task": task, "backend": backend, "rows": len(X), **res}, args.out)
+
+
+if __name__ == "__main__":
+    main()
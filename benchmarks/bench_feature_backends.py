@@ -0,0 +1,131 @@
+"""
+CLV feature build on history larger than memory: the pandas builders (src/common/features.py) vs the out-of-core
+DuckDB backend (src/common/features_duckdb.py). Synthetic bronze tables are streamed to parquet at --ratios x the
+memory budget, measured as the in-memory pandas footprint of transactions + events. Each backend runs in a fresh
+process:
+- DuckDB gets memory_limit = budget and spills to --spill-dir.
+- pandas runs under an address-space limit of budget on top of its import baseline. "oom" means the in-memory path
+  would not fit on a machine with that much RAM.
+When both finish, their gold tables are compared. The budget defaults to MemAvailable.
+
+    PYTHONPATH=. python benchmarks/bench_feature_backends.py --memory-mb 1024 --ratios 2 10
+"""
+import argparse
+import multiprocessing as mp
+import shutil
+import threading
+from pathlib import Path
+
+from benchmarks.harness import emit, timed
+from src.common.synthetic import iter_events, iter_transactions, scale_config, write_raw_tables
+
+EVENTS_PER_TX = 3.0
+
+
+def mem_available_mb() -> float:
+    with open("/proc/meminfo") as f:
+        for line in f:
+            if line.startswith("MemAvailable:"):
+                return int(line.split()[1]) / 1e3
+    raise RuntimeError("MemAvailable not in /proc/meminfo")
+
+
+def bytes_per_row(sample_rows: int = 100_000) -> tuple[float, float]:
+    tx = next(iter_transactions(sample_rows, 1_000, 100, chunk_rows=sample_rows))
+    ev = next(iter_events(sample_rows, 1_000, chunk_rows=sample_rows))
+    return (tx.memory_usage(deep=True).sum() / sample_rows, ev.memory_usage(deep=True).sum() / sample_rows)
+
+
+def dir_mb(path: Path) -> float:
+    return sum(p.stat().st_size for p in path.rglob("*") if p.is_file()) / 1e6 if path.exists() else 0.0
+
+
+def _child(backend: str, data_dir: str, out_path: str, budget_mb: int, spill_dir: str, conn):
+    import resource
+    import pandas as pd
+    from src.common import features, features_duckdb
+    data = Path(data_dir)
+    customers, products = pd.read_parquet(data / "customers.parquet"), pd.read_parquet(data / "products.parquet")
+    try:
+        if backend == "duckdb":
+            con = features_duckdb.connect(memory_limit=f"{budget_mb}MB", temp_dir=spill_dir)
+            spill, peak_spill, done = Path(spill_dir), [0.0], threading.Event()
+
+            def watch():
+                while not done.wait(0.5):
+                    peak_spill[0] = max(peak_spill[0], dir_mb(spill))
+            threading.Thread(target=watch, daemon=True).start()
+            feats, stats = timed(features_duckdb.build_clv_feature_table, customers, data / "transactions.parquet",
+                                 products, data / "events.parquet", con=con)
+            done.set()
+            stats["peak_spill_mb"] = round(peak_spill[0], 1)
+        else:
+            with open("/proc/self/status") as f:
+                vm = next(int(l.split()[1]) * 1024 for l in f if l.startswith("VmSize:"))
+            resource.setrlimit(resource.RLIMIT_AS, (vm + budget_mb * 2**20, resource.RLIM_INFINITY))
+
+            def build():
+                return features.build_clv_feature_table(customers, pd.read_parquet(data / "transactions.parquet"),
+                                                        products, pd.read_parquet(data / "events.parquet"))
+            feats, stats = timed(build)
+        feats.to_parquet(out_path, index=False)
+        conn.send({"status": "ok", "rows_out": len(feats), **stats})
+    except MemoryError:
+        conn.send({"status": "oom"})
+    except Exception as ex:
+        conn.send({"status": "error", "error": f"{type(ex).__name__}: {ex}"[:200]})
+
+
+def run_backend(backend: str, data_dir: Path, out_path: Path, budget_mb: int, spill_dir: Path) -> dict:
+    ctx = mp.get_context("spawn")
+    recv, send = ctx.Pipe(duplex=False)
+    proc = ctx.Process(target=_child, args=(backend, str(data_dir), str(out_path), budget_mb, str(spill_dir), send))
+    proc.start()
+    proc.join()
+    shutil.rmtree(spill_dir, ignore_errors=True)
+    # killed by the kernel OOM killer / signal before it could report
+    return recv.recv() if recv.poll() else {"status": "oom" if proc.exitcode == -9 else f"exit {proc.exitcode}"}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--memory-mb", type=int, help="memory budget (default: MemAvailable)")
+    ap.add_argument("--ratios", type=float, nargs="+", default=[2, 10], help="history size / memory budget")
+    ap.add_argument("--data-dir", default="/tmp/shopsphere_bench/feature_backends")
+    ap.add_argument("--spill-dir", default="/tmp/shopsphere_bench/duckdb_spill")
+    ap.add_argument("--backends", nargs="+", default=["duckdb", "pandas"])
+    ap.add_argument("--keep-data", action="store_true")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--out", help="append JSON result rows to this file")
+    args = ap.parse_args()
+
+    budget = args.memory_mb or int(mem_available_mb())
+    tx_bytes, ev_bytes = bytes_per_row()
+    for ratio in args.ratios:
+        n_tx = int(ratio * budget * 1e6 / (tx_bytes + EVENTS_PER_TX * ev_bytes))
+        cfg = scale_config(n_tx, events_per_tx=EVENTS_PER_TX)
+        data_dir = Path(args.data_dir) / f"x{ratio:g}"
+        write_raw_tables(data_dir, seed=args.seed, **cfg)
+        parquet_mb = round(dir_mb(data_dir), 1)
+        outputs = {}
+        for backend in args.backends:
+            outputs[backend] = data_dir / f"clv_features.{backend}.parquet"
+            row = run_backend(backend, data_dir, outputs[backend], budget, Path(args.spill_dir))
+            emit({"backend": backend, "ratio": ratio, "memory_mb": budget, "transactions": cfg["n_transactions"],
+                  "events": cfg["n_events"], "parquet_mb": parquet_mb, **row}, args.out)
+        done = [b for b in args.backends if outputs[b].exists()]
+        if len(done) > 1:
+            import pandas as pd
+            frames = [pd.read_parquet(outputs[b]) for b in done]
+            try:
+                pd.testing.assert_frame_equal(frames[0], frames[1], check_exact=False, rtol=1e-9)
+                same = True
+            except AssertionError:
+                same = False
+            emit({"ratio": ratio, "compared": ",".join(done), "identical": same}, args.out)
+        if not args.keep_data:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Feature-pipeline benchmark: times every feature builder and every train function in isolation
+(one fresh process per target, so peak memory is not polluted by earlier targets) on synthetic
+bronze data at several scales.
+
+    PYTHONPATH=. python benchmarks/bench_pipeline.py --scales 1e5 1e6 1e7 1e8 \
+        --data-dir /tmp/shopsphere_bench --out /tmp/shopsphere_bench/pipeline.jsonl
+
+Scale = number of transaction rows; the other tables are derived by src.common.synthetic.scale_config.
+Synthetic data is generated once per scale and reused across runs.
+"""
+import argparse
+import multiprocessing as mp
+import os
+import time
+from pathlib import Path
+
+from benchmarks.harness import emit, timed
+
+BRONZE_TABLES = ["customers", "products", "campaigns", "transactions", "events"]
+
+# name -> (bronze inputs, callable "module:attr", gold output name or None)
+FEATURE_TARGETS = {
+    "compute_rfm_from_transactions": (["transactions"], "src.common.features:compute_rfm_from_transactions", None),
+    "enrich_with_products": (["transactions", "products"], "src.common.features:enrich_with_products", None),
+    "engagement_features_from_events": (["events"], "src.common.features:engagement_features_from_events", None),
+    "join_customer_demographics": (["customers"], "src.common.features:join_customer_demographics", None),
+    "build_clv_feature_table": (["customers", "transactions", "products", "events"],
+                                "src.common.features:build_clv_feature_table", "clv_features"),
+    "segmentation_features": (["customers", "transactions"], "src.common.features:segmentation_features",
+                              "segmentation_features"),
+    "campaign_features": (["customers", "campaigns", "events"], "src.common.features:campaign_features",
+                          "campaign_features"),
+    "build_user_item_matrix": (["transactions"], "src.common.features:build_user_item_matrix", "user_item"),
+    "pricing_features": (["transactions", "products"], "src.common.features:pricing_features", "pricing_features"),
+}
+
+# name -> gold input the train function reads
+TRAIN_TARGETS = {
+    "train_clv": "clv_features",
+    "train_campaign_classifier": "campaign_features",
+    "train_pricing": "pricing_features",
+    "train_kmeans": "segmentation_features",
+    "train_implicit_als": "user_item",
+}
+
+
+def _resolve(spec: str):
+    import importlib
+    mod, attr = spec.split(":")
+    return getattr(importlib.import_module(mod), attr)
+
+
+def _train_callable(name: str, gold_path: str):
+    if name == "train_clv":
+        import pandas as pd
+        from prefect_flows import train_flow
+        train_flow.set_mlflow.fn()
+        df = pd.read_parquet(gold_path)
+        return lambda: train_flow.train_and_register.fn(df), len(df)
+    if name == "train_campaign_classifier":
+        from src.campaign_response.train import train_campaign_classifier
+        return lambda: train_campaign_classifier(gold_path), None
+    if name == "train_pricing":
+        from src.pricing.train import train_pricing
+        return lambda: train_pricing(gold_path), None
+    if name == "train_kmeans":
+        from src.segmentation.train import train_kmeans
+        return lambda: train_kmeans(gold_path, k=6), None
+    if name == "train_implicit_als":
+        from src.recommender.train_als import train_implicit_als
+        return lambda: train_implicit_als(gold_path), None
+    raise KeyError(name)
+
+
+def _child(kind: str, name: str, scale_dir: str, conn):
+    try:
+        import pandas as pd
+        bronze, gold = Path(scale_dir) / "bronze", Path(scale_dir) / "gold"
+        if kind == "feature":
+            inputs, spec, out_name = FEATURE_TARGETS[name]
+            t0 = time.perf_counter()
+            args = [pd.read_parquet(bronze / f"{t}.parquet") for t in inputs]
+            load_s = time.perf_counter() - t0
+            rows_in = sum(len(a) for a in args)
+            out, stats = timed(_resolve(spec), *args)
+            if out_name:
+                gold.mkdir(parents=True, exist_ok=True)
+                out.to_parquet(gold / f"{out_name}.parquet", index=False)
+            rows_out = len(out)
+        else:
+            gold_path = gold / f"{TRAIN_TARGETS[name]}.parquet"
+            t0 = time.perf_counter()
+            fn, rows_in = _train_callable(name, str(gold_path))
+            load_s = time.perf_counter() - t0
+            rows_in = rows_in if rows_in is not None else pd.read_parquet(gold_path, columns=[]).shape[0]
+            _, stats = timed(fn)
+            rows_out = None
+        conn.send({"load_s": round(load_s, 4), "rows_in": rows_in, "rows_out": rows_out, **stats})
+    except Exception as ex:  # report and keep benchmarking the other targets
+        conn.send({"error": f"{type(ex).__name__}: {ex}"})
+    finally:
+        conn.close()
+
+
+def run_isolated(kind: str, name: str, scale_dir: Path) -> dict:
+    ctx = mp.get_context("spawn")
+    parent, child = ctx.Pipe(duplex=False)
+    p = ctx.Process(target=_child, args=(kind, name, str(scale_dir), child))
+    p.start()
+    child.close()
+    try:
+        res = parent.recv()
+    except EOFError:
+        res = {"error": "worker died (likely OOM)"}
+    p.join()
+    return res
+
+
+def ensure_data(scale: int, scale_dir: Path, customer_alpha: float, item_alpha: float, seed: int) -> dict:
+    from src.common.synthetic import scale_config, write_raw_tables
+    cfg = scale_config(scale)
+    bronze = scale_dir / "bronze"
+    if not all((bronze / f"{t}.parquet").exists() for t in BRONZE_TABLES):
+        t0 = time.perf_counter()
+        write_raw_tables(bronze, fmt="parquet", customer_alpha=customer_alpha, item_alpha=item_alpha, seed=seed, **cfg)
+        print(f"[bench] generated scale={scale:.0e} in {time.perf_counter() - t0:.1f}s -> {bronze}", flush=True)
+    return cfg
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--scales", nargs="+", type=float, default=[1e5, 1e6, 1e7, 1e8])
+    ap.add_argument("--data-dir", default="/tmp/shopsphere_bench")
+    ap.add_argument("--customer-alpha", type=float, default=1.1, help="power-law exponent for customer activity")
+    ap.add_argument("--item-alpha", type=float, default=1.1, help="power-law exponent for item popularity")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--only", nargs="*", help="restrict to these target names")
+    ap.add_argument("--skip-train", action="store_true")
+    ap.add_argument("--out", help="append JSON result rows to this file")
+    args = ap.parse_args()
+
+    data_dir = Path(args.data_dir)
+    # train functions log to MLflow; default to a local file store so no server is needed
+    os.environ.setdefault("MLFLOW_TRACKING_URI", f"file://{data_dir.resolve() / 'mlruns'}")
+
+    targets = [("feature", n) for n in FEATURE_TARGETS]
+    if not args.skip_train:
+        targets += [("train", n) for n in TRAIN_TARGETS]
+    if args.only:
+        targets = [t for t in targets if t[1] in args.only]
+
+    for scale in (int(s) for s in args.scales):
+        scale_dir = data_dir / f"scale_{scale}"
+        cfg = ensure_data(scale, scale_dir, args.customer_alpha, args.item_alpha, args.seed)
+        for kind, name in targets:
+            res = run_isolated(kind, name, scale_dir)
+            emit({"scale": scale, "kind": kind, "target": name, **res,
+                  "n_customers": cfg["n_customers"], "n_products": cfg["n_products"]}, args.out)
+
+
+if __name__ == "__main__":
+    main()
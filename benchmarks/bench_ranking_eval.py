@@ -0,0 +1,91 @@
+"""
+Offline ranking evaluation (src/recommender/evaluate.py) at catalogue scale: random ALS factors, --train-per-user
+training purchases and --holdout-per-user holdout purchases per user (Zipf-skewed items). The vectorised evaluation
+scores every user; the baseline is the usual per-user loop (score, mask seen items, argsort, set lookups), timed on
+--loop-users users and extrapolated. The two are checked against each other on those users.
+
+    PYTHONPATH=. python benchmarks/bench_ranking_eval.py --users 1e5 1e6 --items 20000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.harness import emit, timed
+from src.recommender.evaluate import KS, evaluate_als
+from src.recommender.train_als import ALSRecommender
+
+
+def make_data(n_users: int, n_items: int, factors: int, train_per_user: int, holdout_per_user: int, seed: int):
+    rng = np.random.default_rng(seed)
+    user_factors = rng.standard_normal((n_users, factors), dtype=np.float32) / np.sqrt(factors)
+    item_factors = rng.standard_normal((n_items, factors), dtype=np.float32)
+    rec = ALSRecommender(user_factors, item_factors, {str(u): u for u in range(n_users)},
+                         {str(i): i for i in range(n_items)})
+
+    def interactions(per_user):
+        users = np.repeat(np.arange(n_users), per_user)
+        items = (rng.zipf(1.2, len(users)) - 1) % n_items
+        return pd.DataFrame({"customer_id": users.astype(str), "product_id": items.astype(str), "strength": 1.0})
+    return rec, interactions(train_per_user), interactions(holdout_per_user)
+
+
+def loop_baseline(rec, train_ui: pd.DataFrame, holdout: pd.DataFrame, users: list[str], k: int) -> dict:
+    seen = train_ui[train_ui["customer_id"].isin(users)].groupby("customer_id")["product_id"].agg(set)
+    rel = holdout[holdout["customer_id"].isin(users)].groupby("customer_id")["product_id"].agg(set)
+    sums, n = {"precision": 0.0, "recall": 0.0, "map": 0.0, "ndcg": 0.0}, 0
+    for u in users:
+        relevant = {rec.item_index[p] for p in rel.get(u, ())} - {rec.item_index[p] for p in seen.get(u, ())}
+        if not relevant:
+            continue
+        scores = rec.user_factors[rec.user_index[u]] @ rec.item_factors.T
+        scores[[rec.item_index[p] for p in seen.get(u, ())]] = -np.inf
+        top = np.argsort(-scores, kind="stable")[:k]
+        hit = np.array([t in relevant for t in top])
+        ranks = np.arange(1, k + 1)
+        sums["precision"] += hit.sum() / k
+        sums["recall"] += hit.sum() / len(relevant)
+        sums["map"] += (np.cumsum(hit) / ranks * hit).sum() / min(len(relevant), k)
+        sums["ndcg"] += (hit / np.log2(ranks + 1)).sum() / (1 / np.log2(np.arange(2, min(len(relevant), k) + 2))).sum()
+        n += 1
+    return {key: v / n for key, v in sums.items()} | {"eval_users": n}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--users", type=float, nargs="+", default=[1e5, 1e6])
+    ap.add_argument("--items", type=int, default=20_000)
+    ap.add_argument("--factors", type=int, default=64)
+    ap.add_argument("--train-per-user", type=int, default=10)
+    ap.add_argument("--holdout-per-user", type=int, default=2)
+    ap.add_argument("--loop-users", type=int, default=2_000)
+    ap.add_argument("--workers", type=int, default=0, help="chunk threads (0 = cpu count)")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--out", help="append JSON result rows to this file")
+    args = ap.parse_args()
+
+    k = max(KS)
+    for n_users in (int(u) for u in args.users):
+        rec, train_ui, holdout = make_data(n_users, args.items, args.factors, args.train_per_user,
+                                           args.holdout_per_user, args.seed)
+        got, stats = timed(evaluate_als, rec, train_ui, holdout, workers=args.workers)
+        emit({"method": "vectorized", "users": n_users, "items": args.items, "eval_users": got["eval_users"],
+              "users_per_s": round(got["eval_users"] / stats["wall_s"]), f"ndcg_at_{k}": round(got[f"ndcg_at_{k}"], 5),
+              **stats}, args.out)
+
+        sample = [str(u) for u in range(min(args.loop_users, n_users))]
+        t0 = time.perf_counter()
+        ref = loop_baseline(rec, train_ui, holdout, sample, k)
+        wall = time.perf_counter() - t0
+        sub = evaluate_als(rec, train_ui[train_ui["customer_id"].isin(sample)],
+                           holdout[holdout["customer_id"].isin(sample)], ks=(k,), workers=args.workers)
+        same = all(np.isclose(ref[m], sub[f"{m}_at_{k}"]) for m in ("precision", "recall", "map", "ndcg"))
+        emit({"method": "per_user_loop", "users": n_users, "timed_users": ref["eval_users"],
+              "users_per_s": round(ref["eval_users"] / wall),
+              "extrapolated_s": round(got["eval_users"] * wall / max(ref["eval_users"], 1), 1),
+              "matches_vectorized": same}, args.out)
+
+
+if __name__ == "__main__":
+    main()
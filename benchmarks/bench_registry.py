@@ -0,0 +1,73 @@
+"""
+Model artifact size and save/load time for the rf CLV regressor: the sklearn flavor's plain pickle vs the
+compressed joblib dump that src/common/registry.py logs by default. With --s3-uri, also times uploading the
+compressed dump with one worker vs --workers parallel multipart transfers (needs boto3 and credentials).
+
+    PYTHONPATH=. python benchmarks/bench_registry.py --transactions 1e6 --levels 1 3 6
+    PYTHONPATH=. python benchmarks/bench_registry.py --s3-uri s3://mlflow/bench --workers 8
+"""
+import argparse
+import pickle
+import tempfile
+import time
+from pathlib import Path
+
+import joblib
+
+from benchmarks.bench_estimators import build_tasks
+from benchmarks.harness import emit
+from src.common.estimators import make_estimator
+
+
+def save_load(path: Path, dump, load) -> dict:
+    t0 = time.perf_counter()
+    dump(path)
+    t1 = time.perf_counter()
+    load(path)
+    t2 = time.perf_counter()
+    return {"mb": round(path.stat().st_size / 2**20, 1), "save_s": round(t1 - t0, 2), "load_s": round(t2 - t1, 2)}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--transactions", type=float, default=1e6, help="synthetic transaction rows (sets customer count)")
+    ap.add_argument("--levels", type=int, nargs="+", default=[1, 3, 6], help="zlib levels to compare")
+    ap.add_argument("--s3-uri", help="s3://bucket/prefix to time uploads against")
+    ap.add_argument("--workers", type=int, default=8)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--out", help="append JSON result rows to this file")
+    args = ap.parse_args()
+
+    X, y = build_tasks(int(args.transactions), args.seed)["regression"]
+    model = make_estimator("regression", "rf").fit(X, y)
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+
+        def dump_pickle(p):
+            with open(p, "wb") as f:
+                pickle.dump(model, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+        def load_pickle(p):
+            with open(p, "rb") as f:
+                return pickle.load(f)
+
+        emit({"format": "pickle", **save_load(tmp / "model.pkl", dump_pickle, load_pickle)}, args.out)
+        for level in args.levels:
+            path = tmp / f"model-{level}.joblib"
+            emit({"format": f"joblib_zlib{level}",
+                  **save_load(path, lambda p: joblib.dump(model, p, compress=("zlib", level)), joblib.load)}, args.out)
+
+        if args.s3_uri:
+            from src.common.registry import upload_dir
+            src = tmp / "upload"
+            src.mkdir()
+            joblib.dump(model, src / "model.joblib", compress=("zlib", 3))
+            for workers in (1, args.workers):
+                t0 = time.perf_counter()
+                sent = upload_dir(src, f"{args.s3_uri.rstrip('/')}/w{workers}", workers=workers)
+                emit({"upload": "s3", "workers": workers, "mb": round(sent / 2**20, 1),
+                      "seconds": round(time.perf_counter() - t0, 2)}, args.out)
+
+
+if __name__ == "__main__":
+    main()
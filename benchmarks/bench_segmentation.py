@@ -0,0 +1,114 @@
+"""
+Segmentation training: full-batch KMeans on the in-memory table (src/segmentation/train.py) vs streamed
+MiniBatchKMeans (src/segmentation/train_kmeans_pyfunc.py:train_segmentation_minibatch), each in a fresh process,
+reporting fit time, peak RSS and inertia; plus single-row assignment latency of the old and new pyfunc layouts.
+
+    PYTHONPATH=. python benchmarks/bench_segmentation.py --rows 1e5 1e6 1e7 --data-dir /tmp/shopsphere_bench
+"""
+import argparse
+import multiprocessing as mp
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.harness import emit, latency_stats, timed
+from src.common.schemas import SEGMENTATION_FEATURES
+
+
+def write_features(path: Path, n_rows: int, part_rows: int = 1_000_000, seed: int = 42):
+    """
+    Partitioned segmentation gold table with RFM-like marginals (heavy-tailed monetary / tx_count).
+    """
+    path.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    for i, start in enumerate(range(0, n_rows, part_rows)):
+        m = min(part_rows, n_rows - start)
+        tx_count = rng.zipf(2.0, m).clip(max=5_000)
+        df = pd.DataFrame({
+            "customer_id": np.char.add("C", np.arange(start, start + m).astype(str)),
+            "recency_days": rng.exponential(60, m).round(),
+            "tx_count": tx_count,
+            "monetary": tx_count * rng.lognormal(3.5, 0.8, m),
+            "avg_discount": rng.beta(1, 6, m),
+            "avg_qty": 1 + rng.poisson(1.2, m),
+            "age": rng.integers(18, 80, m),
+            "loyalty_level": rng.integers(0, 5, m),
+        })
+        df.to_parquet(path / f"part-{i:05d}.parquet", index=False, row_group_size=131_072)
+
+
+def _fit_full(path: str, k: int):
+    from sklearn.cluster import KMeans
+    from sklearn.preprocessing import StandardScaler
+    X = pd.read_parquet(path, columns=SEGMENTATION_FEATURES).fillna(0.0)
+    Xs = StandardScaler().fit_transform(X)
+    return float(KMeans(n_clusters=k, random_state=42, n_init="auto").fit(Xs).inertia_)
+
+
+def _fit_minibatch(path: str, k: int):
+    from src.segmentation.train_kmeans_pyfunc import train_segmentation_minibatch, iter_feature_batches
+    model = train_segmentation_minibatch(path, k=k, warm_start=False, register=False)
+    inertia = 0.0
+    for X in iter_feature_batches(path, SEGMENTATION_FEATURES):
+        inertia += float((((X - model.mean) / model.scale - model.centers[model.assign(X)]) ** 2).sum())
+    return inertia
+
+
+def _child(mode: str, path: str, k: int, conn):
+    try:
+        fn = _fit_full if mode == "full" else _fit_minibatch
+        inertia, stats = timed(fn, path, k)
+        conn.send({**stats, "inertia": round(inertia, 1)})
+    except Exception as ex:
+        conn.send({"error": repr(ex)})
+    finally:
+        conn.close()
+
+
+def run_isolated(mode: str, path: str, k: int) -> dict:
+    ctx = mp.get_context("spawn")
+    parent, child = ctx.Pipe(duplex=False)
+    proc = ctx.Process(target=_child, args=(mode, path, k, child))
+    proc.start()
+    res = parent.recv()
+    proc.join()
+    return res
+
+
+def assignment_latency(path: str, k: int, repeat: int) -> list[dict]:
+    from sklearn.cluster import KMeans
+    from sklearn.preprocessing import StandardScaler
+    from src.segmentation.train_kmeans_pyfunc import SegmentationModel
+    X = pd.read_parquet(path, columns=SEGMENTATION_FEATURES).head(100_000).fillna(0.0)
+    scaler = StandardScaler().fit(X)
+    km = KMeans(n_clusters=k, random_state=42, n_init="auto").fit(scaler.transform(X))
+    row = X.iloc[:1]
+    new = SegmentationModel.from_sklearn(scaler, km, SEGMENTATION_FEATURES)
+    old = lambda: km.predict(scaler.transform(row[SEGMENTATION_FEATURES].fillna(0.0)))
+    return [{"layout": "sklearn scaler+kmeans", **latency_stats(old, repeat=repeat)},
+            {"layout": "raw arrays", **latency_stats(lambda: new.predict(None, row), repeat=repeat)}]
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--rows", type=float, nargs="+", default=[1e5, 1e6, 1e7])
+    ap.add_argument("--k", type=int, default=6)
+    ap.add_argument("--modes", nargs="+", default=["full", "minibatch"])
+    ap.add_argument("--data-dir", default="/tmp/shopsphere_bench")
+    ap.add_argument("--repeat", type=int, default=500)
+    ap.add_argument("--out", help="append JSON result rows to this file")
+    args = ap.parse_args()
+
+    for rows in map(int, args.rows):
+        path = Path(args.data_dir) / f"segmentation_{rows}"
+        if not path.exists():
+            write_features(path, rows)
+        for mode in args.modes:
+            emit({"rows": rows, "mode": mode, **run_isolated(mode, str(path), args.k)}, args.out)
+    for row in assignment_latency(str(path), args.k, args.repeat):
+        emit({"bench": "single_row_assign", **row}, args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Per-worker unique memory (USS) of API-style worker processes holding the ALS recommender and the flattened rf
+CLV forest, with private model copies (MODEL_SHARING=off) vs arrays shared through src/common/shared_arrays.py
+(MODEL_SHARING=shm). Workers load from the same pickles / .npy files, touch every array like a warm server,
+and report while all of them are alive, so shared pages are counted as shared.
+
+    PYTHONPATH=. python benchmarks/bench_shared_models.py --workers 4 --users 1e6 --items 5e4
+"""
+import argparse
+import multiprocessing as mp
+import pickle
+import shutil
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks.bench_estimators import build_tasks
+from benchmarks.harness import emit, rss_mb, uss_mb
+
+
+def _worker(mode: str, shm_dir: str, als_path: str, flat_dir: str, conn, release):
+    import src.common.shared_arrays as shared_arrays
+    from src.common.tree_runtime import FlatEnsemble
+    try:
+        shared_arrays.MODEL_SHARING = mode
+        shared_arrays.SHARED_MODEL_DIR = Path(shm_dir)
+        base = uss_mb()
+        with open(als_path, "rb") as f:
+            als = pickle.load(f)
+        flat = FlatEnsemble.load(flat_dir)
+        shared = shared_arrays.share_model(als, "recommender_als_model", 1)
+        shared += shared_arrays.share_model(flat, "clv_model-flat", 1)
+        # serve-time access pattern: every page of every array gets read
+        touched = sum(float(np.asarray(getattr(m, n)).sum()) for m in (als, flat) for n in m.SHARED_ARRAYS
+                      if getattr(m, n, None) is not None)
+        conn.send({"uss_mb": round(uss_mb() - base, 1), "rss_mb": round(rss_mb(), 1),
+                   "shared_mb": round(shared / 2**20, 1), "checksum": round(touched, 3)})
+        release.wait()
+    except Exception as ex:
+        conn.send({"error": repr(ex)})
+
+
+def run_workers(mode: str, n: int, shm_dir: str, als_path: str, flat_dir: str) -> list[dict]:
+    ctx = mp.get_context("spawn")
+    release = ctx.Event()
+    procs, pipes = [], []
+    for _ in range(n):
+        parent, child = ctx.Pipe(duplex=False)
+        proc = ctx.Process(target=_worker, args=(mode, shm_dir, als_path, flat_dir, child, release))
+        proc.start()
+        procs.append(proc)
+        pipes.append(parent)
+    rows = [p.recv() for p in pipes]
+    release.set()
+    for proc in procs:
+        proc.join()
+    return rows
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--workers", type=int, default=4)
+    ap.add_argument("--users", type=float, default=1e6)
+    ap.add_argument("--items", type=float, default=5e4)
+    ap.add_argument("--factors", type=int, default=64)
+    ap.add_argument("--transactions", type=float, default=1e6, help="synthetic rows for the rf CLV forest")
+    ap.add_argument("--shm-dir", default="/dev/shm/shopsphere-bench")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--out", help="append JSON result rows to this file")
+    args = ap.parse_args()
+
+    from src.common.estimators import make_estimator
+    from src.common.tree_runtime import FlatEnsemble
+    from src.recommender.train_als import ALSRecommender
+
+    rng = np.random.default_rng(args.seed)
+    n_users, n_items = int(args.users), int(args.items)
+    als = ALSRecommender(rng.standard_normal((n_users, args.factors), dtype=np.float32),
+                         rng.standard_normal((n_items, args.factors), dtype=np.float32),
+                         {f"c{i}": i for i in range(n_users)}, {f"p{i}": i for i in range(n_items)})
+    X, y = build_tasks(int(args.transactions), args.seed)["regression"]
+    flat = FlatEnsemble.from_sklearn(make_estimator("regression", "rf").fit(X, y), list(X.columns))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        als_path = Path(tmp) / "als.pkl"
+        with open(als_path, "wb") as f:
+            pickle.dump(als, f, protocol=pickle.HIGHEST_PROTOCOL)
+        flat_dir = flat.save(Path(tmp) / "flat")
+        array_mb = sum(getattr(m, n).nbytes for m in (als, flat) for n in m.SHARED_ARRAYS
+                       if getattr(m, n, None) is not None) / 2**20
+        del als, flat
+        for mode in ("off", "shm"):
+            rows = run_workers(mode, args.workers, args.shm_dir, str(als_path), str(flat_dir))
+            for i, row in enumerate(rows):
+                emit({"mode": mode, "worker": i, "array_mb": round(array_mb, 1), **row}, args.out)
+            uss = [r.get("uss_mb", float("nan")) for r in rows]
+            emit({"mode": mode, "workers": args.workers, "total_uss_mb": round(sum(uss), 1),
+                  "mean_uss_mb": round(float(np.mean(uss)), 1)}, args.out)
+    shutil.rmtree(args.shm_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
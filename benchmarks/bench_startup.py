@@ -0,0 +1,102 @@
+"""
+Cold import cost of the API and flow entry points, each imported in a fresh interpreter under `python -X importtime`.
+Per target: best-of-N wall time of the import, the entry module's cumulative import time, and which heavy libraries
+(mlflow, sklearn, pandas, pyarrow, ...) are already loaded once the import returns; those should only appear when a
+model is loaded or a task runs. With --report, also the packages that dominate the import (self time summed over
+all of a package's modules, i.e. its cumulative cost however deeply it was pulled in) and the slowest single modules.
+
+    PYTHONPATH=. python benchmarks/bench_startup.py --report --top 15
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from benchmarks.harness import emit
+
+ROOT = Path(__file__).resolve().parents[1]
+HEAVY = ["mlflow", "sklearn", "pandas", "pyarrow", "scipy", "boto3", "evidently", "lightgbm", "xgboost", "implicit"]
+
+# target -> (module, extra sys.path entries); the API runs with src/ on the path, flows as scripts from prefect_flows/
+TARGETS = {
+    "api": ("api.main", ["src"]),
+    **{f"flow:{p.stem}": (p.stem, [".", "prefect_flows"]) for p in sorted((ROOT / "prefect_flows").glob("*.py"))},
+}
+
+
+def parse_importtime(stderr: str) -> list[tuple[str, int, int, int]]:
+    """
+    (module, self_us, cumulative_us, depth) per line of `-X importtime` output.
+    """
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cum_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cum_us), depth))
+    return rows
+
+
+def import_once(module: str, paths: list[str]) -> dict:
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([str(ROOT / p) for p in paths] +
+                                                      [os.environ.get("PYTHONPATH", "")]).rstrip(os.pathsep))
+    code = (f"import sys, json; import {module}; "
+            f"print(json.dumps([m for m in {HEAVY!r} if m in sys.modules]))")
+    t0 = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT, env=env,
+                          capture_output=True, text=True)
+    wall = time.perf_counter() - t0
+    if proc.returncode != 0:
+        return {"error": proc.stderr.strip().splitlines()[-1]}
+    rows = parse_importtime(proc.stderr)
+    entry = next((r for r in rows if r[0] == module), None)
+    return {"wall_ms": wall * 1e3, "import_ms": entry[2] / 1e3 if entry else None,
+            "heavy_loaded": json.loads(proc.stdout.strip().splitlines()[-1]), "rows": rows}
+
+
+def report(rows: list, top: int) -> tuple[list, list]:
+    by_package = defaultdict(lambda: [0, 0])
+    for name, self_us, _, _ in rows:
+        agg = by_package[name.split(".")[0]]
+        agg[0] += self_us
+        agg[1] += 1
+    packages = sorted(by_package.items(), key=lambda kv: -kv[1][0])[:top]
+    modules = sorted(rows, key=lambda r: -r[2])[:top]
+    return packages, modules
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--targets", nargs="+", default=list(TARGETS), help=f"subset of: {' '.join(TARGETS)}")
+    ap.add_argument("--repeat", type=int, default=3, help="fresh interpreters per target; the fastest is reported")
+    ap.add_argument("--report", action="store_true", help="per-package / per-module import cost of each target")
+    ap.add_argument("--top", type=int, default=10)
+    ap.add_argument("--out", help="append JSON result rows to this file")
+    args = ap.parse_args()
+
+    for target in args.targets:
+        module, paths = TARGETS[target]
+        runs = [import_once(module, paths) for _ in range(args.repeat)]
+        if "error" in runs[0]:
+            emit({"target": target, "error": runs[0]["error"]}, args.out)
+            continue
+        best = min(runs, key=lambda r: r["wall_ms"])
+        emit({"target": target, "wall_ms": round(best["wall_ms"], 1),
+              "import_ms": None if best["import_ms"] is None else round(best["import_ms"], 1),
+              "heavy_loaded": ",".join(best["heavy_loaded"]) or "-"}, args.out)
+        if not args.report:
+            continue
+        packages, modules = report(best["rows"], args.top)
+        for name, (self_us, n) in packages:
+            emit({"target": target, "package": name, "self_ms": round(self_us / 1e3, 1), "modules": n}, args.out)
+        for name, _, cum_us, depth in modules:
+            emit({"target": target, "module": name, "cumulative_ms": round(cum_us / 1e3, 1), "depth": depth}, args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+sklearn predict vs the flattened runtime in src/common/tree_runtime.py for the rf CLV regressor and
+campaign propensity classifier, at batch sizes from a single API request up to a bulk scoring chunk.
+Also reports the largest absolute difference between the two outputs.
+
+    PYTHONPATH=. python benchmarks/bench_tree_runtime.py --transactions 1e6 --batch-sizes 1 10 1000 100000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.bench_estimators import build_tasks
+from benchmarks.harness import emit, latency_stats
+from src.common.estimators import make_estimator
+from src.common.tree_runtime import FlatEnsemble
+
+
+def bench_batch(fn, batch, repeat: int) -> dict:
+    if len(batch) <= 1000:
+        stats = latency_stats(lambda: fn(batch), repeat=repeat)
+        return {"p50_ms": stats["p50_ms"], "p99_ms": stats["p99_ms"]}
+    t0 = time.perf_counter()
+    fn(batch)
+    return {"p50_ms": round((time.perf_counter() - t0) * 1000, 2), "p99_ms": None}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--transactions", type=float, default=1e6, help="synthetic transaction rows (sets customer count)")
+    ap.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 10, 1000, 100_000])
+    ap.add_argument("--repeat", type=int, default=100, help="calls per batch size up to 1000 rows")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--out", help="append JSON result rows to this file")
+    args = ap.parse_args()
+
+    for task, (X, y) in build_tasks(int(args.transactions), args.seed).items():
+        model = make_estimator(task, "rf").fit(X, y)
+        flat = FlatEnsemble.from_sklearn(model, list(X.columns))
+        if task == "classification":
+            sk_fn, flat_fn = (lambda b: model.predict_proba(b)), (lambda b: flat.predict_proba(b.to_numpy()))
+        else:
+            sk_fn, flat_fn = (lambda b: model.predict(b)), (lambda b: flat.predict(b.to_numpy()))
+        for size in args.batch_sizes:
+            batch = X.sample(size, replace=len(X) < size, random_state=0)
+            max_abs_diff = float(np.max(np.abs(sk_fn(batch) - flat_fn(batch))))
+            for runtime, fn in (("sklearn", sk_fn), ("flat", flat_fn)):
+                emit({"task": task, "runtime": runtime, "trees": flat.meta["n_trees"], "nodes": len(flat.feature),
+                      "batch": size, **bench_batch(fn, batch, args.repeat), "max_abs_diff": max_abs_diff}, args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import json
+import os
+import resource
+import threading
+import time
+from pathlib import Path
+
+_PAGE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def rss_mb() -> float:
+    """
+    Current resident set size of this process in MB.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE / 1e6
+    except OSError:
+        # ru_maxrss is KB on Linux, bytes on macOS; good enough as a fallback
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3
+
+
+def uss_mb(pid: str = "self") -> float:
+    """
+    Unique (private) memory of a process in MB, i.e. what it would free on exit.
+    """
+    total = 0
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            if line.startswith(("Private_Clean:", "Private_Dirty:")):
+                total += int(line.split()[1])
+    return total / 1e3
+
+
+class PeakRSS:
+    """
+    Context manager sampling RSS in a background thread; exposes baseline, peak and delta in MB.
+    """
+
+    def __init__(self, interval: float = 0.02):
+        self.interval = interval
+        self.baseline = self.peak = 0.0
+        self._stop = threading.Event()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, rss_mb())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.baseline = self.peak = rss_mb()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, rss_mb())
+
+    @property
+    def delta(self) -> float:
+        return self.peak - self.baseline
+
+
+def timed(fn, *args, **kwargs):
+    """
+    Run fn once; return (result, stats) with wall/cpu seconds and RSS peak info.
+    """
+    with PeakRSS() as mem:
+        t0, c0 = time.perf_counter(), time.process_time()
+        out = fn(*args, **kwargs)
+        wall, cpu = time.perf_counter() - t0, time.process_time() - c0
+    return out, {
+        "wall_s": round(wall, 4),
+        "cpu_s": round(cpu, 4),
+        "rss_before_mb": round(mem.baseline, 1),
+        "peak_rss_mb": round(mem.peak, 1),
+        "peak_delta_mb": round(mem.delta, 1),
+    }
+
+
+def latency_stats(fn, repeat: int = 200, warmup: int = 5) -> dict:
+    """
+    Call fn() repeatedly; return p50/p95/p99 latency in milliseconds.
+    """
+    import numpy as np
+
+    for _ in range(warmup):
+        fn()
+    samples = np.empty(repeat)
+    for i in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples[i] = (time.perf_counter() - t0) * 1000.0
+    return {f"p{q}_ms": round(float(np.percentile(samples, q)), 4) for q in (50, 95, 99)}
+
+
+def emit(row: dict, out: str | None = None):
+    """
+    Print a result row and optionally append it as JSON to `out`.
+    """
+    print(" | ".join(f"{k}={v}" for k, v in row.items()), flush=True)
+    if out:
+        Path(out).parent.mkdir(parents=True, exist_ok=True)
+        with open(out, "a") as f:
+            f.write(json.dumps(row) + "\n")
@@ -0,0 +1,86 @@
+from prefect import flow, task
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from src.common.batch_inference import predict_in_chunks, positive_score_fn, single_threaded
+from src.common.feature_store import materialize
+from src.common.tables import read_frame
+from src.common.mlflow_client import configure, resolve
+from src.common.schemas import CLV_FEATURES, CAMPAIGN_FEATURES, SEGMENTATION_FEATURES, PRICING_FEATURES
+
+GOLD = Path("/app/data/gold")
+SCORES = Path("/app/data/scores")
+
+# registered model -> (gold table, key column, feature columns, score column, how to score)
+JOBS = {
+    "clv_model": ("clv_features", "customer_id", CLV_FEATURES, "clv_180d", "predict"),
+    "campaign_model": ("campaign_features", "customer_id", CAMPAIGN_FEATURES, "prob_response", "predict_proba"),
+    "segmentation_model": ("segmentation_features", "customer_id", SEGMENTATION_FEATURES, "cluster_id", "pyfunc"),
+    "pricing_model": ("pricing_features", "product_id", PRICING_FEATURES, "price_sensitivity", "predict"),
+}
+# extra gold columns kept next to the score (the pricing router needs avg_price to turn sensitivity into a price)
+PASSTHROUGH = {"pricing_model": ["avg_price"]}
+
+
+@task
+def set_mlflow():
+    configure()
+
+
+@task
+def resolve_production(name: str):
+    ref = resolve(name)
+    return None if ref is None else (ref.version, ref.run_id)
+
+
+def _load(name: str, version: str, how: str):
+    ref = resolve(name)
+    uri = ref.uri if ref is not None and ref.version == version else f"models:/{name}/{version}"
+    if how == "pyfunc":
+        import mlflow.pyfunc
+        return mlflow.pyfunc.load_model(uri)
+    from src.common.registry import load_sklearn
+    # parallelism comes from the chunk pool; avoid oversubscribing cores
+    return single_threaded(load_sklearn(uri))
+
+
+@task
+def score_table(name: str, version: str, run_id: str, chunk_rows: int = 250_000, workers: int = 0) -> Path | None:
+    gold, key, cols, score_col, how = JOBS[name]
+    path = GOLD / f"{gold}.parquet"
+    if not path.exists():
+        print(f"[batch_score] {path} missing; skipping {name}")
+        return None
+    df = read_frame(path, [key] + cols + PASSTHROUGH.get(name, []))
+    X = df[cols].fillna(0.0)
+    model = _load(name, version, how)
+
+    fn = positive_score_fn(model) if how == "predict_proba" else (lambda c: np.asarray(model.predict(c), dtype=np.float64))
+    scores = predict_in_chunks(fn, X, chunk_rows=chunk_rows, workers=workers)
+
+    out = df[[key] + PASSTHROUGH.get(name, [])].copy()
+    out[score_col] = scores
+    version_dir = SCORES / name / f"v{version}"
+    version_dir.mkdir(parents=True, exist_ok=True)
+    out.to_parquet(version_dir / "scores.parquet", index=False)
+    # publish for O(1) lookup in the routers; run_id lets them serve only scores of the model they loaded
+    materialize(out, f"{name}_scores", key=key, version=f"v{version}",
+                meta={"model_name": name, "model_version": str(version), "run_id": run_id, "score": score_col})
+    print(f"[batch_score] {name} v{version}: {len(out)} rows -> {version_dir}")
+    return version_dir
+
+
+@flow(name="batch_score")
+def batch_score_flow(chunk_rows: int = 250_000, workers: int = 0):
+    set_mlflow()
+    for name in JOBS:
+        prod = resolve_production(name)
+        if prod is None:
+            print(f"[batch_score] no Production version of {name}; skipping")
+            continue
+        version, run_id = prod
+        score_table(name, version, run_id, chunk_rows=chunk_rows, workers=workers)
+
+
+if __name__ == "__main__":
+    batch_score_flow()
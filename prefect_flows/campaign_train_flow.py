@@ -1,30 +1,44 @@
 from prefect import flow, task
 import pandas as pd
 from pathlib import Path
+from src.common.feature_store import materialize
+from src.campaign_response.exposure import exposure_counts, iter_event_chunks
+from src.common import features_duckdb
 from src.common.features import campaign_features
-from src.campaign_response.train import train_campaign_classifier
+from src.common.tables import read_frame, write_table
 
 BRONZE = Path("/app/data/bronze")
 GOLD = Path("/app/data/gold")
 FEATS = GOLD / "campaign_features.parquet"
+EXPOSURE = GOLD / "campaign_exposure.parquet"
 
 @task
-def build_features():
-    customers = pd.read_parquet(BRONZE / "customers.parquet")
-    campaigns = pd.read_parquet(BRONZE / "campaigns.parquet")
-    events = pd.read_parquet(BRONZE / "events.parquet")
-    feats = campaign_features(customers, campaigns, events)
-    FEATS.parent.mkdir(parents=True, exist_ok=True)
-    feats.to_parquet(FEATS, index=False)
+def build_features(feature_backend: str | None = None):
+    customers = read_frame(BRONZE / "customers.parquet")
+    campaigns = read_frame(BRONZE / "campaigns.parquet")
+    # per-(customer, campaign) exposure / response counts, events streamed in bounded chunks
+    exposure = exposure_counts(customers, campaigns, iter_event_chunks(BRONZE / "events.parquet"))
+    write_table(exposure, EXPOSURE)
+    if features_duckdb.feature_backend(feature_backend) == "duckdb":
+        feats = features_duckdb.campaign_features(customers, campaigns, BRONZE / "events.parquet", exposure=exposure)
+    else:
+        events = read_frame(BRONZE / "events.parquet")
+        feats = campaign_features(customers, campaigns, events, exposure=exposure)
+    write_table(feats, FEATS)
+    materialize(feats, FEATS.stem, key="customer_id")
+    return feats
 
 @task
-def train():
-    train_campaign_classifier(str(FEATS))
+def train(feats: pd.DataFrame | None = None, tune: bool = False, backend: str | None = None):
+    from src.campaign_response.train import train_campaign_classifier   # mlflow + sklearn, loaded on first use
+    # the frame built in this run is passed straight through; the path is only for standalone runs
+    train_campaign_classifier(feats if feats is not None else str(FEATS), tune=tune, backend=backend)
 
 @flow(name="campaign_response_train")
-def run():
-    build_features()
-    train()
+def run(tune: bool = False, backend: str | None = None, feature_backend: str | None = None):
+    # backend: estimator; feature_backend: pandas | duckdb for the feature build
+    feats = build_features(feature_backend)
+    train(feats, tune=tune, backend=backend)
 
 if __name__ == "__main__":
     run()
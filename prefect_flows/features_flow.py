@@ -1,7 +1,11 @@
 from prefect import flow, task
 import pandas as pd
 from pathlib import Path
+from src.common import features_duckdb
 from src.common.features import build_clv_feature_table
+from src.common.feature_store import materialize
+from src.common.tables import read_frame, write_table
+from src.monitoring.task_profiler import profiled
 
 BRONZE = Path("/app/data/bronze")
 GOLD = Path("/app/data/gold")
@@ -9,18 +13,26 @@ GOLD_FEATURES = GOLD / "clv_features.parquet"
 
 
 @task
-def load_bronze():
-    customers = pd.read_parquet(BRONZE / "customers.parquet")
-    products = pd.read_parquet(BRONZE / "products.parquet")
-    campaigns = pd.read_parquet(BRONZE / "campaigns.parquet")   # reserved for future
-    transactions = pd.read_parquet(BRONZE / "transactions.parquet")
-    events = pd.read_parquet(BRONZE / "events.parquet")
+@profiled
+def load_bronze(feature_backend: str = "pandas"):
+    customers = read_frame(BRONZE / "customers.parquet")
+    products = read_frame(BRONZE / "products.parquet")
+    campaigns = read_frame(BRONZE / "campaigns.parquet")   # reserved for future
+    if feature_backend == "duckdb":
+        # fact tables stay on disk; DuckDB streams them out of core
+        return customers, products, campaigns, BRONZE / "transactions.parquet", BRONZE / "events.parquet"
+    transactions = read_frame(BRONZE / "transactions.parquet")
+    events = read_frame(BRONZE / "events.parquet")
     return customers, products, campaigns, transactions, events
 
 
 @task
-def build_features(customers, products, campaigns, transactions, events) -> pd.DataFrame:
+@profiled
+def build_features(customers, products, campaigns, transactions, events,
+                   feature_backend: str = "pandas") -> pd.DataFrame:
     # Build CLV feature table per customer
+    if feature_backend == "duckdb":
+        return features_duckdb.build_clv_feature_table(customers, transactions, products, events)
     return build_clv_feature_table(
         customers=customers,
         transactions=transactions,
@@ -30,16 +42,26 @@ def build_features(customers, products, campaigns, transactions, events) -> pd.D
 
 
 @task
+@profiled
 def write_features(df: pd.DataFrame):
-    GOLD.mkdir(parents=True, exist_ok=True)
-    df.to_parquet(GOLD_FEATURES, index=False)
+    write_table(df, GOLD_FEATURES)
+
+
+@task
+@profiled
+def publish_online(df: pd.DataFrame):
+    # Refresh the API's customer_id-indexed store (atomic swap; routers pick it up on their next refresh)
+    materialize(df, GOLD_FEATURES.stem, key="customer_id")
 
 
 @flow(name="features_build")
-def features_build_flow():
-    customers, products, campaigns, transactions, events = load_bronze()
-    feats = build_features(customers, products, campaigns, transactions, events)
+def features_build_flow(feature_backend: str | None = None):
+    # pandas (in memory) | duckdb (out of core); default from FEATURE_BACKEND
+    feature_backend = features_duckdb.feature_backend(feature_backend)
+    customers, products, campaigns, transactions, events = load_bronze(feature_backend)
+    feats = build_features(customers, products, campaigns, transactions, events, feature_backend)
     write_features(feats)
+    publish_online(feats)
 
 
 if __name__ == "__main__":
@@ -1,41 +1,26 @@
 from prefect import flow, task
-from src.common.io import (
-    read_raw_customers, read_raw_products, read_raw_campaigns, read_raw_transactions, read_raw_events,
-    write_bronze
-)
+from src.common.manifest import TABLES, changed_partitions, ingest
 
 @task
-def ingest_customers():
-    df = read_raw_customers()
-    write_bronze(df, "customers")
+def ingest_changed(tables: list[str]) -> dict:
+    # only new / changed raw files are read; facts are appended to bronze and deduped on their ID
+    return ingest(tables)
 
 @task
-def ingest_products():
-    df = read_raw_products()
-    write_bronze(df, "products")
-
-@task
-def ingest_campaigns():
-    df = read_raw_campaigns()
-    write_bronze(df, "campaigns")
-
-@task
-def ingest_transactions():
-    df = read_raw_transactions()
-    write_bronze(df, "transactions")
-
-@task
-def ingest_events():
-    df = read_raw_events()
-    write_bronze(df, "events")
+def report_changes(result: dict):
+    parts = changed_partitions(since=result["ingest_id"] - 1) if any(v is not None for k, v in result.items()
+                                                                      if k != "ingest_id") else None
+    if parts is None or parts.empty:
+        print("[ingest] no raw changes")
+        return
+    for p in parts.itertuples():
+        print(f"[ingest] #{p.ingest_id} {p.table}: {p.mode} {p.path} ({p.rows} rows)")
 
 @flow(name="ingest_all")
-def ingest_all_flow():
-    ingest_customers()
-    ingest_products()
-    ingest_campaigns()
-    ingest_transactions()
-    ingest_events()
+def ingest_all_flow(tables: list[str] | None = None) -> dict:
+    result = ingest_changed(list(tables or TABLES))
+    report_changes(result)
+    return result
 
 if __name__ == "__main__":
     ingest_all_flow()
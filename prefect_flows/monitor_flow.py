@@ -1,7 +1,8 @@
 from prefect import flow, task
 from pathlib import Path
 import pandas as pd
-from src.monitoring.drift_report import build_drift_report
+from src.common.tables import read_frame
+from src.monitoring.task_profiler import profiled
 
 GOLD = Path("/app/data/gold")
 REF_DIR = Path("/app/data/reference")
@@ -14,26 +15,31 @@ REPORT_HTML = REPORT_DIR / "clv_drift.html"
 DRIFT_SCORE_FILE = MONITOR_DIR / "clv_drift_score.txt"
 
 @task
+@profiled
 def ensure_dirs():
     REF_DIR.mkdir(parents=True, exist_ok=True)
     REPORT_DIR.mkdir(parents=True, exist_ok=True)
     MONITOR_DIR.mkdir(parents=True, exist_ok=True)
 
 @task
+@profiled
 def load_current() -> pd.DataFrame:
-    return pd.read_parquet(CUR_FEATURES)
+    return read_frame(CUR_FEATURES)
 
 @task
+@profiled
 def load_or_init_reference(cur: pd.DataFrame) -> pd.DataFrame:
     if REF_FEATURES.exists():
-        return pd.read_parquet(REF_FEATURES)
+        return read_frame(REF_FEATURES)
     # First run: take a stable reference snapshot (e.g., first 60% rows)
     ref = cur.sample(frac=0.6, random_state=42) if len(cur) > 10 else cur.copy()
     ref.to_parquet(REF_FEATURES, index=False)
     return ref
 
 @task
+@profiled
 def run_evidently(ref: pd.DataFrame, cur: pd.DataFrame) -> float:
+    from src.monitoring.drift_report import build_drift_report   # evidently is slow to import
     drift_score = build_drift_report(
         reference_df=ref,
         current_df=cur,
@@ -42,6 +48,7 @@ def run_evidently(ref: pd.DataFrame, cur: pd.DataFrame) -> float:
     return float(drift_score)
 
 @task
+@profiled
 def write_score(score: float):
     DRIFT_SCORE_FILE.write_text(f"{score:.6f}")
 
@@ -1,21 +1,32 @@
 from prefect import flow, task
 from pathlib import Path
-import os, pandas as pd
-import mlflow, mlflow.pyfunc
+import pandas as pd
+from src.common.batch_inference import predict_in_chunks, count_outside
+from src.common.mlflow_client import load_pyfunc
+from src.common.schemas import PRICING_FEATURES
+from src.common.tables import read_frame
+from src.monitoring.task_profiler import profiled
 
 BRONZE = Path("/app/data/bronze")
+GOLD = Path("/app/data/gold")
 MON = Path("/app/data/monitoring")
 VIOL_FILE = MON / "pricing_guardrail_violations.txt"
 
 @task
+@profiled
 def ensure_dirs():
     MON.mkdir(parents=True, exist_ok=True)
 
 @task
+@profiled
 def load_data():
-    products = pd.read_parquet(BRONZE / "products.parquet")
+    # pricing_train_flow already aggregated exactly these product features into gold
+    gold = GOLD / "pricing_features.parquet"
+    if gold.exists():
+        return read_frame(gold, ["product_id"] + PRICING_FEATURES)
+    products = read_frame(BRONZE / "products.parquet")
     # Build a minimal feature frame for pricing inference
-    tx = pd.read_parquet(BRONZE / "transactions.parquet")
+    tx = read_frame(BRONZE / "transactions.parquet")
     agg = tx.groupby("product_id").agg(
         units=("quantity","sum"),
         revenue=("gross_revenue","sum"),
@@ -27,29 +38,27 @@ def load_data():
     return df
 
 @task
+@profiled
 def load_model():
-    mlflow.set_tracking_uri(os.environ.get("MLFLOW_TRACKING_URI","http://mlflow:5000"))
     try:
-        return mlflow.pyfunc.load_model("models:/pricing_model/Production")
+        return load_pyfunc("pricing_model")[0]
     except Exception:
         return None
 
 @task
-def check_guardrails(model, df: pd.DataFrame):
+@profiled
+def check_guardrails(model, df: pd.DataFrame, chunk_rows: int = 100_000, workers: int = 0):
     if model is None or df.empty:
         return 0
     # company policy guardrails (example)
     min_price = 0.5
     max_price = 2_000.0
-    count = 0
-    X = df[["avg_price","units","revenue","avg_discount","premium_share"]].fillna(0.0)
-    preds = model.predict(X)
-    for p in preds:
-        if p < min_price or p > max_price:
-            count += 1
-    return count
+    X = df[PRICING_FEATURES].fillna(0.0)
+    preds = predict_in_chunks(model.predict, X, chunk_rows=chunk_rows, workers=workers)
+    return count_outside(preds, min_price, max_price)
 
 @task
+@profiled
 def write(count: int):
     VIOL_FILE.write_text(str(count))
 
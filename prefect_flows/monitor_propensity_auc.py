@@ -1,71 +1,134 @@
 from prefect import flow, task
 from pathlib import Path
-import os, pandas as pd
-from sklearn.metrics import roc_auc_score
-import mlflow, mlflow.pyfunc
+import pandas as pd
+import numpy as np
+from src.common.batch_inference import predict_in_chunks, positive_score_fn, single_threaded
+from src.common.mlflow_client import resolve
+from src.common.schemas import CAMPAIGN_FEATURES
+from src.common.tables import read_frame
+from src.monitoring.task_profiler import profiled
+from src.monitoring.windowed_metrics import (load_state, save_state, resume_from, update_state,
+                                             window_metrics, per_window_table)
 
 BRONZE = Path("/app/data/bronze")
 GOLD = Path("/app/data/gold")
 MON = Path("/app/data/monitoring")
 AUC_FILE = MON / "campaign_auc.txt"
 AUC_DELTA_FILE = MON / "campaign_auc_delta.txt"
+AUC_DAILY_FILE = MON / "campaign_auc_daily.txt"
+ECE_FILE = MON / "campaign_ece.txt"
+LIFT_FILE = MON / "campaign_lift_at_10.txt"
+# per-(model version, daily/weekly window, score bin) histograms; see src/monitoring/windowed_metrics.py
+STATE_FILE = MON / "state" / "propensity_windows.parquet"
+WINDOWS_FILE = MON / "propensity_windows.parquet"
 
 @task
+@profiled
 def ensure_dirs():
     MON.mkdir(parents=True, exist_ok=True)
 
 @task
+@profiled
 def load_data():
-    # Features built earlier
-    feats = pd.read_parquet(GOLD / "campaign_features.parquet")
-    # Labels proxy: purchase_event > 0
-    y = (feats.get("events_purchase_count", 0) > 0).astype(int).values
-    return feats, y
+    # Features built earlier; events give the event-time rows the model is judged on
+    feats = read_frame(GOLD / "campaign_features.parquet")
+    events = read_frame(BRONZE / "events.parquet", ["customer_id", "timestamp", "event_type"])
+    return feats, events
+
+def daily_exposures(events: pd.DataFrame, since: pd.Timestamp | None = None) -> pd.DataFrame:
+    """
+    One row per (customer_id, day) with any event on or after `since`; purchased = a purchase event that day.
+    Rows only ever depend on that day's events, so a window's rows are fixed once the window is over.
+    """
+    day = pd.to_datetime(events["timestamp"]).dt.floor("D")
+    keep = day.notna() if since is None else day >= since
+    rows = pd.DataFrame({"customer_id": events.loc[keep, "customer_id"].to_numpy(), "day": day[keep].to_numpy(),
+                         "purchased": (events.loc[keep, "event_type"] == "purchase").to_numpy()})
+    return rows.groupby(["customer_id", "day"], sort=False)["purchased"].any().reset_index()
 
 @task
+@profiled
 def load_model():
-    mlflow.set_tracking_uri(os.environ.get("MLFLOW_TRACKING_URI","http://mlflow:5000"))
+    import mlflow.pyfunc
+    from src.common.registry import load_sklearn
+    try:
+        ref = resolve("campaign_model")
+    except Exception:
+        return None, None
+    if ref is None:
+        return None, None
+    try:
+        # the estimator itself keeps predict_proba; pyfunc only exposes predict (class labels)
+        return single_threaded(load_sklearn(ref.uri)), ref.version
+    except Exception:
+        pass
     try:
-        model = mlflow.pyfunc.load_model("models:/campaign_model/Production")
-        return model
+        return mlflow.pyfunc.load_model(ref.uri), ref.version
     except Exception:
-        return None
+        return None, None
 
 @task
-def compute_auc(model, feats: pd.DataFrame, y):
-    if model is None:
-        return 0.0, 0.0, 0.0
-    X = feats[["age","is_male","loyalty_level","uplift_mean",
-               "events_view_count","events_add_to_cart_count","events_purchase_count"]].fillna(0.0)
-    # split reference/current windows by date if available; otherwise first 60% vs last 40%
-    n = len(X)
-    split = int(n*0.6)
-    X_ref, y_ref = X.iloc[:split], y[:split]
-    X_cur, y_cur = X.iloc[split:], y[split:]
-    # probability
-    if hasattr(model, "predict_proba"):
-        p_ref = model.predict_proba(X_ref)[:,1]
-        p_cur = model.predict_proba(X_cur)[:,1]
-    else:
-        p_ref = model.predict(X_ref)
-        p_cur = model.predict(X_cur)
-    auc_ref = roc_auc_score(y_ref, p_ref) if len(set(y_ref)) > 1 else 0.0
-    auc_cur = roc_auc_score(y_cur, p_cur) if len(set(y_cur)) > 1 else 0.0
-    return auc_ref, auc_cur, auc_cur - auc_ref
+@profiled
+def update_windows(model, version, feats: pd.DataFrame, events: pd.DataFrame, chunk_rows: int = 100_000,
+                   workers: int = 0):
+    state = load_state(STATE_FILE)
+    # only windows from the last stored (possibly partial) one onwards are scored; older windows stay as stored
+    since = resume_from(state, version)
+    rows = daily_exposures(events, since)
+    # each active customer is scored once and the score shared by all of their days
+    pos = pd.Index(feats["customer_id"]).get_indexer(rows["customer_id"])
+    rows = rows[pos >= 0]
+    customers, codes = np.unique(pos[pos >= 0], return_inverse=True)
+    X = feats.iloc[customers][CAMPAIGN_FEATURES].fillna(0.0)
+    p = predict_in_chunks(positive_score_fn(model), X, chunk_rows=chunk_rows, workers=workers)
+    state = update_state(state, np.asarray(p)[codes], rows["purchased"].to_numpy(), rows["day"], version, since)
+    save_state(state, STATE_FILE)
+    print(f"[monitor] scored {len(customers)} customers over {len(rows)} customer-days from "
+          f"{since if since is not None else 'the beginning'}")
+    return state
+
+@task
+@profiled
+def compute_auc(state: pd.DataFrame, version):
+    """
+    Current = latest weekly window, reference = all earlier weekly windows, both from the stored histograms.
+    """
+    weeks = np.sort(state.loc[(state["model_version"] == str(version)) & (state["freq"] == "weekly"), "window"].unique())
+    days = np.sort(state.loc[(state["model_version"] == str(version)) & (state["freq"] == "daily"), "window"].unique())
+    if len(weeks) == 0:
+        return {"auc_ref": 0.0, "auc_cur": 0.0, "auc_delta": 0.0, "auc_daily": 0.0, "ece": 0.0, "lift": 0.0}
+    cur = window_metrics(state, version, "weekly", start=weeks[-1])
+    ref = window_metrics(state, version, "weekly", end=weeks[-2]) if len(weeks) > 1 else cur
+    day = window_metrics(state, version, "daily", start=days[-1])
+    auc_cur, auc_ref = cur["auc"] or 0.0, ref["auc"] or 0.0
+    return {"auc_ref": auc_ref, "auc_cur": auc_cur, "auc_delta": auc_cur - auc_ref, "auc_daily": day["auc"] or 0.0,
+            "ece": cur["ece"] or 0.0, "lift": cur["lift"] or 0.0}
 
 @task
-def write_metrics(auc_ref, auc_cur, auc_delta):
-    AUC_FILE.write_text(f"{auc_cur:.6f}")
-    AUC_DELTA_FILE.write_text(f"{auc_delta:.6f}")
+@profiled
+def write_metrics(m: dict, state: pd.DataFrame | None = None, version=None):
+    AUC_FILE.write_text(f"{m['auc_cur']:.6f}")
+    AUC_DELTA_FILE.write_text(f"{m['auc_delta']:.6f}")
+    AUC_DAILY_FILE.write_text(f"{m['auc_daily']:.6f}")
+    ECE_FILE.write_text(f"{m['ece']:.6f}")
+    LIFT_FILE.write_text(f"{m['lift']:.6f}")
+    if state is not None:
+        per_window_table(state, version).to_parquet(WINDOWS_FILE, index=False)
 
 @flow(name="monitor_propensity_auc")
-def run():
+def run(chunk_rows: int = 100_000, workers: int = 0):
     ensure_dirs()
-    feats, y = load_data()
-    model = load_model()
-    auc_ref, auc_cur, auc_delta = compute_auc(model, feats, y)
-    write_metrics(auc_ref, auc_cur, auc_delta)
-    print(f"[monitor] propensity_auc={auc_cur:.4f} delta={auc_delta:.4f}")
+    model, version = load_model()
+    if model is None:
+        write_metrics({"auc_ref": 0.0, "auc_cur": 0.0, "auc_delta": 0.0, "auc_daily": 0.0, "ece": 0.0, "lift": 0.0})
+        print("[monitor] no Production campaign_model; wrote zeros")
+        return
+    feats, events = load_data()
+    state = update_windows(model, version, feats, events, chunk_rows=chunk_rows, workers=workers)
+    m = compute_auc(state, version)
+    write_metrics(m, state, version)
+    print(f"[monitor] propensity_auc={m['auc_cur']:.4f} delta={m['auc_delta']:.4f} "
+          f"daily={m['auc_daily']:.4f} ece={m['ece']:.4f} lift@10={m['lift']:.2f}")
 
 if __name__ == "__main__":
     run()
@@ -1,8 +1,11 @@
 from prefect import flow, task
 from pathlib import Path
 import pandas as pd
-import os, mlflow, mlflow.pyfunc
 import numpy as np
+from src.common.mlflow_client import load_pyfunc
+from src.common.tables import read_frame
+from src.common.batch_inference import map_chunks, predict_in_chunks, catalog_coverage, mean_novelty
+from src.monitoring.task_profiler import profiled
 
 BRONZE = Path("/app/data/bronze")
 MON = Path("/app/data/monitoring")
@@ -10,48 +13,63 @@ COVERAGE_FILE = MON / "recommender_coverage.txt"
 NOVELTY_FILE = MON / "recommender_novelty.txt"
 
 @task
+@profiled
 def ensure_dirs():
     MON.mkdir(parents=True, exist_ok=True)
 
 @task
+@profiled
 def load_tx():
-    tx = pd.read_parquet(BRONZE / "transactions.parquet")
+    tx = read_frame(BRONZE / "transactions.parquet", ["customer_id", "product_id", "quantity"])
     return tx
 
 @task
+@profiled
 def load_model():
-    mlflow.set_tracking_uri(os.environ.get("MLFLOW_TRACKING_URI","http://mlflow:5000"))
     try:
-        return mlflow.pyfunc.load_model("models:/recommender_als_model/Production")
+        return load_pyfunc("recommender_als_model")[0]
     except Exception:
         return None
 
+def _top_items(model, users: list, k: int, chunk_rows: int, workers: int, catalog: pd.Index) -> np.ndarray:
+    """
+    [n_users, k] catalog positions of each user's recommendations (-1 for empty slots).
+    """
+    inner = model.unwrap_python_model() if hasattr(model, "unwrap_python_model") else None
+    if hasattr(inner, "recommend_batch"):
+        # vectorized scoring straight on the factors; remap model item positions to catalog positions
+        to_catalog = catalog.get_indexer(pd.Index(inner.item_ids).astype(str))
+        to_catalog = np.append(to_catalog, -1)  # position -1 (empty slot) stays -1
+        top = predict_in_chunks(lambda u: inner.recommend_batch(u, k)[0], users, chunk_rows, workers)
+        return to_catalog[top].reshape(len(users), -1)
+
+    # models logged before recommend_batch existed: chunked pyfunc predict, flattened in one pass per chunk
+    def chunk(u):
+        out = model.predict(pd.DataFrame({"customer_id": u, "k": k}))
+        pids = [str(e["product_id"]) for r in out for e in r.get("rec_list", [])]
+        return catalog.get_indexer(pids)
+    parts = map_chunks(chunk, users, chunk_rows, workers)
+    return np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+
+
 @task
-def compute_metrics(model, tx: pd.DataFrame, k: int = 5):
+@profiled
+def compute_metrics(model, tx: pd.DataFrame, k: int = 5, chunk_rows: int = 50_000, workers: int = 0):
     if model is None or tx.empty:
         return 0.0, 0.0
     users = tx["customer_id"].astype(str).unique().tolist()
-    items_pop = tx.groupby("product_id")["quantity"].sum()
-    popularity = items_pop / items_pop.sum()  # normalized popularity
-    inv_pop = lambda pid: 1.0 / (popularity.get(pid, 1e-9))
+    items_pop = tx.groupby(tx["product_id"].astype(str))["quantity"].sum()
+    catalog = items_pop.index
+    popularity = (items_pop / items_pop.sum()).to_numpy()  # normalized popularity per catalog position
 
-    # generate top-k recs per user (batch predict)
-    X = pd.DataFrame([{"customer_id": u, "k": k} for u in users])
-    out = model.predict(X)
-    # coverage: distinct recommended items / total catalog
-    rec_items = set()
-    novelty_scores = []
-    for r in out:
-        rec_list = r.get("rec_list", [])
-        for e in rec_list:
-            pid = str(e["product_id"])
-            rec_items.add(pid)
-            novelty_scores.append(inv_pop(pid))
-    coverage = len(rec_items) / tx["product_id"].nunique()
-    novelty = float(np.mean(novelty_scores)) if novelty_scores else 0.0
+    top = _top_items(model, users, k, chunk_rows, workers, catalog)
+    # coverage: distinct recommended items / total catalog; novelty: mean inverse popularity
+    coverage = catalog_coverage(top, len(catalog))
+    novelty = mean_novelty(top, popularity)
     return coverage, novelty
 
 @task
+@profiled
 def write_metrics(coverage, novelty):
     COVERAGE_FILE.write_text(f"{coverage:.6f}")
     NOVELTY_FILE.write_text(f"{novelty:.6f}")
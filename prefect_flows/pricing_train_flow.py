@@ -1,29 +1,35 @@
 from prefect import flow, task
 import pandas as pd
 from pathlib import Path
+from src.common.feature_store import materialize
+from src.common import features_duckdb
 from src.common.features import pricing_features
-from src.pricing.train import train_pricing
+from src.common.tables import read_frame, write_table
 
 BRONZE = Path("/app/data/bronze")
 GOLD = Path("/app/data/gold")
 FEATS = GOLD / "pricing_features.parquet"
 
 @task
-def build_features():
-    tx = pd.read_parquet(BRONZE / "transactions.parquet")
-    products = pd.read_parquet(BRONZE / "products.parquet")
-    feats = pricing_features(tx, products)
-    FEATS.parent.mkdir(parents=True, exist_ok=True)
-    feats.to_parquet(FEATS, index=False)
+def build_features(feature_backend: str | None = None):
+    products = read_frame(BRONZE / "products.parquet")
+    if features_duckdb.feature_backend(feature_backend) == "duckdb":
+        feats = features_duckdb.pricing_features(BRONZE / "transactions.parquet", products)
+    else:
+        feats = pricing_features(read_frame(BRONZE / "transactions.parquet"), products)
+    write_table(feats, FEATS)
+    materialize(feats, FEATS.stem, key="product_id")
+    return feats
 
 @task
-def train():
-    train_pricing(str(FEATS))
+def train(feats: pd.DataFrame | None = None, tune: bool = False):
+    from src.pricing.train import train_pricing   # mlflow + sklearn, loaded on first use
+    train_pricing(feats if feats is not None else str(FEATS), tune=tune)
 
 @flow(name="pricing_train")
-def run():
-    build_features()
-    train()
+def run(tune: bool = False, feature_backend: str | None = None):
+    feats = build_features(feature_backend)
+    train(feats, tune=tune)
 
 if __name__ == "__main__":
     run()
@@ -0,0 +1,109 @@
+"""
+Lightweight ALS refresh between full retrains: fold in users (and items) that had interactions in the last
+`since_days` days against the fixed factors of the Production model, then register and promote the result.
+Items are folded in first so new users can be scored against new products in the same run.
+"""
+from prefect import flow, task
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from src.common.features import build_user_item_matrix
+from src.common.mlflow_client import configure, resolve
+from src.common.tables import read_frame
+from src.recommender.foldin import fold_in_many, gram, interactions_csr
+
+BRONZE = Path("/app/data/bronze")
+REGISTERED_MODEL_NAME = "recommender_als_model"
+
+
+@task
+def set_mlflow():
+    configure("recommender_als_experiment")
+
+
+@task
+def load_production():
+    import mlflow.pyfunc
+    ref = resolve(REGISTERED_MODEL_NAME)
+    if ref is None:
+        return None, None
+    model = mlflow.pyfunc.load_model(ref.uri)
+    inner = model.unwrap_python_model()
+    if not hasattr(inner, "add_users"):
+        print("[als_foldin] Production model predates fold-in support; run a full retrain first")
+        return None, None
+    return inner, ref.version
+
+
+@task
+def load_interactions(since_days: int):
+    """
+    Full interaction history (fold-in solves use all of a user's interactions) and the users / items touched
+    in the last `since_days` days.
+    """
+    tx = read_frame(BRONZE / "transactions.parquet")
+    ts = pd.to_datetime(tx["timestamp"])
+    recent = tx[ts >= ts.max() - pd.Timedelta(days=since_days)]
+    ui = build_user_item_matrix(tx)
+    ui["customer_id"] = ui["customer_id"].astype(str)
+    ui["product_id"] = ui["product_id"].astype(str)
+    return ui, set(recent["customer_id"].astype(str)), set(recent["product_id"].astype(str))
+
+
+@task
+def fold_in_items(rec, ui: pd.DataFrame, touched_items: set) -> int:
+    new_items = [p for p in touched_items if p not in rec.item_index]
+    if not new_items:
+        return 0
+    block = ui[ui["product_id"].isin(new_items)]
+    ids, indptr, indices, data = interactions_csr(block, "product_id", "customer_id", rec.user_index)
+    users = rec.user_matrix()   # float32 view of the user side, whatever its stored precision
+    vectors = fold_in_many(users, indptr, indices, data, rec.reg, gram(users))
+    rec.add_items(list(ids), vectors)
+    return len(ids)
+
+
+@task
+def fold_in_users(rec, ui: pd.DataFrame, touched_users: set) -> int:
+    block = ui[ui["customer_id"].isin(touched_users)]
+    ids, indptr, indices, data = interactions_csr(block, "customer_id", "product_id", rec.item_index)
+    if len(ids) == 0:
+        return 0
+    vectors = fold_in_many(rec.item_matrix(), indptr, indices, data, rec.reg, rec._item_gram())
+    rec.add_users(list(ids), vectors)
+    return len(ids)
+
+
+@task
+def register(rec, base_version: str, n_users: int, n_items: int, promote: bool):
+    import mlflow, mlflow.pyfunc
+    from src.common.promotion import promote_latest_model
+    with mlflow.start_run(run_name=f"als_foldin_v{base_version}"):
+        mlflow.log_params({"fold_in": True, "base_version": base_version, "reg": rec.reg})
+        mlflow.log_metrics({"users_folded": n_users, "items_folded": n_items,
+                            "n_users": len(rec.user_index), "n_items": len(rec.item_index)})
+        mlflow.pyfunc.log_model(
+            artifact_path="model",
+            python_model=rec,
+            registered_model_name=REGISTERED_MODEL_NAME,
+        )
+    if promote:
+        print(f"[als_foldin] promoted version {promote_latest_model(REGISTERED_MODEL_NAME, 'Production')}")
+
+
+@flow(name="recommender_als_foldin")
+def run(since_days: int = 1, promote: bool = True):
+    set_mlflow()
+    rec, version = load_production()
+    if rec is None:
+        return
+    ui, users, items = load_interactions(since_days)
+    n_items = fold_in_items(rec, ui, items)
+    n_users = fold_in_users(rec, ui, users)
+    print(f"[als_foldin] base v{version}: folded {n_users} users, {n_items} items")
+    if n_users or n_items:
+        register(rec, version, n_users, n_items, promote)
+
+
+if __name__ == "__main__":
+    run()
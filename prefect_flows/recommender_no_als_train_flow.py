@@ -1,28 +1,34 @@
 from prefect import flow, task
 import pandas as pd
 from pathlib import Path
+from src.common import features_duckdb
 from src.common.features import build_user_item_matrix
-from src.recommender.train import train_cooccurrence
+from src.common.tables import read_frame, write_table
 
 BRONZE = Path("/app/data/bronze")
 GOLD = Path("/app/data/gold")
 UI = GOLD / "user_item.parquet"
 
 @task
-def build_ui():
-    tx = pd.read_parquet(BRONZE / "transactions.parquet")
-    ui = build_user_item_matrix(tx)
-    UI.parent.mkdir(parents=True, exist_ok=True)
-    ui.to_parquet(UI, index=False)
+def build_ui(feature_backend: str | None = None):
+    if features_duckdb.feature_backend(feature_backend) == "duckdb":
+        ui = features_duckdb.build_user_item_matrix(BRONZE / "transactions.parquet")
+    else:
+        ui = build_user_item_matrix(read_frame(BRONZE / "transactions.parquet"))
+    write_table(ui, UI)
+    return ui
 
 @task
-def train():
-    train_cooccurrence(str(UI))
+def train(ui: pd.DataFrame | None = None):
+    from src.recommender.train import train_cooccurrence   # mlflow, loaded on first use
+    # co-occurrence + popularity cold-start tiers, registered as recommender_fallback_model;
+    # transactions come from the same process cache build_ui read them through
+    train_cooccurrence(ui if ui is not None else str(UI), tx_path=str(BRONZE / "transactions.parquet"))
 
 @flow(name="recommender_train")
-def run():
-    build_ui()
-    train()
+def run(feature_backend: str | None = None):
+    ui = build_ui(feature_backend)
+    train(ui)
 
 if __name__ == "__main__":
     run()
@@ -1,28 +1,54 @@
 from prefect import flow, task
 import pandas as pd
 from pathlib import Path
+from src.common import features_duckdb
 from src.common.features import build_user_item_matrix
-from src.recommender.train_als import train_implicit_als
+from src.common.tables import read_frame, write_table
 
 BRONZE = Path("/app/data/bronze")
 GOLD = Path("/app/data/gold")
 UI = GOLD / "user_item.parquet"
 
 @task
-def build_ui():
-    tx = pd.read_parquet(BRONZE / "transactions.parquet")
+def build_ui(feature_backend: str | None = None, holdout_days: float = 0):
+    """
+    Full user-item matrix (written to gold as before), and with holdout_days > 0 the evaluation split: the
+    interactions before the cutoff and the holdout interactions after it. Returns (ui, holdout_train, holdout, cutoff).
+    """
+    tx_path = BRONZE / "transactions.parquet"
+    if features_duckdb.feature_backend(feature_backend) == "duckdb":
+        con = features_duckdb.connect()
+        ui = features_duckdb.build_user_item_matrix(tx_path, con=con)
+        write_table(ui, UI)
+        if holdout_days <= 0:
+            return ui, None, None, None
+        cutoff = features_duckdb.max_timestamp(tx_path, con=con) - pd.Timedelta(days=holdout_days)
+        return (ui, features_duckdb.build_user_item_matrix(tx_path, con=con, until=cutoff),
+                features_duckdb.build_user_item_matrix(tx_path, con=con, since=cutoff), cutoff)
+    tx = read_frame(tx_path)
     ui = build_user_item_matrix(tx)
-    UI.parent.mkdir(parents=True, exist_ok=True)
-    ui.to_parquet(UI, index=False)
+    write_table(ui, UI)
+    if holdout_days <= 0:
+        return ui, None, None, None
+    from src.recommender.evaluate import holdout_cutoff
+    ts = pd.to_datetime(tx["timestamp"])
+    cutoff = holdout_cutoff(ts, holdout_days)
+    return ui, build_user_item_matrix(tx[ts < cutoff]), build_user_item_matrix(tx[ts >= cutoff]), cutoff
 
 @task
-def train():
-    train_implicit_als(str(UI), factors=64, iterations=20)
+def train(ui: pd.DataFrame | None = None, holdout_train: pd.DataFrame | None = None,
+          holdout: pd.DataFrame | None = None, cutoff=None, factor_dtype: str | None = None):
+    from src.recommender.train_als import train_implicit_als   # mlflow, loaded on first use
+    train_implicit_als(ui if ui is not None else str(UI), factors=64, iterations=20, holdout=holdout,
+                       holdout_train=holdout_train, holdout_cutoff=cutoff, factor_dtype=factor_dtype)
 
 @flow(name="recommender_als_train")
-def run():
-    build_ui()
-    train()
+def run(feature_backend: str | None = None, holdout_days: float = 7, factor_dtype: str | None = None):
+    # holdout_days > 0: also fit a model on interactions before the last holdout_days and log its ranking metrics
+    # on the rest; the registered model is always trained on all interactions
+    # factor_dtype: float32 | float16 | int8 storage of the served factors (default ALS_FACTOR_DTYPE)
+    ui, holdout_train, holdout, cutoff = build_ui(feature_backend, holdout_days)
+    train(ui, holdout_train, holdout, cutoff, factor_dtype)
 
 if __name__ == "__main__":
     run()
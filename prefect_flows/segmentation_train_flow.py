@@ -1,29 +1,41 @@
 from prefect import flow, task
 import pandas as pd
 from pathlib import Path
+from src.common.feature_store import materialize
+from src.common import features_duckdb
 from src.common.features import segmentation_features
-from src.segmentation.train import train_kmeans
+from src.common.tables import read_frame, write_table
 
 BRONZE = Path("/app/data/bronze")
 GOLD = Path("/app/data/gold")
 FEATS = GOLD / "segmentation_features.parquet"
 
 @task
-def build_features():
-    customers = pd.read_parquet(BRONZE / "customers.parquet")
-    transactions = pd.read_parquet(BRONZE / "transactions.parquet")
-    feats = segmentation_features(customers, transactions)
-    FEATS.parent.mkdir(parents=True, exist_ok=True)
-    feats.to_parquet(FEATS, index=False)
+def build_features(feature_backend: str | None = None):
+    customers = read_frame(BRONZE / "customers.parquet")
+    if features_duckdb.feature_backend(feature_backend) == "duckdb":
+        feats = features_duckdb.segmentation_features(customers, BRONZE / "transactions.parquet")
+    else:
+        feats = segmentation_features(customers, read_frame(BRONZE / "transactions.parquet"))
+    write_table(feats, FEATS)
+    materialize(feats, FEATS.stem, key="customer_id")
+    return feats
 
 @task
-def train():
-    train_kmeans(str(FEATS), k=6)
+def train(feats: pd.DataFrame | None = None, tune: bool = False, mode: str = "full"):
+    # mlflow + sklearn, loaded on first use
+    from src.segmentation.train import train_kmeans
+    from src.segmentation.train_kmeans_pyfunc import train_segmentation_minibatch
+    if mode == "minibatch":
+        # streamed mini-batch updates from the parquet file, warm-started from the Production centroids
+        train_segmentation_minibatch(str(FEATS), k=6)
+    else:
+        train_kmeans(feats if feats is not None else str(FEATS), k=6, tune=tune)
 
 @flow(name="segmentation_train")
-def run():
-    build_features()
-    train()
+def run(tune: bool = False, mode: str = "full", feature_backend: str | None = None):
+    feats = build_features(feature_backend)
+    train(feats, tune=tune, mode=mode)
 
 if __name__ == "__main__":
     run()
@@ -1,13 +1,14 @@
 # prefect_flows/train_flow.py
 from prefect import flow, task
-import mlflow, mlflow.sklearn
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import mean_absolute_percentage_error
-from sklearn.ensemble import RandomForestRegressor
 import pandas as pd
 from pathlib import Path
-import os
-from mlflow.tracking import MlflowClient
+from src.common.mlflow_client import client, configure
+from src.common.schemas import CLV_FEATURES
+from src.common.tuning import tune_model, load_params
+from src.common.estimators import default_params, estimator_class, make_estimator
+from src.common.tree_runtime import log_flat_model
+from src.common.tables import read_frame
+from src.monitoring.task_profiler import profiled
 
 FEATURES_PATH = Path("/app/data/gold/clv_features.parquet")
 REGISTERED_MODEL_NAME = "clv_model"
@@ -15,73 +16,75 @@ ARTIFACT_PATH = "model"
 
 
 @task
+@profiled
 def set_mlflow():
-    tracking_uri = os.environ.get("MLFLOW_TRACKING_URI", "http://mlflow:5000")
-    mlflow.set_tracking_uri(tracking_uri)
-    mlflow.set_experiment("clv_experiment")
+    configure("clv_experiment")
 
 
 @task
+@profiled
 def load_features() -> pd.DataFrame:
-    return pd.read_parquet(FEATURES_PATH)
+    return read_frame(FEATURES_PATH)
 
 
 @task
-def train_and_register(df: pd.DataFrame) -> float:
+@profiled
+def train_and_register(df: pd.DataFrame, params: dict | None = None, tune: bool = False,
+                       backend: str = "rf") -> float:
+    # mlflow / sklearn load when training starts, not when the flow module is imported
+    import mlflow
+    from sklearn.model_selection import train_test_split
+    from sklearn.metrics import mean_absolute_percentage_error
+    from src.common.registry import log_and_register, log_batch
+
     df = df.copy()
 
     # Target engineered in features: clv_180d
     y = df["clv_180d"].astype(float)
 
-    # Selected features
-    features = [
-        "recency_days", "tx_count", "monetary", "avg_discount", "avg_quantity",
-        "premium_tx_share", "events_view_count", "events_add_to_cart_count",
-        "events_purchase_count", "avg_session_duration_sec", "age", "is_male", "loyalty_level"
-    ]
-    X = df[features].fillna(0.0)
+    # Selected features (shared with the API so serving column order matches training)
+    X = df[CLV_FEATURES].fillna(0.0)
 
     X_train, X_test, y_train, y_test = train_test_split(
         X, y, test_size=0.2, random_state=42
     )
 
-    with mlflow.start_run(run_name="clv_rf_baseline") as run:
-        model = RandomForestRegressor(n_estimators=200, random_state=42, n_jobs=-1)
+    run_name = "clv_rf_baseline" if backend == "rf" else f"clv_{backend}"
+    with mlflow.start_run(run_name=run_name) as run:
+        params = dict(params or {})
+        if tune:
+            # search space in params/clv.yaml; trials are logged to this run, the winner is registered below
+            params.update(tune_model("clv", estimator_class("regression", backend), X_train, y_train,
+                                     metric="mape", backend=backend,
+                                     base_params={**default_params("regression", backend), **params}))
+        model = make_estimator("regression", backend, params)
         model.fit(X_train, y_train)
         preds = model.predict(X_test)
         mape = mean_absolute_percentage_error(y_test, preds)
 
-        # Log metrics/params
-        mlflow.log_metric("mape", float(mape))
-        mlflow.log_params({"n_estimators": 200, "model": "RandomForestRegressor"})
-
-        # --- Classic model logging & registration (compatible with older servers) ---
-        # 1) Log the model artifacts under an artifact path
-        mlflow.sklearn.log_model(sk_model=model, artifact_path=ARTIFACT_PATH)
-
-        # 2) Build the runs URI for the just-logged artifact
-        run_id = run.info.run_id
-        model_uri = f"runs:/{run_id}/{ARTIFACT_PATH}"
-
-        # 3) Register the model version using the classic Registry API
-        mv = mlflow.register_model(model_uri, name=REGISTERED_MODEL_NAME)
+        # metrics + params in one request
+        log_batch(run.info.run_id, metrics={"mape": mape},
+                  params={**model.get_params(), "model": type(model).__name__, "backend": backend})
 
-        # Optionally attach a description / tags
-        client = MlflowClient()
-        client.set_registered_model_tag(REGISTERED_MODEL_NAME, "use_case", "CLV")
+        # compressed model dir, parallel multipart upload to the artifact store, one create_model_version call;
+        # MODEL_ARTIFACT_FORMAT=sklearn keeps the plain sklearn flavor
+        mv = log_and_register(model, REGISTERED_MODEL_NAME, run, artifact_path=ARTIFACT_PATH,
+                              model_tags={"use_case": "CLV"})
+        # flattened node arrays for the API's low-latency scoring path (rf backend only)
+        log_flat_model(model, CLV_FEATURES)
+        print(f"[train_clv] registered {REGISTERED_MODEL_NAME} v{mv.version}")
 
         return mape
 
 
 @task
+@profiled
 def promote_to_production():
-    client = MlflowClient()
-    versions = client.search_model_versions(f"name='{REGISTERED_MODEL_NAME}'")
-    if not versions:
+    from src.common.registry import latest_version
+    latest = latest_version(REGISTERED_MODEL_NAME)
+    if latest is None:
         return
-    # Get the latest version
-    latest = sorted(versions, key=lambda v: int(v.version), reverse=True)[0]
-    client.transition_model_version_stage(
+    client().transition_model_version_stage(
         name=REGISTERED_MODEL_NAME,
         version=latest.version,
         stage="Production",
@@ -90,10 +93,11 @@ def promote_to_production():
 
 
 @flow(name="train_clv")
-def train_clv_flow():
+def train_clv_flow(tune: bool = False, backend: str | None = None):
     set_mlflow()
     df = load_features()
-    mape = train_and_register(df)
+    backend = backend or load_params("clv").get("backend", "rf")
+    mape = train_and_register(df, tune=tune, backend=backend)
     print(f"CLV MAPE: {mape:.4f}")
     promote_to_production()
 
@@ -0,0 +1,76 @@
+"""
+Columnar request/response handling for the bulk scoring routes (`POST /score/clv/bulk`, `/score/propensity/bulk`).
+
+Request body: an Arrow IPC stream (Content-Type: application/vnd.apache.arrow.stream) or a Parquet file
+(application/vnd.apache.parquet) holding an id column plus one column per model feature, in any order; extra
+columns are ignored. Validation is column-wise: missing id / feature columns or columns that cannot be cast to
+float64 fail the whole request with 422, nulls become 0.0 like in batch scoring.
+Response: id + score columns as an Arrow IPC stream, or Parquet when the Accept header asks for it; the schema
+metadata names the model and run that produced the scores.
+"""
+import io
+
+import numpy as np
+from fastapi import HTTPException, Response
+
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+PARQUET = "application/vnd.apache.parquet"
+PARQUET_ALIASES = (PARQUET, "application/x-parquet", "application/parquet")
+
+
+def _media(header: str) -> list[str]:
+    return [part.split(";")[0].strip().lower() for part in (header or "").split(",") if part.strip()]
+
+
+def read_table(body: bytes, content_type: str):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    media = _media(content_type)
+    try:
+        if ARROW_STREAM in media:
+            return pa.ipc.open_stream(pa.BufferReader(body)).read_all()
+        if any(m in PARQUET_ALIASES for m in media):
+            return pq.read_table(pa.BufferReader(body))
+    except (pa.ArrowInvalid, OSError) as ex:
+        raise HTTPException(status_code=422, detail=f"unreadable {media[0]} body: {ex}")
+    raise HTTPException(status_code=415, detail=f"send {ARROW_STREAM} or {PARQUET}, got {content_type or 'nothing'}")
+
+
+def feature_matrix(table, features: list[str]) -> np.ndarray:
+    """
+    [n_rows, n_features] float64 matrix in `features` order, one cast + null fill per column.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    missing = [c for c in features if c not in table.column_names]
+    if missing:
+        raise HTTPException(status_code=422, detail=f"missing feature columns: {missing}")
+    X = np.empty((table.num_rows, len(features)), dtype=np.float64, order="F")
+    for j, name in enumerate(features):
+        try:
+            col = pc.fill_null(pc.cast(table[name], pa.float64()), 0.0)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as ex:
+            raise HTTPException(status_code=422, detail=f"column {name} is not numeric: {ex}")
+        X[:, j] = col.to_numpy()
+    return np.ascontiguousarray(X)
+
+
+def id_column(table, id_col: str):
+    import pyarrow as pa
+    if id_col not in table.column_names:
+        raise HTTPException(status_code=422, detail=f"missing id column {id_col}")
+    return table[id_col].cast(pa.string())
+
+
+def encode(ids, id_col: str, score_col: str, scores: np.ndarray, accept: str, metadata: dict) -> Response:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    table = pa.table({id_col: ids, score_col: pa.array(np.asarray(scores, dtype=np.float64))})
+    table = table.replace_schema_metadata({k: str(v) for k, v in metadata.items()})
+    sink = io.BytesIO()
+    if any(m in PARQUET_ALIASES for m in _media(accept)):
+        pq.write_table(table, sink, compression="none")
+        return Response(content=sink.getvalue(), media_type=PARQUET)
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return Response(content=sink.getvalue(), media_type=ARROW_STREAM)
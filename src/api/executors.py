@@ -0,0 +1,118 @@
+"""
+Per-model bounded execution pools for the scoring routers.
+
+Each router submits its synchronous handler to its own pool with SCORE_WORKERS_<POOL> threads and at most
+SCORE_QUEUE_<POOL> requests waiting. Without a per-pool variable, a size given to BoundedPool wins, then the global
+SCORE_WORKERS / SCORE_QUEUE. Requests that find the pool full are not queued. In "reject" mode (SCORE_OVERLOAD / SCORE_OVERLOAD_<POOL>) they get a 429 with a Retry-After
+estimated from recent service times. In "fallback" mode they get the router's default response. Scoring never
+runs on Starlette's shared threadpool or the event loop, so /health and /metrics stay responsive under load.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import math
+import os
+import threading
+import time
+
+from fastapi import HTTPException
+from prometheus_client import Counter, Gauge
+
+shed_total = Counter("api_requests_shed_total", "Scoring requests shed because the model pool was full", ["pool", "mode"])
+inflight_g = Gauge("api_pool_inflight", "Scoring requests running or queued per model pool", ["pool"])
+
+
+def _setting(name: str, pool: str, explicit, default: str) -> str:
+    # SCORE_*_<POOL>, then the constructor argument, then SCORE_*, then the built-in default
+    per_pool = os.environ.get(f"{name}_{pool.upper()}")
+    if per_pool is not None:
+        return per_pool
+    return str(explicit) if explicit is not None else os.environ.get(name, default)
+
+
+class Overloaded(Exception):
+    def __init__(self, pool: str, retry_after: int):
+        super().__init__(f"{pool} pool full")
+        self.pool, self.retry_after = pool, retry_after
+
+
+class BoundedPool:
+    def __init__(self, name: str, workers: int | None = None, queue_depth: int | None = None,
+                 overload: str | None = None):
+        self.name = name
+        self.workers = int(_setting("SCORE_WORKERS", name, workers, "2"))
+        self.queue_depth = int(_setting("SCORE_QUEUE", name, queue_depth, "16"))
+        self.overload = _setting("SCORE_OVERLOAD", name, overload, "reject")   # reject | fallback
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=f"score-{name}")
+        self._slots = threading.BoundedSemaphore(self.workers + self.queue_depth)
+        self._inflight = 0
+        self._service_s = 0.005   # EWMA of handler time, for Retry-After
+        self._lock = threading.Lock()
+
+    def retry_after(self) -> int:
+        # time to drain what is already admitted, at least a second
+        with self._lock:
+            backlog = self._inflight / self.workers
+            return max(1, math.ceil(backlog * self._service_s))
+
+    def _timed(self, fn, args):
+        t0 = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            dt = time.perf_counter() - t0
+            with self._lock:
+                self._service_s = 0.9 * self._service_s + 0.1 * dt
+
+    def admit(self) -> None:
+        """
+        Take a slot, or raise Overloaded when workers and queue are all taken. Pair with submit() or release().
+        """
+        if not self._slots.acquire(blocking=False):
+            raise Overloaded(self.name, self.retry_after())
+        with self._lock:
+            self._inflight += 1
+        inflight_g.labels(pool=self.name).inc()
+
+    def release(self, _=None) -> None:
+        with self._lock:
+            self._inflight -= 1
+        inflight_g.labels(pool=self.name).dec()
+        self._slots.release()
+
+    async def submit(self, fn, *args):
+        """
+        Run fn(*args) on an admitted slot; the slot is held until fn finishes, even if the client disconnects first.
+        """
+        fut = self._executor.submit(self._timed, fn, args)
+        fut.add_done_callback(self.release)
+        return await asyncio.wrap_future(fut)
+
+    async def run(self, fn, *args):
+        """
+        Run fn(*args) on this pool; raises Overloaded instead of waiting when workers and queue are all taken.
+        """
+        self.admit()
+        return await self.submit(fn, *args)
+
+
+async def run_bounded(pool: BoundedPool, fn, *args, fallback=None, prepare=None):
+    """
+    Route helper: fn(*args) on `pool`. When the pool is full, returns fallback() in "fallback" mode, otherwise
+    raises HTTP 429 with a Retry-After hint. `prepare` (an async callable, e.g. request.body) is awaited only once
+    a slot is held and its result is passed as fn's first argument, so shed requests are never buffered.
+    """
+    try:
+        pool.admit()
+    except Overloaded as ex:
+        shed_total.labels(pool=pool.name, mode=pool.overload).inc()
+        if pool.overload == "fallback" and fallback is not None:
+            return fallback()
+        raise HTTPException(status_code=429, detail=f"{ex.pool} scoring is at capacity; retry later",
+                            headers={"Retry-After": str(ex.retry_after)})
+    if prepare is not None:
+        try:
+            args = (await prepare(), *args)
+        except BaseException:
+            pool.release()
+            raise
+    return await pool.submit(fn, *args)
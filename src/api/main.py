@@ -15,12 +15,13 @@ app.include_router(recommend.router, prefix="/recommend")
 app.include_router(pricing.router, prefix="/price")
 app.include_router(segmentation.router, prefix="/segment")
 
+# async on purpose: served on the event loop, never queued behind scoring pools (src/api/executors.py)
 @app.get("/health")
-def health():
+async def health():
     requests_total.labels(endpoint="/health").inc()
     return {"status": "ok"}
 
 @app.get("/metrics")
-def metrics():
+async def metrics():
     data = generate_latest()
     return Response(content=data, media_type=CONTENT_TYPE_LATEST)
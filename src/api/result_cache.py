@@ -0,0 +1,86 @@
+"""
+Bounded LRU + TTL cache of live model outputs for the deterministic scoring routers.
+
+A prediction is a pure function of (model, version, feature vector), so the key is a hash of exactly that: the
+model name, the loaded run id and the feature values in schema order as float64 (ints and floats with the same
+value hash alike, missing features hash as NaN). Routers clear their cache whenever they load a model, so a swap
+never serves stale scores. Size from RESULT_CACHE_SIZE (entries per model, default 100000; 0 disables), lifetime
+from RESULT_CACHE_TTL_S (default 3600).
+"""
+from collections import OrderedDict
+import hashlib
+import os
+import threading
+import time
+
+import numpy as np
+from prometheus_client import Counter, Gauge
+
+hits_total = Counter("api_result_cache_hits_total", "Result cache hits", ["cache"])
+misses_total = Counter("api_result_cache_misses_total", "Result cache misses", ["cache"])
+evictions_total = Counter("api_result_cache_evictions_total", "Result cache evictions", ["cache", "reason"])
+size_g = Gauge("api_result_cache_size", "Entries in the result cache", ["cache"])
+hit_ratio_g = Gauge("api_result_cache_hit_ratio", "Hits / lookups since the last model load", ["cache"])
+
+
+class ResultCache:
+    def __init__(self, name: str, features: list[str], maxsize: int | None = None, ttl_s: float | None = None):
+        self.name = name
+        self.features = list(features)
+        self.maxsize = int(os.environ.get("RESULT_CACHE_SIZE", "100000")) if maxsize is None else maxsize
+        self.ttl_s = float(os.environ.get("RESULT_CACHE_TTL_S", "3600")) if ttl_s is None else ttl_s
+        self._entries: OrderedDict[bytes, tuple[float, object]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = self._lookups = 0
+
+    def key(self, version, features: dict) -> bytes:
+        values = np.array([features.get(c, np.nan) for c in self.features], dtype=np.float64)
+        h = hashlib.blake2b(digest_size=16)
+        h.update(f"{self.name}|{version}|".encode())
+        h.update(values.tobytes())
+        return h.digest()
+
+    def get(self, key: bytes):
+        """
+        Cached value or None; refreshes the entry's LRU position, drops it if expired.
+        """
+        if self.maxsize <= 0:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            self._lookups += 1
+            hit = self._entries.get(key)
+            if hit is not None and now - hit[0] > self.ttl_s:
+                del self._entries[key]
+                evictions_total.labels(cache=self.name, reason="ttl").inc()
+                hit = None
+            if hit is not None:
+                self._entries.move_to_end(key)
+                self._hits += 1
+            ratio, size = self._hits / self._lookups, len(self._entries)
+        (hits_total if hit is not None else misses_total).labels(cache=self.name).inc()
+        hit_ratio_g.labels(cache=self.name).set(ratio)
+        size_g.labels(cache=self.name).set(size)
+        return None if hit is None else hit[1]
+
+    def put(self, key: bytes, value) -> None:
+        if self.maxsize <= 0:
+            return
+        evicted = 0
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                evicted += 1
+            size = len(self._entries)
+        if evicted:
+            evictions_total.labels(cache=self.name, reason="lru").inc(evicted)
+        size_g.labels(cache=self.name).set(size)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._hits = self._lookups = 0
+        size_g.labels(cache=self.name).set(0)
+        hit_ratio_g.labels(cache=self.name).set(0)
@@ -1,38 +1,94 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel
-import time, os
-import pandas as pd
+import time
+from api import bulk
+from api.executors import BoundedPool, run_bounded
+from api.result_cache import ResultCache
+from common.feature_store import OnlineFeatureStore
+from common.mlflow_client import load_pyfunc, resolve
+from common.shared_arrays import share_model, sharing_enabled
+from common.schemas import CLV_FEATURES
+from common.tree_runtime import load_flat_model
 
 router = APIRouter()
 _model = None
+_run_id = None
+_flat = None  # flattened forest of the same run, if it was logged
+_store = OnlineFeatureStore("clv_features")
+_scores = OnlineFeatureStore("clv_model_scores", hash_index=True)  # written by batch_score_flow
+_pool = BoundedPool("clv")
+_bulk_pool = BoundedPool("clv_bulk", workers=1, queue_depth=2)  # whole-table requests, memory-bound
+_cache = ResultCache("clv", CLV_FEATURES)
 
 class CLVRequest(BaseModel):
     customer_id: str
-    features: dict
+    features: dict | None = None  # omit to look up the customer's features in the online store
 
 @router.on_event("startup")
 def load_model():
-    global _model
+    global _model, _run_id, _flat
+    _cache.clear()
     try:
-        import mlflow
-        import mlflow.pyfunc as pyfunc
-        mlflow.set_tracking_uri(os.environ.get("MLFLOW_TRACKING_URI", "http://mlflow:5000"))
-        _model = pyfunc.load_model("models:/clv_model/Production")
-        print("Loaded MLflow model: models:/clv_model/Production")
+        ref = resolve("clv_model")
+        if ref is None:
+            raise LookupError("no Production version of clv_model")
+        _run_id = ref.run_id
+        _flat = load_flat_model(_run_id)
+        if _flat is not None and share_model(_flat, "clv_model-flat", ref.version):
+            # the shared flat arrays serve every request; skip this worker's private copy of the forest
+            _model = None
+        else:
+            _model, ref = load_pyfunc("clv_model")
+        print(f"Loaded MLflow model: clv_model v{ref.version} (flat runtime: {_flat is not None}, "
+              f"shared: {sharing_enabled()})")
     except Exception as e:
         print(f"Could not load MLflow model: {e}")
         _model = None
+    if not _store.load():
+        print("Online feature store clv_features not materialized yet")
+    _scores.load()
 
 @router.post("/")
-def score(payload: CLVRequest):
+async def score(payload: CLVRequest):
     start = time.time()
+    # shed load with the same default the handler falls back to on errors
+    overloaded = lambda: _respond(payload.customer_id, float((payload.features or {}).get("monetary", 0.0)), False,
+                                  "overloaded", "fallback", start)
+    return await run_bounded(_pool, _score, payload, start, fallback=overloaded)
+
+def _score(payload: CLVRequest, start: float):
+    features = payload.features
+    source = "live"
     try:
-        if _model is None:
+        # Known customer, no overrides: serve the precomputed score of the loaded model version
+        hit = None
+        if features is None and _run_id is not None:
+            _scores.maybe_refresh()
+            hit = _scores.get_if(payload.customer_id, ["clv_180d"], run_id=_run_id)
+        if hit is not None:
+            return _respond(payload.customer_id, hit["clv_180d"], True, None, "batch", start)
+        if features is None:
+            _store.maybe_refresh()
+            features = _store.get(payload.customer_id, CLV_FEATURES)
+            if features is None:
+                features = {}
+                raise LookupError(f"customer_id {payload.customer_id} not in online feature store; send features")
+        if _model is None and _flat is None:
             raise RuntimeError("Model not loaded. Ensure clv_model is in Production and restart API.")
 
-        # Coerce to DataFrame for pyfunc
-        X = pd.DataFrame([payload.features])
-        pred = _model.predict(X)[0]
+        key = _cache.key(_run_id, features)
+        pred = _cache.get(key)
+        if pred is not None:
+            source = "cache"
+        else:
+            if _flat is not None:
+                pred = _flat.predict(_flat.row(features))[0]
+            else:
+                # Coerce to DataFrame for pyfunc (pandas is already loaded by mlflow when _model is set)
+                import pandas as pd
+                X = pd.DataFrame([features])
+                pred = _model.predict(X)[0]
+            _cache.put(key, float(pred))
         clv = float(pred)
         ok = True
         err = None
@@ -40,8 +96,35 @@ def score(payload: CLVRequest):
         ok = False
         err = str(ex)
         # Fallback: return monetary if provided, else 0
-        clv = float(payload.features.get("monetary", 0.0))
+        clv = float(features.get("monetary", 0.0))
+        source = "fallback"
+    return _respond(payload.customer_id, clv, ok, err, source, start)
+
+@router.post("/bulk")
+async def score_bulk(request: Request):
+    """
+    Columnar bulk scoring: Arrow IPC stream / Parquet of customer_id + CLV_FEATURES in, customer_id + clv_180d out
+    (see api/bulk.py).
+    """
+    # the body is read only once a slot is held, so the pool bounds how many tables are buffered at once
+    return await run_bounded(_bulk_pool, _score_bulk, request.headers.get("content-type", ""),
+                             request.headers.get("accept", ""), prepare=request.body)
+
+def _score_bulk(body: bytes, content_type: str, accept: str):
+    if _model is None and _flat is None:
+        raise HTTPException(status_code=503, detail="clv_model not loaded")
+    table = bulk.read_table(body, content_type)
+    ids = bulk.id_column(table, "customer_id")
+    X = bulk.feature_matrix(table, CLV_FEATURES)
+    # sklearn wins on large batches, the flat runtime when it is the only copy in this worker (shared mode)
+    if _model is not None:
+        import pandas as pd
+        pred = _model.predict(pd.DataFrame(X, columns=CLV_FEATURES))
+    else:
+        pred = _flat.predict(X)
+    return bulk.encode(ids, "customer_id", "clv_180d", pred, accept, {"model": "clv_model", "run_id": _run_id})
 
+def _respond(customer_id: str, clv: float, ok: bool, err: str | None, source: str, start: float):
     latency_ms = (time.time() - start) * 1000.0
     try:
         from api.main import requests_total, score_latency_g
@@ -50,4 +133,4 @@ def score(payload: CLVRequest):
     except Exception:
         pass
 
-    return {"ok": ok, "error": err, "customer_id": payload.customer_id, "clv_180d": clv, "latency_ms": latency_ms}
+    return {"ok": ok, "error": err, "customer_id": customer_id, "clv_180d": clv, "source": source, "latency_ms": latency_ms}
@@ -1,44 +1,84 @@
 from fastapi import APIRouter
 from pydantic import BaseModel
-import os, pandas as pd
-import mlflow, mlflow.pyfunc as pyfunc
+from api.executors import BoundedPool, run_bounded
+from api.result_cache import ResultCache
+from common.feature_store import OnlineFeatureStore
+from common.mlflow_client import load_pyfunc
+from common.schemas import PRICING_FEATURES
 
 router = APIRouter()
 _model = None
+_run_id = None
+_store = OnlineFeatureStore("pricing_features")
+_scores = OnlineFeatureStore("pricing_model_scores", hash_index=True)  # written by batch_score_flow
+_pool = BoundedPool("pricing")
+_cache = ResultCache("pricing", PRICING_FEATURES)  # caches the model's price sensitivity, not the guardrailed price
 
 @router.on_event("startup")
 def load_model():
-    global _model
+    global _model, _run_id
+    _cache.clear()
     try:
-        mlflow.set_tracking_uri(os.environ.get("MLFLOW_TRACKING_URI","http://mlflow:5000"))
-        _model = pyfunc.load_model("models:/pricing_model/Production")
-        print("Loaded pricing_model")
+        _model, ref = load_pyfunc("pricing_model")
+        _run_id = ref.run_id
+        print(f"Loaded pricing_model v{ref.version}")
     except Exception as e:
         print(f"Could not load pricing_model: {e}")
         _model = None
+    if not _store.load():
+        print("Online feature store pricing_features not materialized yet")
+    _scores.load()
 
 class PricingRequest(BaseModel):
     product_id: str
-    features: dict  # {"avg_price":..., "units":..., "revenue":..., "avg_discount":..., "premium_share":...}
+    features: dict | None = None  # {"avg_price":..., "units":..., "revenue":..., "avg_discount":..., "premium_share":...}; omit to look up
     min_price: float | None = None
     max_price: float | None = None
 
+def _suggest(payload: PricingRequest, base: float, sensitivity: float) -> float:
+    # simple rule-of-thumb price suggestion: move opposite sensitivity
+    suggested = max(0.0, base * (1.0 - 0.2 * sensitivity))
+    # apply guardrails
+    if payload.min_price is not None:
+        suggested = max(suggested, payload.min_price)
+    if payload.max_price is not None:
+        suggested = min(suggested, payload.max_price)
+    return suggested
+
 @router.post("/")
-def price(payload: PricingRequest):
-    X = pd.DataFrame([payload.features])
+async def price(payload: PricingRequest):
+    overloaded = lambda: {"product_id": payload.product_id, "ok": False, "error": "overloaded",
+                          "price_suggested": (payload.features or {}).get("avg_price")}
+    return await run_bounded(_pool, _price, payload, fallback=overloaded)
+
+def _price(payload: PricingRequest):
+    features = payload.features
+    if features is None and _run_id is not None:
+        _scores.maybe_refresh()
+        hit = _scores.get_if(payload.product_id, ["price_sensitivity", "avg_price"], run_id=_run_id)
+        if hit is not None:
+            suggested = _suggest(payload, hit["avg_price"], hit["price_sensitivity"])
+            return {"product_id": payload.product_id, "price_suggested": suggested, "ok": True, "source": "batch"}
+    if features is None:
+        _store.maybe_refresh()
+        features = _store.get(payload.product_id, PRICING_FEATURES)
+        if features is None:
+            return {"product_id": payload.product_id, "price_suggested": None, "ok": False,
+                    "error": f"product_id {payload.product_id} not in online feature store; send features"}
     try:
         if _model is not None:
-            sensitivity = float(_model.predict(X)[0])
-            # simple rule-of-thumb price suggestion: move opposite sensitivity
-            base = float(X.get("avg_price", pd.Series([payload.features.get("avg_price", 100.0)])).iloc[0])
-            suggested = max(0.0, base * (1.0 - 0.2 * sensitivity))
-            # apply guardrails
-            if payload.min_price is not None:
-                suggested = max(suggested, payload.min_price)
-            if payload.max_price is not None:
-                suggested = min(suggested, payload.max_price)
-            return {"product_id": payload.product_id, "price_suggested": suggested, "ok": True}
+            import pandas as pd
+            X = pd.DataFrame([features])
+            key = _cache.key(_run_id, features)
+            sensitivity = _cache.get(key)
+            source = "cache" if sensitivity is not None else "live"
+            if sensitivity is None:
+                sensitivity = float(_model.predict(X)[0])
+                _cache.put(key, sensitivity)
+            base = float(X.get("avg_price", pd.Series([features.get("avg_price", 100.0)])).iloc[0])
+            suggested = _suggest(payload, base, sensitivity)
+            return {"product_id": payload.product_id, "price_suggested": suggested, "ok": True, "source": source}
         else:
-            return {"product_id": payload.product_id, "price_suggested": payload.features.get("avg_price", 100.0), "ok": False, "error": "model_not_loaded"}
+            return {"product_id": payload.product_id, "price_suggested": features.get("avg_price", 100.0), "ok": False, "error": "model_not_loaded"}
     except Exception as ex:
-        return {"product_id": payload.product_id, "price_suggested": payload.features.get("avg_price", 100.0), "ok": False, "error": str(ex)}
+        return {"product_id": payload.product_id, "price_suggested": features.get("avg_price", 100.0), "ok": False, "error": str(ex)}
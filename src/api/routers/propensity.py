@@ -1,37 +1,117 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel
-import os, pandas as pd
-import mlflow.pyfunc as pyfunc
-import mlflow
+from api import bulk
+from api.executors import BoundedPool, run_bounded
+from api.result_cache import ResultCache
+from common.batch_inference import positive_score_fn
+from common.feature_store import OnlineFeatureStore
+from common.mlflow_client import load_pyfunc, resolve
+from common.shared_arrays import share_model, sharing_enabled
+from common.schemas import CAMPAIGN_FEATURES
+from common.tree_runtime import load_flat_model
 
 router = APIRouter()
 _model = None
+_run_id = None
+_flat = None  # flattened forest of the same run, if it was logged
+_store = OnlineFeatureStore("campaign_features")
+_scores = OnlineFeatureStore("campaign_model_scores", hash_index=True)  # written by batch_score_flow
+_pool = BoundedPool("propensity")
+_bulk_pool = BoundedPool("propensity_bulk", workers=1, queue_depth=2)  # whole-table requests, memory-bound
+_cache = ResultCache("propensity", CAMPAIGN_FEATURES)
 
 @router.on_event("startup")
 def load_model():
-    global _model
+    global _model, _run_id, _flat
+    _cache.clear()
     try:
-        mlflow.set_tracking_uri(os.environ.get("MLFLOW_TRACKING_URI","http://mlflow:5000"))
-        _model = pyfunc.load_model("models:/campaign_model/Production")
-        print("Loaded campaign_model")
+        ref = resolve("campaign_model")
+        if ref is None:
+            raise LookupError("no Production version of campaign_model")
+        _run_id = ref.run_id
+        _flat = load_flat_model(_run_id)
+        if _flat is not None and share_model(_flat, "campaign_model-flat", ref.version):
+            # the shared flat arrays serve every request; skip this worker's private copy of the forest
+            _model = None
+        else:
+            _model, ref = load_pyfunc("campaign_model")
+            # compressed-joblib versions wrap the estimator; use it directly so predict_proba is available
+            try:
+                _model = _model.unwrap_python_model().model
+            except Exception:
+                pass  # sklearn-flavor version: pyfunc wrapper stays
+        print(f"Loaded campaign_model v{ref.version} (flat runtime: {_flat is not None}, shared: {sharing_enabled()})")
     except Exception as e:
         print(f"Could not load campaign_model: {e}")
         _model = None
+    if not _store.load():
+        print("Online feature store campaign_features not materialized yet")
+    _scores.load()
 
 class PropensityRequest(BaseModel):
     customer_id: str
-    features: dict
+    features: dict | None = None  # omit to look up the customer's features in the online store
 
 @router.post("/")
-def score(payload: PropensityRequest):
-    X = pd.DataFrame([payload.features])
+async def score(payload: PropensityRequest):
+    overloaded = lambda: {"customer_id": payload.customer_id, "prob_response": 0.5, "ok": False,
+                          "error": "overloaded", "source": "fallback"}
+    return await run_bounded(_pool, _score, payload, fallback=overloaded)
+
+def _score(payload: PropensityRequest):
+    source = "live"
     try:
-        if _model is not None:
+        features = payload.features
+        if features is None and _run_id is not None:
+            _scores.maybe_refresh()
+            hit = _scores.get_if(payload.customer_id, ["prob_response"], run_id=_run_id)
+            if hit is not None:
+                return {"customer_id": payload.customer_id, "prob_response": hit["prob_response"], "ok": True,
+                        "error": None, "source": "batch"}
+        if features is None:
+            _store.maybe_refresh()
+            features = _store.get(payload.customer_id, CAMPAIGN_FEATURES)
+            if features is None:
+                raise LookupError(f"customer_id {payload.customer_id} not in online feature store; send features")
+        key = _cache.key(_run_id, features)
+        prob = _cache.get(key)
+        if prob is not None:
+            ok, err, source = True, None, "cache"
+        elif _flat is not None:
+            prob, ok, err = float(_flat.positive_proba(_flat.row(features))[0]), True, None
+        elif _model is not None:
+            import pandas as pd
+            X = pd.DataFrame([features])
             prob = float(_model.predict_proba(X)[0,1]) if hasattr(_model, "predict_proba") else float(_model.predict(X)[0])
             ok, err = True, None
         else:
             prob, ok, err = 0.5, False, "model_not_loaded"
+        if ok and source == "live":
+            _cache.put(key, prob)
     except Exception as ex:
         prob, ok, err = 0.5, False, str(ex)
-    return {"customer_id": payload.customer_id, "prob_response": prob, "ok": ok, "error": err}
+    return {"customer_id": payload.customer_id, "prob_response": prob, "ok": ok, "error": err,
+            "source": source if ok else "fallback"}
+
+@router.post("/bulk")
+async def score_bulk(request: Request):
+    """
+    Columnar bulk scoring: Arrow IPC stream / Parquet of customer_id + CAMPAIGN_FEATURES in, customer_id +
+    prob_response out (see api/bulk.py).
+    """
+    # the body is read only once a slot is held, so the pool bounds how many tables are buffered at once
+    return await run_bounded(_bulk_pool, _score_bulk, request.headers.get("content-type", ""),
+                             request.headers.get("accept", ""), prepare=request.body)
 
+def _score_bulk(body: bytes, content_type: str, accept: str):
+    if _model is None and _flat is None:
+        raise HTTPException(status_code=503, detail="campaign_model not loaded")
+    table = bulk.read_table(body, content_type)
+    ids = bulk.id_column(table, "customer_id")
+    X = bulk.feature_matrix(table, CAMPAIGN_FEATURES)
+    if _model is not None:
+        import pandas as pd
+        prob = positive_score_fn(_model)(pd.DataFrame(X, columns=CAMPAIGN_FEATURES))
+    else:
+        prob = _flat.positive_proba(X)
+    return bulk.encode(ids, "customer_id", "prob_response", prob, accept, {"model": "campaign_model", "run_id": _run_id})
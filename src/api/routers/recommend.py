@@ -1,34 +1,74 @@
 # src/api/routers/recommend.py
 from fastapi import APIRouter
 from pydantic import BaseModel
-import os, pandas as pd
-import mlflow, mlflow.pyfunc as pyfunc
+from api.executors import BoundedPool, run_bounded
+from common.mlflow_client import load_pyfunc
+from common.shared_arrays import share_model
 
 router = APIRouter()
 _model = None
+_fallback = None  # co-occurrence + popularity tiers (recommender_fallback_model), unwrapped
+_pool = BoundedPool("recommend")
 
 class RecommendRequest(BaseModel):
     customer_id: str
     k: int = 5
+    recent_items: list[str] | None = None  # a few product_ids; lets the model fold in customers it has not seen
 
 @router.on_event("startup")
 def load_model():
-    global _model
+    global _model, _fallback
     try:
-        mlflow.set_tracking_uri(os.environ.get("MLFLOW_TRACKING_URI","http://mlflow:5000"))
-        _model = pyfunc.load_model("models:/recommender_als_model/Production")
-        print("Loaded recommender_als_model")
+        _model, ref = load_pyfunc("recommender_als_model")
+        shared = share_model(_model.unwrap_python_model(), "recommender_als_model", ref.version)
+        print(f"Loaded recommender_als_model v{ref.version} ({shared / 2**20:.0f} MB shared)")
     except Exception as e:
         print(f"Could not load recommender model: {e}")
         _model = None
+    try:
+        model, ref = load_pyfunc("recommender_fallback_model")
+        _fallback = model.unwrap_python_model()
+        share_model(_fallback, "recommender_fallback_model", ref.version)
+        print(f"Loaded recommender_fallback_model v{ref.version}")
+    except Exception as e:
+        print(f"Could not load recommender fallback model: {e}")
+        _fallback = None
+
+def _popular(payload: RecommendRequest):
+    # shed load to the cheapest tier: k precomputed popular items, no scoring
+    if _fallback is None:
+        return {"customer_id": payload.customer_id, "rec_list": [], "ok": False, "error": "overloaded"}
+    recs = [{"product_id": str(_fallback.item_ids[i]), "score": 0.0} for i in _fallback.popular_top(payload.k)]
+    return {"customer_id": payload.customer_id, "rec_list": recs, "ok": True, "tier": "popularity"}
 
 @router.post("/")
-def recommend(payload: RecommendRequest):
-    if _model is None:
+async def recommend(payload: RecommendRequest):
+    return await run_bounded(_pool, _recommend, payload, fallback=lambda: _popular(payload))
+
+def _recommend(payload: RecommendRequest):
+    """
+    Tiers: ALS for known customers (or folded in from recent_items) -> item co-occurrence from recent purchases
+    -> popularity top-k.
+    """
+    if _model is None and _fallback is None:
         return {"customer_id": payload.customer_id, "rec_list": [], "ok": False, "error": "model_not_loaded"}
-    X = pd.DataFrame([{"customer_id": payload.customer_id, "k": payload.k}])
+    err = None
+    if _model is not None:
+        row = {"customer_id": payload.customer_id, "k": payload.k}
+        if payload.recent_items:
+            row["recent_items"] = payload.recent_items
+        import pandas as pd
+        X = pd.DataFrame([row])
+        try:
+            out = _model.predict(X)[0]["rec_list"]
+            if out or _fallback is None:
+                return {"customer_id": payload.customer_id, "rec_list": out, "ok": True, "tier": "als"}
+        except Exception as ex:
+            err = str(ex)
+    if _fallback is None:
+        return {"customer_id": payload.customer_id, "rec_list": [], "ok": False, "error": err}
     try:
-        out = _model.predict(X)[0]["rec_list"]
-        return {"customer_id": payload.customer_id, "rec_list": out, "ok": True}
+        tier, out = _fallback.recommend(payload.customer_id, payload.k, payload.recent_items)
+        return {"customer_id": payload.customer_id, "rec_list": out, "ok": True, "tier": tier}
     except Exception as ex:
         return {"customer_id": payload.customer_id, "rec_list": [], "ok": False, "error": str(ex)}
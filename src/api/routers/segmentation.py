@@ -1,33 +1,76 @@
 from fastapi import APIRouter
 from pydantic import BaseModel
-import os, pandas as pd
-import mlflow, mlflow.pyfunc as pyfunc
+from api.executors import BoundedPool, run_bounded
+from api.result_cache import ResultCache
+from common.feature_store import OnlineFeatureStore
+from common.mlflow_client import load_pyfunc
+from common.shared_arrays import share_model
+from common.schemas import SEGMENTATION_FEATURES
 
 router = APIRouter()
 _model = None
+_run_id = None
+_store = OnlineFeatureStore("segmentation_features")
+_scores = OnlineFeatureStore("segmentation_model_scores", hash_index=True)  # written by batch_score_flow
+_pool = BoundedPool("segmentation")
+_cache = ResultCache("segmentation", SEGMENTATION_FEATURES)
 
 class SegmentationRequest(BaseModel):
     customer_id: str
-    features: dict
+    features: dict | None = None  # omit to look up the customer's features in the online store
 
 @router.on_event("startup")
 def load_model():
-    global _model
+    global _model, _run_id
+    _cache.clear()
     try:
-        mlflow.set_tracking_uri(os.environ.get("MLFLOW_TRACKING_URI","http://mlflow:5000"))
-        _model = pyfunc.load_model("models:/segmentation_model/Production")
-        print("Loaded segmentation_model")
+        _model, ref = load_pyfunc("segmentation_model")
+        _run_id = ref.run_id
+        try:
+            share_model(_model.unwrap_python_model(), "segmentation_model", ref.version)
+        except Exception as e:
+            print(f"segmentation_model arrays not shared: {e}")
+        print(f"Loaded segmentation_model v{ref.version}")
     except Exception as e:
         print(f"Could not load segmentation_model: {e}")
         _model = None
+    if not _store.load():
+        print("Online feature store segmentation_features not materialized yet")
+    _scores.load()
 
 @router.post("/")
-def segment(payload: SegmentationRequest):
+async def segment(payload: SegmentationRequest):
+    overloaded = lambda: {"customer_id": payload.customer_id, "cluster_id": None, "ok": False, "error": "overloaded"}
+    return await run_bounded(_pool, _segment, payload, fallback=overloaded)
+
+def _segment(payload: SegmentationRequest):
     if _model is None:
         return {"customer_id": payload.customer_id, "cluster_id": None, "ok": False, "error": "model_not_loaded"}
-    X = pd.DataFrame([payload.features])
     try:
-        cluster_id = int(_model.predict(X)[0])
-        return {"customer_id": payload.customer_id, "cluster_id": cluster_id, "ok": True}
+        features = payload.features
+        if features is None and _run_id is not None:
+            _scores.maybe_refresh()
+            hit = _scores.get_if(payload.customer_id, ["cluster_id"], run_id=_run_id)
+            if hit is not None:
+                return {"customer_id": payload.customer_id, "cluster_id": int(hit["cluster_id"]), "ok": True,
+                        "source": "batch"}
+        if features is None:
+            _store.maybe_refresh()
+            features = _store.get(payload.customer_id, SEGMENTATION_FEATURES)
+            if features is None:
+                raise LookupError(f"customer_id {payload.customer_id} not in online feature store; send features")
+        key = _cache.key(_run_id, features)
+        cluster_id = _cache.get(key)
+        if cluster_id is not None:
+            return {"customer_id": payload.customer_id, "cluster_id": cluster_id, "ok": True, "source": "cache"}
+        inner = _model.unwrap_python_model() if hasattr(_model, "unwrap_python_model") else None
+        if hasattr(inner, "assign"):
+            # raw-array model: one small matmul, no DataFrame round trip
+            cluster_id = int(inner.assign([[features.get(c, 0.0) for c in inner.feature_cols]])[0])
+        else:
+            import pandas as pd
+            cluster_id = int(_model.predict(pd.DataFrame([features]))[0])
+        _cache.put(key, cluster_id)
+        return {"customer_id": payload.customer_id, "cluster_id": cluster_id, "ok": True, "source": "live"}
     except Exception as ex:
         return {"customer_id": payload.customer_id, "cluster_id": None, "ok": False, "error": str(ex)}
@@ -0,0 +1,158 @@
+"""
+Time-aware campaign attribution: which campaigns were live, on the customer's channel, when each event happened.
+
+Events carry no channel, so an event is attributed to every campaign whose channel is the customer's
+acquisition_channel and whose window [start_date, end_date] (end day inclusive) contains the event timestamp.
+Per channel the campaign windows are cut into elementary segments at every start/end boundary, each segment keeping
+the list of campaigns live in it (CSR layout); one searchsorted per event then finds all overlapping campaigns
+without a customers x campaigns cross join. Events stream through in chunks and only per-(customer, campaign)
+counts are kept, so memory is bounded by the number of exposed pairs, not by the number of events.
+"""
+import numpy as np
+import pandas as pd
+
+DAY_NS = 86_400 * 10**9
+EVENT_COLUMNS = ["customer_id", "timestamp", "event_type"]
+
+
+def _ns(values) -> np.ndarray:
+    # int64 nanoseconds; NaT becomes int64 min and falls before every window
+    return pd.to_datetime(values).to_numpy(dtype="datetime64[ns]").view(np.int64)
+
+
+def _expand(start: np.ndarray, length: np.ndarray) -> np.ndarray:
+    """
+    Concatenation of the ranges [start[i], start[i] + length[i]) without a Python loop.
+    """
+    length = length.astype(np.int64)
+    return np.repeat(start - np.cumsum(length) + length, length) + np.arange(length.sum())
+
+
+class CampaignWindows:
+    def __init__(self, campaigns: pd.DataFrame):
+        c = campaigns.dropna(subset=["channel", "start_date", "end_date"])
+        start, end = _ns(c["start_date"]), _ns(c["end_date"]) + DAY_NS   # half-open [start, end + 1 day)
+        # campaigns ending before they start are never live; a channel with only those has no campaigns
+        live = end > start
+        c, start, end = c[live].reset_index(drop=True), start[live], end[live]
+        self.campaign_ids = c["campaign_id"].to_numpy()
+        self.channels = sorted(c["channel"].unique())
+        channel = c["channel"].to_numpy()
+        self._segments = []
+        for ch in self.channels:
+            idx = np.flatnonzero(channel == ch)
+            bounds = np.unique(np.concatenate([start[idx], end[idx]]))
+            # campaign i is live in segments [lo_i, hi_i): bounds[s] <= t < bounds[s + 1]
+            lo, hi = np.searchsorted(bounds, start[idx]), np.searchsorted(bounds, end[idx])
+            seg = _expand(lo, hi - lo)
+            order = np.argsort(seg, kind="stable")
+            indptr = np.zeros(len(bounds), dtype=np.int64)
+            np.cumsum(np.bincount(seg, minlength=len(bounds) - 1), out=indptr[1:])
+            self._segments.append((bounds, indptr, np.repeat(idx, hi - lo)[order]))
+
+    def channel_codes(self, channels) -> np.ndarray:
+        """
+        Position of each channel in self.channels, -1 for channels without campaigns.
+        """
+        return pd.Index(self.channels).get_indexer(pd.Series(channels, dtype=object))
+
+    def attribute(self, ts: np.ndarray, channel: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        (event position, campaign position) for every event x campaign live at the event's time on its channel.
+        ts: int64 ns; channel: codes from channel_codes (-1 never matches).
+        """
+        events, camps = [], []
+        for k, (bounds, indptr, members) in enumerate(self._segments):
+            ev = np.flatnonzero(channel == k)
+            if len(ev) == 0 or len(bounds) < 2:
+                continue
+            seg = np.searchsorted(bounds, ts[ev], side="right") - 1
+            inside = (seg >= 0) & (seg < len(bounds) - 1)
+            ev, seg = ev[inside], seg[inside]
+            n = indptr[seg + 1] - indptr[seg]
+            events.append(np.repeat(ev, n))
+            camps.append(members[_expand(indptr[seg], n)])
+        if not events:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        return np.concatenate(events), np.concatenate(camps)
+
+
+def _compact(parts: list) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    keys = np.concatenate([p[0] for p in parts])
+    uniq, inv = np.unique(keys, return_inverse=True)
+    exposures = np.bincount(inv, weights=np.concatenate([p[1] for p in parts]), minlength=len(uniq))
+    responses = np.bincount(inv, weights=np.concatenate([p[2] for p in parts]), minlength=len(uniq))
+    return uniq, exposures, responses
+
+
+def iter_event_chunks(path, batch_rows: int = 1_000_000):
+    """
+    Yield the attribution columns of an events parquet file / partitioned directory as DataFrames, one batch at a time.
+    """
+    import pyarrow.dataset as ds
+    dataset = ds.dataset(path, format="parquet")
+    for batch in dataset.to_batches(columns=EVENT_COLUMNS, batch_size=batch_rows, batch_readahead=1,
+                                    fragment_readahead=1):
+        if batch.num_rows:
+            yield batch.to_pandas()
+
+
+def exposure_counts(customers: pd.DataFrame, campaigns: pd.DataFrame, events, compact_rows: int = 5_000_000,
+                    response_event: str = "purchase") -> pd.DataFrame:
+    """
+    Per (customer_id, campaign_id): exposures = events of the customer inside the campaign window, responses = those
+    of type `response_event`. `events` is a DataFrame or an iterable of DataFrame chunks (see iter_event_chunks);
+    partial counts are merged whenever they exceed `compact_rows` pairs (or twice the merged size).
+    """
+    windows = CampaignWindows(campaigns)
+    cust = customers.drop_duplicates("customer_id")
+    cust_index = pd.Index(cust["customer_id"])
+    cust_channel = windows.channel_codes(cust["acquisition_channel"])
+    n_camp = max(len(windows.campaign_ids), 1)
+
+    merged, parts, pending = None, [], 0
+    for chunk in ([events] if isinstance(events, pd.DataFrame) else events):
+        pos = cust_index.get_indexer(chunk["customer_id"])
+        channel = np.where(pos >= 0, cust_channel[pos], -1)
+        ev, camp = windows.attribute(_ns(chunk["timestamp"]), channel)
+        if len(ev) == 0:
+            continue
+        is_response = (chunk["event_type"].to_numpy() == response_event)[ev]
+        key = pos[ev].astype(np.int64) * n_camp + camp
+        uniq, inv = np.unique(key, return_inverse=True)
+        parts.append((uniq, np.bincount(inv, minlength=len(uniq)).astype(np.float64),
+                      np.bincount(inv, weights=is_response, minlength=len(uniq))))
+        pending += len(uniq)
+        if pending > max(compact_rows, 2 * (0 if merged is None else len(merged[0]))):
+            merged = _compact(parts if merged is None else [merged] + parts)
+            parts, pending = [], 0
+    if parts:
+        merged = _compact(parts if merged is None else [merged] + parts)
+    if merged is None:
+        return pd.DataFrame({"customer_id": cust_index[:0], "campaign_id": windows.campaign_ids[:0],
+                             "exposures": np.empty(0, np.int64), "responses": np.empty(0, np.int64)})
+
+    key, exposures, responses = merged
+    return pd.DataFrame({
+        "customer_id": cust_index[key // n_camp],
+        "campaign_id": windows.campaign_ids[key % n_camp],
+        "exposures": exposures.astype(np.int64),
+        "responses": responses.astype(np.int64),
+    })
+
+
+def customer_exposure_summary(exposure: pd.DataFrame, campaigns: pd.DataFrame) -> pd.DataFrame:
+    """
+    Customer-level roll-up of exposure_counts: campaigns_exposed, exposure_events, campaign_responses and
+    uplift_exposed (exposure-weighted expected_uplift of the campaigns the customer actually saw).
+    """
+    ex = exposure.merge(campaigns[["campaign_id", "expected_uplift"]], on="campaign_id", how="left")
+    ex["weighted_uplift"] = ex["expected_uplift"].fillna(0.0) * ex["exposures"]
+    out = ex.groupby("customer_id").agg(
+        campaigns_exposed=("campaign_id", "nunique"),
+        exposure_events=("exposures", "sum"),
+        campaign_responses=("responses", "sum"),
+        weighted_uplift=("weighted_uplift", "sum"),
+    ).reset_index()
+    out["uplift_exposed"] = out.pop("weighted_uplift") / out["exposure_events"].clip(lower=1)
+    return out
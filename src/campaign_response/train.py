@@ -1,29 +1,44 @@
 import os
-import mlflow, mlflow.sklearn
+import mlflow
 import pandas as pd
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import roc_auc_score
-from sklearn.ensemble import RandomForestClassifier
+from src.common.schemas import CAMPAIGN_FEATURES
+from src.common.tables import as_frame
+from src.common.mlflow_client import configure
+from src.common.tuning import tune_model, load_params
+from src.common.estimators import default_params, estimator_class, make_estimator
+from src.common.tree_runtime import log_flat_model
+from src.common.registry import log_and_register, log_batch
 
-def train_campaign_classifier(feats_path: str, label_path: str = None):
-    mlflow.set_tracking_uri(os.environ.get("MLFLOW_TRACKING_URI", "http://mlflow:5000"))
-    mlflow.set_experiment("campaign_response_experiment")
+def train_campaign_classifier(feats_path, label_path: str = None, params: dict | None = None, tune: bool = False,
+                              backend: str | None = None):
+    configure("campaign_response_experiment")
 
-    df = pd.read_parquet(feats_path).copy()
+    # feats_path: parquet path, DataFrame or pyarrow.Table (flows pass the frame they just built)
+    df = as_frame(feats_path)
     # Create synthetic label if none: conversion proxy from engagement
     if label_path and os.path.exists(label_path):
-        y = pd.read_parquet(label_path)["converted"].astype(int)
+        y = as_frame(label_path, ["converted"])["converted"].astype(int)
     else:
         y = ((df.get("events_purchase_count", 0) > 0).astype(int))
 
-    X = df[["age","is_male","loyalty_level","uplift_mean",
-            "events_view_count","events_add_to_cart_count","events_purchase_count"]].fillna(0.0)
+    X = df[CAMPAIGN_FEATURES].fillna(0.0)
+
+    # estimator backend: rf (default) | hist_gbm | lightgbm | xgboost, see src/common/estimators.py
+    backend = backend or load_params("campaign").get("backend", "rf")
 
     X_train, X_test, y_train, y_test = train_test_split(X, y, stratify=y, test_size=0.2, random_state=42)
-    with mlflow.start_run(run_name="rf_campaign"):
-        model = RandomForestClassifier(n_estimators=300, random_state=42, n_jobs=-1)
+    with mlflow.start_run(run_name="rf_campaign" if backend == "rf" else f"{backend}_campaign") as run:
+        params = dict(params or {})
+        if tune:
+            params.update(tune_model("campaign", estimator_class("classification", backend), X_train, y_train,
+                                     metric="auc", backend=backend,
+                                     base_params={**default_params("classification", backend), **params}))
+        model = make_estimator("classification", backend, params)
         model.fit(X_train, y_train)
         auc = roc_auc_score(y_test, model.predict_proba(X_test)[:,1])
-        mlflow.log_metric("auc", float(auc))
-        mlflow.log_params({"model": "RandomForestClassifier", "n_estimators": 300})
-        mlflow.sklearn.log_model(model, "model", registered_model_name="campaign_model")
+        log_batch(run.info.run_id, metrics={"auc": auc},
+                  params={"model": type(model).__name__, "backend": backend, **model.get_params()})
+        log_flat_model(model, CAMPAIGN_FEATURES)
+        log_and_register(model, "campaign_model", run)
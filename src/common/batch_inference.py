@@ -0,0 +1,80 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+DEFAULT_CHUNK_ROWS = 100_000
+
+
+def chunk_bounds(n_rows: int, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> list[tuple[int, int]]:
+    return [(s, min(s + chunk_rows, n_rows)) for s in range(0, n_rows, chunk_rows)]
+
+
+def map_chunks(fn, X, chunk_rows: int = DEFAULT_CHUNK_ROWS, workers: int = 0) -> list:
+    """
+    Apply `fn` to consecutive row slices of `X` (DataFrame, ndarray or list) on a thread pool and return the
+    per-chunk results in order. Only `workers` chunks are in flight at once, so peak memory stays at a few chunks'
+    worth of intermediates regardless of the table size.
+    """
+    # positional slicing for pandas objects, checked without importing pandas
+    take = (lambda s, e: X.iloc[s:e]) if hasattr(X, "iloc") else (lambda s, e: X[s:e])
+    bounds = chunk_bounds(len(X), chunk_rows)
+    if len(bounds) <= 1 or workers == 1:
+        return [fn(take(s, e)) for s, e in bounds]
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        return list(pool.map(lambda b: fn(take(*b)), bounds))
+
+
+def predict_in_chunks(fn, X, chunk_rows: int = DEFAULT_CHUNK_ROWS, workers: int = 0) -> np.ndarray:
+    """
+    `map_chunks` for predictors returning one value (or row) per input row; the chunks are concatenated.
+    """
+    parts = [np.asarray(p) for p in map_chunks(fn, X, chunk_rows, workers)]
+    return np.concatenate(parts) if parts else np.empty(0)
+
+
+def positive_score_fn(model):
+    """
+    Per-row score function for a loaded model: P(class 1) when it exposes predict_proba, else its prediction.
+    """
+    if hasattr(model, "predict_proba"):
+        return lambda X: model.predict_proba(X)[:, 1]
+    return lambda X: np.asarray(model.predict(X), dtype=np.float64)
+
+
+def single_threaded(model):
+    """
+    Pin sklearn-style estimators to one core; parallelism comes from the chunk pool.
+    """
+    if hasattr(model, "n_jobs"):
+        model.n_jobs = 1
+    return model
+
+
+# --- vectorized reductions over prediction arrays ---
+
+def count_outside(values: np.ndarray, lo: float, hi: float) -> int:
+    values = np.asarray(values, dtype=np.float64)
+    return int(np.count_nonzero((values < lo) | (values > hi)))
+
+
+def catalog_coverage(item_idx: np.ndarray, n_catalog: int) -> float:
+    """
+    Distinct recommended items / catalog size; `item_idx` holds catalog positions, -1 for empty slots.
+    """
+    if n_catalog == 0:
+        return 0.0
+    seen = np.zeros(n_catalog, dtype=bool)
+    idx = np.asarray(item_idx).ravel()
+    seen[idx[idx >= 0]] = True
+    return float(np.count_nonzero(seen)) / n_catalog
+
+
+def mean_novelty(item_idx: np.ndarray, popularity: np.ndarray, floor: float = 1e-9) -> float:
+    """
+    Mean inverse popularity of the recommended items; `popularity` is the normalized share per catalog position.
+    """
+    idx = np.asarray(item_idx).ravel()
+    idx = idx[idx >= 0]
+    if idx.size == 0:
+        return 0.0
+    return float(np.mean(1.0 / np.maximum(popularity[idx], floor)))
@@ -0,0 +1,46 @@
+import importlib
+
+# task -> backend -> (class path, default params). lightgbm/xgboost are optional and imported on first use.
+BACKENDS = {
+    "regression": {
+        "rf": ("sklearn.ensemble:RandomForestRegressor", {"n_estimators": 200, "n_jobs": -1}),
+        "hist_gbm": ("sklearn.ensemble:HistGradientBoostingRegressor", {"max_iter": 300, "learning_rate": 0.1}),
+        "lightgbm": ("lightgbm:LGBMRegressor", {"n_estimators": 300, "learning_rate": 0.05, "n_jobs": -1,
+                                                "verbose": -1}),
+        "xgboost": ("xgboost:XGBRegressor", {"n_estimators": 300, "learning_rate": 0.05, "tree_method": "hist",
+                                             "n_jobs": -1}),
+    },
+    "classification": {
+        "rf": ("sklearn.ensemble:RandomForestClassifier", {"n_estimators": 300, "n_jobs": -1}),
+        "hist_gbm": ("sklearn.ensemble:HistGradientBoostingClassifier", {"max_iter": 300, "learning_rate": 0.1}),
+        "lightgbm": ("lightgbm:LGBMClassifier", {"n_estimators": 300, "learning_rate": 0.05, "n_jobs": -1,
+                                                 "verbose": -1}),
+        "xgboost": ("xgboost:XGBClassifier", {"n_estimators": 300, "learning_rate": 0.05, "tree_method": "hist",
+                                              "n_jobs": -1, "eval_metric": "logloss"}),
+    },
+}
+
+
+def estimator_class(task: str, backend: str = "rf"):
+    try:
+        path, _ = BACKENDS[task][backend]
+    except KeyError:
+        raise ValueError(f"unknown backend {backend!r} for {task}; choose from {sorted(BACKENDS.get(task, {}))}")
+    module, name = path.split(":")
+    try:
+        return getattr(importlib.import_module(module), name)
+    except ImportError as ex:
+        raise ImportError(f"backend {backend!r} needs the {module} package: pip install {module}") from ex
+
+
+def default_params(task: str, backend: str = "rf") -> dict:
+    return dict(BACKENDS[task][backend][1])
+
+
+def make_estimator(task: str, backend: str = "rf", params: dict | None = None, random_state: int = 42):
+    """
+    Instantiate the `backend` estimator for `task` ("regression" | "classification") with its defaults,
+    overridden by `params`.
+    """
+    cls = estimator_class(task, backend)
+    return cls(**{"random_state": random_state, **default_params(task, backend), **(params or {})})
@@ -0,0 +1,163 @@
+from pathlib import Path
+import json
+import os
+import shutil
+import time
+from typing import TYPE_CHECKING
+import numpy as np
+
+if TYPE_CHECKING:
+    import pandas as pd   # only materialize() and hash-indexed stores need it; the API reads arrays
+
+FEATURE_STORE_DIR = Path(os.environ.get("FEATURE_STORE_DIR", "/app/data/online"))
+CURRENT = "CURRENT"
+KEEP_VERSIONS = 2
+
+
+def materialize(df: "pd.DataFrame", name: str, key: str = "customer_id", root: Path = FEATURE_STORE_DIR,
+                version: str | None = None, meta: dict | None = None) -> Path:
+    """
+    Publish the numeric columns of `df` as a key-indexed online store:
+
+      <root>/<name>/<version>/keys.npy    sorted keys (as str)
+      <root>/<name>/<version>/values.npy  float64 block [n_keys, n_columns], row i belongs to keys[i]
+      <root>/<name>/<version>/meta.json   column names + free-form metadata
+      <root>/<name>/CURRENT               name of the live version (swapped atomically with os.replace)
+
+    Readers memory-map the arrays, so a lookup is a binary search plus one contiguous row read.
+    """
+    import pandas as pd
+    base = Path(root) / name
+    version = version or time.strftime("%Y%m%dT%H%M%S") + f".{time.time_ns() % 1_000_000_000:09d}"
+    tmp, final = base / f".{version}.tmp", base / version
+    tmp.mkdir(parents=True, exist_ok=True)
+
+    df = df.drop_duplicates(subset=[key], keep="last")
+    columns = [c for c in df.columns if c != key and (pd.api.types.is_numeric_dtype(df[c])
+                                                       or pd.api.types.is_bool_dtype(df[c]))]
+    keys = df[key].astype(str).to_numpy().astype(str)
+    order = np.argsort(keys, kind="stable")
+    np.save(tmp / "keys.npy", keys[order])
+    np.save(tmp / "values.npy", np.ascontiguousarray(df[columns].to_numpy(dtype=np.float64)[order]))
+    (tmp / "meta.json").write_text(json.dumps({"key": key, "columns": columns, "rows": int(len(keys)),
+                                               "created_at": time.time(), **(meta or {})}))
+    if final.exists():
+        shutil.rmtree(final)
+    os.replace(tmp, final)
+
+    pointer = base / f".{CURRENT}.tmp"
+    pointer.write_text(version)
+    os.replace(pointer, base / CURRENT)
+
+    # old versions can go; readers that still map them keep working until they refresh
+    stale = sorted((p for p in base.iterdir() if p.is_dir() and not p.name.startswith(".")),
+                   key=lambda p: p.stat().st_mtime)[:-KEEP_VERSIONS]
+    for p in stale:
+        shutil.rmtree(p, ignore_errors=True)
+    return final
+
+
+class OnlineFeatureStore:
+    """
+    Read side of `materialize`: memory-mapped, sorted-key lookup by id.
+    `maybe_refresh()` is cheap (at most one stat per `refresh_interval`) and swaps to a newly
+    published version in a single attribute assignment, so concurrent readers never see a mix.
+    With `hash_index=True` single-key lookups go through a hash table built at load time (O(1)
+    instead of a binary search), at the cost of some memory per key.
+    """
+
+    def __init__(self, name: str, root: Path = FEATURE_STORE_DIR, refresh_interval: float = 30.0,
+                 hash_index: bool = False):
+        self.name = name
+        self.base = Path(root) / name
+        self.refresh_interval = refresh_interval
+        self.hash_index = hash_index
+        self._state = None          # (version, keys, values, col_pos, meta, index)
+        self._checked_at = 0.0
+
+    @property
+    def loaded(self) -> bool:
+        return self._state is not None
+
+    @property
+    def version(self) -> str | None:
+        return self._state[0] if self._state else None
+
+    @property
+    def meta(self) -> dict:
+        return self._state[4] if self._state else {}
+
+    def load(self) -> bool:
+        self._checked_at = time.monotonic()
+        try:
+            version = (self.base / CURRENT).read_text().strip()
+        except OSError:
+            return False
+        if self._state and self._state[0] == version:
+            return True
+        path = self.base / version
+        meta = json.loads((path / "meta.json").read_text())
+        keys = np.load(path / "keys.npy", mmap_mode="r")
+        values = np.load(path / "values.npy", mmap_mode="r")
+        index = None
+        if self.hash_index:
+            import pandas as pd
+            index = pd.Index(keys)
+        self._state = (version, keys, values, {c: i for i, c in enumerate(meta["columns"])}, meta, index)
+        return True
+
+    def maybe_refresh(self):
+        if time.monotonic() - self._checked_at >= self.refresh_interval:
+            try:
+                self.load()
+            except Exception as e:
+                print(f"Could not refresh feature store {self.name}: {e}")
+
+    def _row(self, state, key) -> int:
+        keys, index = state[1], state[5]
+        k = str(key)
+        if index is not None:
+            try:
+                return int(index.get_loc(k))
+            except KeyError:
+                return -1
+        i = int(np.searchsorted(keys, k))
+        return i if i < len(keys) and keys[i] == k else -1
+
+    def get(self, key, columns: list[str] | None = None) -> dict | None:
+        """
+        Feature dict for `key` (restricted to/ordered by `columns` if given), or None if unknown.
+        """
+        return self.get_if(key, columns)
+
+    def get_if(self, key, columns: list[str] | None = None, **meta) -> dict | None:
+        """
+        Like get(), but only answers when the live version's meta matches `meta`
+        (e.g. run_id=<run of the loaded model>, so stale score tables are never served).
+        """
+        state = self._state
+        if state is None or any(state[4].get(k) != v for k, v in meta.items()):
+            return None
+        i = self._row(state, key)
+        if i < 0:
+            return None
+        row, col_pos = state[2][i], state[3]
+        cols = columns if columns is not None else list(col_pos)
+        return {c: float(row[col_pos[c]]) if c in col_pos else None for c in cols}
+
+    def get_many(self, keys, columns: list[str]) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Vectorized lookup: returns (found mask, float64 matrix [len(keys), len(columns)]; NaN where missing).
+        """
+        keys = np.asarray(keys).astype(str)
+        out = np.full((len(keys), len(columns)), np.nan)
+        state = self._state
+        if state is None or len(state[1]) == 0:
+            return np.zeros(len(keys), dtype=bool), out
+        skeys, values, col_pos = state[1], state[2], state[3]
+        idx = np.minimum(np.searchsorted(skeys, keys), len(skeys) - 1)
+        found = skeys[idx] == keys
+        src = [col_pos[c] for c in columns if c in col_pos]
+        dst = [j for j, c in enumerate(columns) if c in col_pos]
+        out[np.ix_(found, dst)] = values[idx[found]][:, src]
+        return found, out
@@ -50,9 +50,7 @@ def engagement_features_from_events(events: pd.DataFrame) -> pd.DataFrame:
     ev = events.copy()
     ev["timestamp"] = pd.to_datetime(ev["timestamp"])
 
-    counts = ev.pivot_table(index="customer_id", columns="event_type", values="event_id", aggfunc="count", fill_value=0)
-    counts.columns = [f"events_{c}_count" for c in counts.columns]
-    counts = counts.reset_index()
+    counts = event_type_counts(ev)
 
     # Session duration
     if "session_duration_sec" in ev.columns:
@@ -63,6 +61,15 @@ def engagement_features_from_events(events: pd.DataFrame) -> pd.DataFrame:
 
     return out
 
+def event_type_counts(events: pd.DataFrame) -> pd.DataFrame:
+    """
+    customer_id + one events_<type>_count column per event type (sorted by type), 0 where a customer has none.
+    """
+    counts = events.pivot_table(index="customer_id", columns="event_type", values="event_id", aggfunc="count",
+                                fill_value=0)
+    counts.columns = [f"events_{c}_count" for c in counts.columns]
+    return counts.reset_index()
+
 def join_customer_demographics(customers: pd.DataFrame) -> pd.DataFrame:
     """
     Map demographics & loyalty to numeric features.
@@ -86,7 +93,13 @@ def build_clv_feature_table(
     premium = enrich_with_products(transactions, products)
     engagement = engagement_features_from_events(events)
     demo = join_customer_demographics(customers)
+    return assemble_clv_features(rfm, premium, engagement, demo)
 
+def assemble_clv_features(rfm: pd.DataFrame, premium: pd.DataFrame, engagement: pd.DataFrame,
+                          demo: pd.DataFrame) -> pd.DataFrame:
+    """
+    Join the per-customer parts into the CLV gold table (shared by the pandas and DuckDB backends).
+    """
     feats = rfm.merge(premium, on="customer_id", how="left") \
                .merge(engagement, on="customer_id", how="left") \
                .merge(demo, on="customer_id", how="left")
@@ -117,7 +130,9 @@ def segmentation_features(customers: pd.DataFrame, transactions: pd.DataFrame) -
         avg_discount=("discount_applied", "mean"),
         avg_qty=("quantity", "mean")
     ).reset_index()
+    return assemble_segmentation_features(rfm, customers)
 
+def assemble_segmentation_features(rfm: pd.DataFrame, customers: pd.DataFrame) -> pd.DataFrame:
     demo = customers.copy()
     demo["loyalty_level"] = demo["loyalty_tier"].map({"Bronze": 1, "Silver": 2, "Gold": 3, "Platinum": 4}).fillna(0).astype(int)
     demo["is_male"] = (demo["gender"].str.lower() == "male").astype(int)
@@ -131,15 +146,20 @@ def segmentation_features(customers: pd.DataFrame, transactions: pd.DataFrame) -
 
 
 # --- Campaign response features (join customers + campaigns + events history) ---
-def campaign_features(customers: pd.DataFrame, campaigns: pd.DataFrame, events: pd.DataFrame) -> pd.DataFrame:
+def campaign_features(customers: pd.DataFrame, campaigns: pd.DataFrame, events: pd.DataFrame,
+                      exposure: pd.DataFrame | None = None) -> pd.DataFrame:
+    """
+    `exposure`: optional per-(customer, campaign) counts from src.campaign_response.exposure.exposure_counts; adds
+    the time-aware columns campaigns_exposed, exposure_events, campaign_responses and uplift_exposed.
+    """
     ev = events.copy()
     ev["timestamp"] = pd.to_datetime(ev["timestamp"])
     # basic engagement counts per customer
-    counts = ev.pivot_table(index="customer_id", columns="event_type",
-                            values="event_id", aggfunc="count", fill_value=0)
-    counts.columns = [f"events_{c}_count" for c in counts.columns]
-    counts = counts.reset_index()
+    counts = event_type_counts(ev)
+    return assemble_campaign_features(customers, campaigns, counts, exposure)
 
+def assemble_campaign_features(customers: pd.DataFrame, campaigns: pd.DataFrame, counts: pd.DataFrame,
+                               exposure: pd.DataFrame | None = None) -> pd.DataFrame:
     demo = customers.copy()
     demo["loyalty_level"] = demo["loyalty_tier"].map({"Bronze": 1, "Silver": 2, "Gold": 3, "Platinum": 4}).fillna(0).astype(int)
     demo["is_male"] = (demo["gender"].str.lower() == "male").astype(int)
@@ -162,6 +182,11 @@ def campaign_features(customers: pd.DataFrame, campaigns: pd.DataFrame, events:
         if c.startswith("events_"):
             feats[c] = feats[c].fillna(0)
     feats["uplift_mean"] = feats["uplift_mean"].fillna(0.0)
+    if exposure is not None:
+        from src.campaign_response.exposure import customer_exposure_summary
+        summary = customer_exposure_summary(exposure, campaigns)
+        feats = feats.merge(summary, on="customer_id", how="left")
+        feats[summary.columns[1:]] = feats[summary.columns[1:]].fillna(0)
     return feats
 
 
@@ -194,6 +219,9 @@ def pricing_features(transactions: pd.DataFrame, products: pd.DataFrame) -> pd.D
         avg_discount=("discount_applied", "mean"),
         premium_share=("is_premium", "mean")
     ).reset_index()
+    return assemble_pricing_features(agg)
+
+def assemble_pricing_features(agg: pd.DataFrame) -> pd.DataFrame:
     # target proxy: revenue sensitivity to discount (very rough)
     agg["price_sensitivity"] = agg["avg_discount"].fillna(0.0) * agg["units"].fillna(0.0)
     return agg
@@ -0,0 +1,202 @@
+"""
+Out-of-core backend for the feature builders in src/common/features.py.
+
+DuckDB streams the bronze fact tables (a parquet file or a partitioned directory of them) through its aggregation
+operators under a fixed memory budget and spills hash tables / sorts to disk beyond it, so transactions and events
+never have to fit in RAM. Only the per-customer / per-product aggregates come back to pandas, and they go through the
+same assemble_* functions as the pandas builders: the gold tables have the same rows, order, columns and dtypes (float
+sums and means may differ in the last bits because of summation order). Dimension tables stay pandas frames.
+
+Selected per flow with `feature_backend="duckdb"` (default from FEATURE_BACKEND, "pandas"). Settings:
+FEATURE_DUCKDB_MEMORY (e.g. "8GB"; DuckDB's default is 80% of RAM), FEATURE_DUCKDB_TEMP (spill directory),
+FEATURE_DUCKDB_THREADS.
+"""
+from pathlib import Path
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.common.features import (assemble_campaign_features, assemble_clv_features, assemble_pricing_features,
+                                 assemble_segmentation_features, join_customer_demographics)
+
+BACKENDS = ("pandas", "duckdb")
+MEMORY_LIMIT = os.environ.get("FEATURE_DUCKDB_MEMORY")
+TEMP_DIR = os.environ.get("FEATURE_DUCKDB_TEMP", "/tmp/shopsphere-duckdb")
+THREADS = os.environ.get("FEATURE_DUCKDB_THREADS")
+
+
+def feature_backend(name: str | None = None) -> str:
+    name = name or os.environ.get("FEATURE_BACKEND", "pandas")
+    if name not in BACKENDS:
+        raise ValueError(f"unknown feature backend {name!r}; choose from {BACKENDS}")
+    return name
+
+
+def connect(memory_limit: str | None = None, temp_dir: str | None = None, threads: int | None = None):
+    try:
+        import duckdb
+    except ImportError as ex:
+        raise ImportError("feature backend 'duckdb' needs the duckdb package: pip install duckdb") from ex
+    con = duckdb.connect()
+    temp_dir = temp_dir or TEMP_DIR
+    Path(temp_dir).mkdir(parents=True, exist_ok=True)
+    con.execute(f"SET temp_directory = '{temp_dir}'")
+    # streaming aggregates don't need input order; dropping it lets operators spill instead of buffering
+    con.execute("SET preserve_insertion_order = false")
+    if memory_limit or MEMORY_LIMIT:
+        con.execute(f"SET memory_limit = '{memory_limit or MEMORY_LIMIT}'")
+    if threads or THREADS:
+        con.execute(f"SET threads = {int(threads or THREADS)}")
+    return con
+
+
+def _scan(path) -> str:
+    path = Path(path)
+    glob = str(path / "**" / "*.parquet") if path.is_dir() else str(path)
+    return "read_parquet('{}', union_by_name = true)".format(glob.replace("'", "''"))
+
+
+def _types(con, src: str) -> dict:
+    return {row[0]: row[1] for row in con.execute(f"DESCRIBE SELECT * FROM {src}").fetchall()}
+
+
+def _sum(expr: str, sql_type: str) -> str:
+    # pandas sums integer columns to int64 and empty / all-null groups to 0; DuckDB widens to HUGEINT and gives NULL
+    integer = sql_type.upper() in ("TINYINT", "SMALLINT", "INTEGER", "BIGINT", "UTINYINT", "USMALLINT", "UINTEGER",
+                                   "BOOLEAN")
+    return f"CAST(coalesce(sum({expr}), 0) AS BIGINT)" if integer else f"coalesce(sum({expr}), 0.0)"
+
+
+def _kept(types: dict) -> str:
+    # refunds are excluded exactly like the pandas builders (refund_flag == 0, nulls dropped)
+    return "refund_flag = 0" if "refund_flag" in types else "TRUE"
+
+
+def customer_transaction_aggregates(con, transactions, products: pd.DataFrame | None = None,
+                                    names: dict | None = None) -> pd.DataFrame:
+    """
+    One pass over transactions: recency_days, tx_count, total_revenue, avg_discount, avg_quantity per customer (as in
+    compute_rfm_from_transactions), plus premium_tx_share when `products` is given. `names` renames the outputs.
+    """
+    src = _scan(transactions)
+    types = _types(con, src)
+    premium_join, premium_col = "", ""
+    if products is not None:
+        con.register("products_dim", products[["product_id", "is_premium"]])
+        premium_join = "LEFT JOIN products_dim p ON t.product_id = p.product_id"
+        premium_col = ", avg(coalesce(CAST(p.is_premium AS DOUBLE), 0.0)) AS premium_tx_share"
+    sql = f"""
+        WITH tx AS (SELECT * FROM {src} WHERE {_kept(types)}),
+             now AS (SELECT max(CAST("timestamp" AS TIMESTAMP)) AS ts FROM tx)
+        SELECT t.customer_id,
+               date_diff('microsecond', max(CAST(t."timestamp" AS TIMESTAMP)), any_value(now.ts)) // 86400000000
+                   AS recency_days,
+               count(t.transaction_id) AS tx_count,
+               {_sum("t.gross_revenue", types.get("gross_revenue", ""))} AS total_revenue,
+               avg(t.discount_applied) AS avg_discount,
+               avg(t.quantity) AS avg_quantity
+               {premium_col}
+        FROM tx t CROSS JOIN now {premium_join}
+        WHERE t.customer_id IS NOT NULL
+        GROUP BY t.customer_id
+        ORDER BY t.customer_id
+    """
+    df = con.execute(sql).df()
+    df["recency_days"] = df["recency_days"].astype(np.int64)
+    return df.rename(columns=names or {})
+
+
+def event_aggregates(con, events) -> tuple[pd.DataFrame, pd.DataFrame | None]:
+    """
+    One pass over events: (event_type_counts frame, avg_session_duration_sec frame or None), both as in features.py.
+    """
+    src = _scan(events)
+    types = _types(con, src)
+    has_dur = "session_duration_sec" in types
+    dur_cols = ", sum(session_duration_sec) AS dur_sum, count(session_duration_sec) AS dur_n" if has_dur else ""
+    parts = con.execute(f"""
+        SELECT customer_id, event_type, count(event_id) AS n {dur_cols}
+        FROM {src}
+        WHERE customer_id IS NOT NULL
+        GROUP BY customer_id, event_type
+    """).df()
+    # customers x event types is small; pivot it the way event_type_counts does
+    counts = parts.dropna(subset=["event_type"]).pivot_table(index="customer_id", columns="event_type", values="n",
+                                                            aggfunc="sum", fill_value=0)
+    counts.columns = [f"events_{c}_count" for c in counts.columns]
+    counts = counts.astype(np.int64).reset_index()
+    if not has_dur:
+        return counts, None
+    per_customer = parts.groupby("customer_id")[["dur_sum", "dur_n"]].sum()
+    dur = (per_customer["dur_sum"] / per_customer["dur_n"].where(per_customer["dur_n"] > 0))
+    return counts, dur.rename("avg_session_duration_sec").reset_index()
+
+
+def build_clv_feature_table(customers: pd.DataFrame, transactions, products: pd.DataFrame, events,
+                            con=None) -> pd.DataFrame:
+    """
+    features.build_clv_feature_table over parquet paths for transactions and events.
+    """
+    con = con or connect()
+    agg = customer_transaction_aggregates(con, transactions, products)
+    rfm, premium = agg.drop(columns=["premium_tx_share"]), agg[["customer_id", "premium_tx_share"]]
+    counts, dur = event_aggregates(con, events)
+    engagement = counts if dur is None else counts.merge(dur, on="customer_id", how="left")
+    return assemble_clv_features(rfm, premium, engagement, join_customer_demographics(customers))
+
+
+def segmentation_features(customers: pd.DataFrame, transactions, con=None) -> pd.DataFrame:
+    con = con or connect()
+    rfm = customer_transaction_aggregates(con, transactions,
+                                          names={"total_revenue": "monetary", "avg_quantity": "avg_qty"})
+    return assemble_segmentation_features(rfm, customers)
+
+
+def campaign_features(customers: pd.DataFrame, campaigns: pd.DataFrame, events,
+                      exposure: pd.DataFrame | None = None, con=None) -> pd.DataFrame:
+    counts, _ = event_aggregates(con or connect(), events)
+    return assemble_campaign_features(customers, campaigns, counts, exposure)
+
+
+def max_timestamp(transactions, con=None) -> pd.Timestamp:
+    con = con or connect()
+    return pd.Timestamp(con.execute(f'SELECT max(CAST("timestamp" AS TIMESTAMP)) FROM {_scan(transactions)}').fetchone()[0])
+
+
+def build_user_item_matrix(transactions, con=None, since=None, until=None) -> pd.DataFrame:
+    """
+    features.build_user_item_matrix over a parquet path; `since` / `until` keep transactions in [since, until).
+    """
+    con = con or connect()
+    src = _scan(transactions)
+    types = _types(con, src)
+    window = "".join(f""" AND CAST("timestamp" AS TIMESTAMP) {op} TIMESTAMP '{pd.Timestamp(ts).isoformat(sep=" ")}'"""
+                     for op, ts in ((">=", since), ("<", until)) if ts is not None)
+    return con.execute(f"""
+        SELECT customer_id, product_id, {_sum("quantity", types.get("quantity", ""))} AS strength
+        FROM {src}
+        WHERE {_kept(types)} AND customer_id IS NOT NULL AND product_id IS NOT NULL {window}
+        GROUP BY customer_id, product_id
+        ORDER BY customer_id, product_id
+    """).df()
+
+
+def pricing_features(transactions, products: pd.DataFrame, con=None) -> pd.DataFrame:
+    con = con or connect()
+    src = _scan(transactions)
+    types = _types(con, src)
+    con.register("products_dim", products[["product_id", "category", "base_price", "is_premium"]])
+    agg = con.execute(f"""
+        SELECT t.product_id,
+               avg(p.base_price) AS avg_price,
+               {_sum("t.quantity", types.get("quantity", ""))} AS units,
+               {_sum("t.gross_revenue", types.get("gross_revenue", ""))} AS revenue,
+               avg(t.discount_applied) AS avg_discount,
+               avg(CAST(p.is_premium AS DOUBLE)) AS premium_share
+        FROM {src} t LEFT JOIN products_dim p ON t.product_id = p.product_id
+        WHERE {_kept(types)} AND t.product_id IS NOT NULL
+        GROUP BY t.product_id
+        ORDER BY t.product_id
+    """).df()
+    return assemble_pricing_features(agg)
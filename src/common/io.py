@@ -4,25 +4,38 @@ import pandas as pd
 RAW_DIR = Path("/app/data/raw")
 BRONZE_DIR = Path("/app/data/bronze")
 
+# raw table -> date columns parsed on read
+RAW_DATE_COLUMNS = {
+    "customers": ["signup_date"],
+    "products": ["launch_date"],
+    "campaigns": ["start_date", "end_date"],
+    "transactions": ["timestamp"],
+    "events": ["timestamp"],
+}
+
+def read_raw_csv(source, name: str) -> pd.DataFrame:
+    # `source` is a path or a file-like object holding (part of) a raw CSV with its header
+    return pd.read_csv(source, parse_dates=RAW_DATE_COLUMNS[name])
+
 def read_raw_customers() -> pd.DataFrame:
-    df = pd.read_csv(RAW_DIR / "customers.csv", parse_dates=["signup_date"])
+    df = read_raw_csv(RAW_DIR / "customers.csv", "customers")
     return df
 
 def read_raw_products() -> pd.DataFrame:
-    df = pd.read_csv(RAW_DIR / "products.csv", parse_dates=["launch_date"])
+    df = read_raw_csv(RAW_DIR / "products.csv", "products")
     return df
 
 def read_raw_campaigns() -> pd.DataFrame:
-    df = pd.read_csv(RAW_DIR / "campaigns.csv", parse_dates=["start_date", "end_date"])
+    df = read_raw_csv(RAW_DIR / "campaigns.csv", "campaigns")
     return df
 
 def read_raw_transactions() -> pd.DataFrame:
-    df = pd.read_csv(RAW_DIR / "transactions.csv", parse_dates=["timestamp"])
+    df = read_raw_csv(RAW_DIR / "transactions.csv", "transactions")
     # sanitize/rename if needed
     return df
 
 def read_raw_events() -> pd.DataFrame:
-    df = pd.read_csv(RAW_DIR / "events.csv", parse_dates=["timestamp"])
+    df = read_raw_csv(RAW_DIR / "events.csv", "events")
     return df
 
 def write_bronze(df: pd.DataFrame, name: str):
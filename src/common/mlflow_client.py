@@ -0,0 +1,120 @@
+"""
+One MLflow / S3 client per process, shared by routers, flows and train functions.
+
+- `configure(experiment)`: tracking URI and HTTP retry/backoff/timeout defaults, set once; optionally the experiment.
+  MLflow keeps one keep-alive `requests` session per process, so every call through `client()` reuses its pool.
+- `client()`: the shared MlflowClient. `s3_client()`: the shared boto3 client (connection pool, adaptive retries,
+  timeouts) used for direct artifact transfers.
+- `resolve(name, stage)`: (version, run_id, source) for the model currently in `stage`, cached for
+  REGISTRY_CACHE_TTL_S seconds so a burst of loads costs one registry request.
+- `load_pyfunc(name, stage)`: loads straight from the version's artifact source, skipping the `models:/` lookups.
+
+mlflow itself is imported on first use, not with this module, so API workers and flows that only import the
+routers / tasks do not pay for it until a model is actually resolved or loaded.
+"""
+from dataclasses import dataclass
+from functools import lru_cache
+import os
+import threading
+import time
+
+TRACKING_URI = os.environ.get("MLFLOW_TRACKING_URI", "http://mlflow:5000")
+REGISTRY_CACHE_TTL_S = float(os.environ.get("REGISTRY_CACHE_TTL_S", "30"))
+S3_MAX_CONNECTIONS = int(os.environ.get("S3_MAX_CONNECTIONS", "32"))
+
+# MLflow's own HTTP settings; only applied where the deployment has not set them
+_HTTP_DEFAULTS = {
+    "MLFLOW_HTTP_REQUEST_MAX_RETRIES": "5",
+    "MLFLOW_HTTP_REQUEST_BACKOFF_FACTOR": "1",
+    "MLFLOW_HTTP_REQUEST_BACKOFF_JITTER": "1",
+    "MLFLOW_HTTP_REQUEST_TIMEOUT": "30",
+}
+
+_configured = False
+_lock = threading.Lock()
+_resolved: dict[tuple[str, str], tuple[float, "ModelRef | None"]] = {}
+
+
+@dataclass(frozen=True)
+class ModelRef:
+    name: str
+    version: str
+    run_id: str
+    source: str
+
+    @property
+    def uri(self) -> str:
+        # sources registered as models:/ (or missing) resolve through the registry as before
+        if self.source and not self.source.startswith("models:/"):
+            return self.source
+        return f"models:/{self.name}/{self.version}"
+
+
+def configure(experiment: str | None = None) -> None:
+    global _configured
+    import mlflow
+    with _lock:
+        if not _configured:
+            for key, value in _HTTP_DEFAULTS.items():
+                os.environ.setdefault(key, value)
+            mlflow.set_tracking_uri(TRACKING_URI)
+            _configured = True
+    if experiment:
+        mlflow.set_experiment(experiment)
+
+
+@lru_cache(maxsize=1)
+def client():
+    from mlflow.tracking import MlflowClient
+    configure()
+    return MlflowClient()
+
+
+@lru_cache(maxsize=1)
+def s3_client():
+    import boto3
+    from botocore.config import Config
+    return boto3.client(
+        "s3",
+        endpoint_url=os.environ.get("MLFLOW_S3_ENDPOINT_URL"),
+        config=Config(max_pool_connections=S3_MAX_CONNECTIONS, connect_timeout=5, read_timeout=60,
+                      retries={"max_attempts": 5, "mode": "adaptive"}),
+    )
+
+
+def resolve(name: str, stage: str = "Production", ttl: float | None = None) -> ModelRef | None:
+    """
+    The version of `name` currently in `stage` (None if there is none), from a TTL cache of registry lookups.
+    """
+    ttl = REGISTRY_CACHE_TTL_S if ttl is None else ttl
+    key = (name, stage)
+    now = time.monotonic()
+    with _lock:
+        hit = _resolved.get(key)
+    if hit is not None and now - hit[0] < ttl:
+        return hit[1]
+    versions = client().get_latest_versions(name, stages=[stage])
+    ref = None
+    if versions:
+        v = versions[0]
+        ref = ModelRef(name, str(v.version), v.run_id, v.source)
+    with _lock:
+        _resolved[key] = (now, ref)
+    return ref
+
+
+def invalidate(name: str | None = None) -> None:
+    with _lock:
+        for key in [k for k in _resolved if name is None or k[0] == name]:
+            del _resolved[key]
+
+
+def load_pyfunc(name: str, stage: str = "Production"):
+    """
+    (pyfunc model, ModelRef) for the version of `name` in `stage`; raises LookupError when there is none.
+    """
+    import mlflow.pyfunc
+    ref = resolve(name, stage)
+    if ref is None:
+        raise LookupError(f"no {stage} version of {name}")
+    return mlflow.pyfunc.load_model(ref.uri), ref
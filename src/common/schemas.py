@@ -0,0 +1,16 @@
+# Feature column contracts shared by training and serving (order matters for sklearn models)
+
+CLV_FEATURES = [
+    "recency_days", "tx_count", "monetary", "avg_discount", "avg_quantity",
+    "premium_tx_share", "events_view_count", "events_add_to_cart_count",
+    "events_purchase_count", "avg_session_duration_sec", "age", "is_male", "loyalty_level",
+]
+
+CAMPAIGN_FEATURES = [
+    "age", "is_male", "loyalty_level", "uplift_mean",
+    "events_view_count", "events_add_to_cart_count", "events_purchase_count",
+]
+
+SEGMENTATION_FEATURES = ["recency_days", "tx_count", "monetary", "avg_discount", "avg_qty", "age", "loyalty_level"]
+
+PRICING_FEATURES = ["avg_price", "units", "revenue", "avg_discount", "premium_share"]
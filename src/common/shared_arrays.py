@@ -0,0 +1,73 @@
+"""
+Numeric model state held once per host instead of once per API worker.
+
+With MODEL_SHARING=shm the first uvicorn worker to load a model version writes the large arrays named in the
+model's SHARED_ARRAYS (ALS factors, flattened tree arrays, co-occurrence CSR, KMeans centroids) as .npy files
+under SHARED_MODEL_DIR (tmpfs by default) and every worker, the first included, swaps its private copies for
+read-only memory maps of those files. The pages are resident once and count as shared, not unique, memory in
+each worker. Publication runs under an exclusive flock per model and is an atomic directory rename, so workers
+starting together never see a half-written version; publishing a version drops the model's older versions
+(workers still mapping them keep their pages until they reload).
+"""
+from pathlib import Path
+import fcntl
+import os
+import shutil
+
+import numpy as np
+
+MODEL_SHARING = os.environ.get("MODEL_SHARING", "off")    # off | shm
+SHARED_MODEL_DIR = Path(os.environ.get("SHARED_MODEL_DIR", "/dev/shm/shopsphere-models"))
+
+
+def sharing_enabled() -> bool:
+    return MODEL_SHARING == "shm"
+
+
+def _shareable(obj) -> list[str]:
+    names = []
+    for name in getattr(obj, "SHARED_ARRAYS", ()):
+        arr = getattr(obj, name, None)
+        if isinstance(arr, np.ndarray) and not arr.dtype.hasobject:
+            names.append(name)
+    return names
+
+
+def _publish(root: Path, arrays: dict) -> None:
+    tmp = root.parent / f".{root.name}.tmp{os.getpid()}"
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+    for name, arr in arrays.items():
+        np.save(tmp / f"{name}.npy", np.ascontiguousarray(arr))
+    shutil.rmtree(root, ignore_errors=True)
+    os.replace(tmp, root)
+    for old in root.parent.iterdir():
+        if old.is_dir() and old != root and not old.name.startswith("."):
+            shutil.rmtree(old, ignore_errors=True)
+
+
+def share_model(obj, name: str, version) -> int:
+    """
+    Replace `obj`'s SHARED_ARRAYS attributes with read-only maps of the host-wide copy for (`name`, `version`),
+    publishing that copy first if this is the first worker to get here. Returns the bytes now shared; 0 when
+    sharing is off or `obj` declares nothing shareable.
+    """
+    names = _shareable(obj)
+    if not sharing_enabled() or not names:
+        return 0
+    family = SHARED_MODEL_DIR / name
+    root = family / str(version)
+    family.mkdir(parents=True, exist_ok=True)
+    with open(family / ".lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            if not all((root / f"{n}.npy").exists() for n in names):
+                _publish(root, {n: getattr(obj, n) for n in names})
+            # map while still holding the lock: another worker publishing a newer version deletes this directory,
+            # but an open mapping survives the unlink
+            mapped = {n: np.load(root / f"{n}.npy", mmap_mode="r") for n in names}
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+    for n, arr in mapped.items():
+        setattr(obj, n, arr)
+    return sum(arr.nbytes for arr in mapped.values())
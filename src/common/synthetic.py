@@ -0,0 +1,227 @@
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+LOYALTY_TIERS = ["Bronze", "Silver", "Gold", "Platinum"]
+GENDERS = ["Male", "Female", "Other"]
+CHANNELS = ["Email", "Social", "Search", "Display", "Referral"]
+COUNTRIES = ["US", "UK", "DE", "FR", "ZA", "IN", "BR"]
+CATEGORIES = ["Electronics", "Fashion", "Home", "Beauty", "Sports", "Grocery"]
+EVENT_TYPES = ["view", "add_to_cart", "purchase"]
+EVENT_WEIGHTS = [0.75, 0.17, 0.08]
+
+START_TS = pd.Timestamp("2023-01-01")
+HISTORY_DAYS = 730
+
+
+def _power_law_cdf(n: int, alpha: float) -> np.ndarray:
+    """
+    CDF over ranks 1..n with p(rank) ~ rank^-alpha (alpha=0 -> uniform).
+    """
+    w = np.arange(1, n + 1, dtype=np.float64) ** -alpha
+    cdf = np.cumsum(w)
+    cdf /= cdf[-1]
+    return cdf
+
+
+def _sample_ids(rng: np.random.Generator, cdf: np.ndarray, perm: np.ndarray, size: int) -> np.ndarray:
+    # perm maps popularity rank -> id so the heavy hitters are not simply the lowest ids
+    ranks = np.searchsorted(cdf, rng.random(size), side="right")
+    return perm[np.minimum(ranks, len(perm) - 1)]
+
+
+def generate_customers(n_customers: int, seed: int = 42) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "customer_id": np.arange(1, n_customers + 1),
+        "signup_date": START_TS + pd.to_timedelta(rng.integers(0, HISTORY_DAYS, n_customers), unit="D"),
+        "loyalty_tier": rng.choice(LOYALTY_TIERS, n_customers, p=[0.5, 0.3, 0.15, 0.05]),
+        "gender": rng.choice(GENDERS, n_customers, p=[0.48, 0.48, 0.04]),
+        "age": rng.integers(18, 80, n_customers),
+        "acquisition_channel": rng.choice(CHANNELS, n_customers),
+        "country": rng.choice(COUNTRIES, n_customers),
+    })
+
+
+def generate_products(n_products: int, seed: int = 42) -> pd.DataFrame:
+    rng = np.random.default_rng(seed + 1)
+    return pd.DataFrame({
+        "product_id": np.arange(1, n_products + 1),
+        "launch_date": START_TS - pd.to_timedelta(rng.integers(0, 365, n_products), unit="D"),
+        "category": rng.choice(CATEGORIES, n_products),
+        "base_price": np.round(rng.lognormal(3.5, 0.8, n_products), 2),
+        "is_premium": (rng.random(n_products) < 0.2).astype(int),
+    })
+
+
+def generate_campaigns(n_campaigns: int, seed: int = 42) -> pd.DataFrame:
+    rng = np.random.default_rng(seed + 2)
+    start = START_TS + pd.to_timedelta(rng.integers(0, HISTORY_DAYS - 30, n_campaigns), unit="D")
+    return pd.DataFrame({
+        "campaign_id": np.arange(1, n_campaigns + 1),
+        "channel": rng.choice(CHANNELS, n_campaigns),
+        "start_date": start,
+        "end_date": start + pd.to_timedelta(rng.integers(7, 30, n_campaigns), unit="D"),
+        "expected_uplift": np.round(rng.uniform(0.0, 0.3, n_campaigns), 4),
+    })
+
+
+def iter_transactions(
+    n_rows: int,
+    n_customers: int,
+    n_products: int,
+    customer_alpha: float = 1.1,
+    item_alpha: float = 1.1,
+    chunk_rows: int = 1_000_000,
+    seed: int = 42,
+):
+    """
+    Yield transactions in chunks of at most `chunk_rows`. Customers and products are drawn from
+    power-law popularity distributions so a few heavy buyers / best sellers dominate, as in production.
+    """
+    rng = np.random.default_rng(seed + 3)
+    c_cdf, c_perm = _power_law_cdf(n_customers, customer_alpha), rng.permutation(n_customers) + 1
+    p_cdf, p_perm = _power_law_cdf(n_products, item_alpha), rng.permutation(n_products) + 1
+    # price per product id (index 0 unused) so gross_revenue is consistent with the catalog
+    prices = np.concatenate([[0.0], generate_products(n_products, seed)["base_price"].to_numpy()])
+
+    offset = 0
+    while offset < n_rows:
+        m = min(chunk_rows, n_rows - offset)
+        product_id = _sample_ids(rng, p_cdf, p_perm, m)
+        quantity = rng.integers(1, 6, m)
+        discount = np.round(rng.choice([0.0, 0.05, 0.1, 0.2, 0.3], m, p=[0.55, 0.15, 0.15, 0.1, 0.05]), 2)
+        yield pd.DataFrame({
+            "transaction_id": np.arange(offset + 1, offset + m + 1),
+            "customer_id": _sample_ids(rng, c_cdf, c_perm, m),
+            "product_id": product_id,
+            "timestamp": START_TS + pd.to_timedelta(rng.integers(0, HISTORY_DAYS * 86_400, m), unit="s"),
+            "quantity": quantity,
+            "discount_applied": discount,
+            "gross_revenue": np.round(prices[product_id] * quantity * (1.0 - discount), 2),
+            "refund_flag": (rng.random(m) < 0.03).astype(int),
+        })
+        offset += m
+
+
+def iter_events(
+    n_rows: int,
+    n_customers: int,
+    customer_alpha: float = 1.1,
+    chunk_rows: int = 1_000_000,
+    seed: int = 42,
+):
+    """
+    Yield clickstream events in chunks; same power-law customer activity as transactions.
+    """
+    rng = np.random.default_rng(seed + 4)
+    c_cdf, c_perm = _power_law_cdf(n_customers, customer_alpha), rng.permutation(n_customers) + 1
+
+    offset = 0
+    while offset < n_rows:
+        m = min(chunk_rows, n_rows - offset)
+        yield pd.DataFrame({
+            "event_id": np.arange(offset + 1, offset + m + 1),
+            "customer_id": _sample_ids(rng, c_cdf, c_perm, m),
+            "timestamp": START_TS + pd.to_timedelta(rng.integers(0, HISTORY_DAYS * 86_400, m), unit="s"),
+            "event_type": rng.choice(EVENT_TYPES, m, p=EVENT_WEIGHTS),
+            "session_duration_sec": np.round(rng.exponential(180.0, m), 1),
+        })
+        offset += m
+
+
+def scale_config(n_transactions: int, events_per_tx: float = 3.0, tx_per_customer: int = 20,
+                 tx_per_product: int = 1_000, n_campaigns: int = 200) -> dict:
+    """
+    Default table sizes derived from the transactions row count.
+    """
+    return {
+        "n_transactions": int(n_transactions),
+        "n_events": int(n_transactions * events_per_tx),
+        "n_customers": max(100, int(n_transactions // tx_per_customer)),
+        "n_products": max(50, int(n_transactions // tx_per_product)),
+        "n_campaigns": int(n_campaigns),
+    }
+
+
+def generate_raw_tables(
+    n_customers: int = 10_000,
+    n_products: int = 1_000,
+    n_campaigns: int = 50,
+    n_transactions: int = 100_000,
+    n_events: int = 300_000,
+    customer_alpha: float = 1.1,
+    item_alpha: float = 1.1,
+    seed: int = 42,
+) -> dict:
+    """
+    Build all five raw tables in memory (small/medium scales only; use write_raw_tables for large ones).
+    """
+    return {
+        "customers": generate_customers(n_customers, seed),
+        "products": generate_products(n_products, seed),
+        "campaigns": generate_campaigns(n_campaigns, seed),
+        "transactions": pd.concat(
+            iter_transactions(n_transactions, n_customers, n_products, customer_alpha, item_alpha, seed=seed),
+            ignore_index=True,
+        ),
+        "events": pd.concat(iter_events(n_events, n_customers, customer_alpha, seed=seed), ignore_index=True),
+    }
+
+
+def write_raw_tables(
+    out_dir,
+    fmt: str = "parquet",
+    n_customers: int = 10_000,
+    n_products: int = 1_000,
+    n_campaigns: int = 50,
+    n_transactions: int = 100_000,
+    n_events: int = 300_000,
+    customer_alpha: float = 1.1,
+    item_alpha: float = 1.1,
+    chunk_rows: int = 1_000_000,
+    seed: int = 42,
+) -> dict:
+    """
+    Stream the synthetic tables to `out_dir` without holding the fact tables in memory.
+    fmt="parquet" writes bronze-style `<name>.parquet`; fmt="csv" writes raw-style `<name>.csv`
+    that `src.common.io.read_raw_*` can ingest. Returns {name: path}.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    paths = {}
+
+    dims = {
+        "customers": generate_customers(n_customers, seed),
+        "products": generate_products(n_products, seed),
+        "campaigns": generate_campaigns(n_campaigns, seed),
+    }
+    for name, df in dims.items():
+        paths[name] = out_dir / f"{name}.{fmt}"
+        if fmt == "csv":
+            df.to_csv(paths[name], index=False)
+        else:
+            df.to_parquet(paths[name], index=False)
+
+    facts = {
+        "transactions": iter_transactions(n_transactions, n_customers, n_products, customer_alpha, item_alpha,
+                                          chunk_rows=chunk_rows, seed=seed),
+        "events": iter_events(n_events, n_customers, customer_alpha, chunk_rows=chunk_rows, seed=seed),
+    }
+    for name, chunks in facts.items():
+        path = paths[name] = out_dir / f"{name}.{fmt}"
+        writer = None
+        for i, chunk in enumerate(chunks):
+            if fmt == "csv":
+                chunk.to_csv(path, index=False, mode="w" if i == 0 else "a", header=(i == 0))
+            else:
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(path, table.schema)
+                writer.write_table(table)
+        if writer is not None:
+            writer.close()
+    return paths
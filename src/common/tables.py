@@ -0,0 +1,124 @@
+"""
+Table access for flows, train functions and monitors.
+
+Parquet stays the storage format; on first read a table is also written as an uncompressed Arrow IPC (Feather v2)
+sidecar under TABLE_CACHE_DIR and served from a memory map from then on, so repeated reads cost neither
+decompression nor a private copy. A process-local cache keyed by (path, mtime, size) returns the same Arrow
+table to every caller until the parquet file changes. `write_table` also writes the sidecar and seeds the cache
+with its memory map, so a table written by one task is read back by the next without re-parsing. Only memory-mapped
+tables are cached on write; a written table is never pinned in the heap.
+"""
+from pathlib import Path
+import hashlib
+import os
+import threading
+import pandas as pd
+
+TABLE_CACHE_DIR = Path(os.environ.get("TABLE_CACHE_DIR", "/app/data/cache/arrow"))
+
+_cache: dict[str, tuple[tuple, object]] = {}  # resolved path -> ((mtime_ns, size[, parts]), pyarrow.Table)
+_lock = threading.Lock()
+
+
+def _stamp(path: Path) -> tuple:
+    if path.is_dir():
+        # partitioned dataset (e.g. append-only bronze facts): changes whenever a part is added, removed or rewritten
+        parts = [p.stat() for p in path.rglob("*.parquet")]
+        return max((st.st_mtime_ns for st in parts), default=0), sum(st.st_size for st in parts), len(parts)
+    st = path.stat()
+    return st.st_mtime_ns, st.st_size
+
+
+def _sidecar(path: Path, stamp: tuple) -> Path:
+    digest = hashlib.sha1("|".join(map(str, (path, *stamp))).encode()).hexdigest()[:16]
+    return TABLE_CACHE_DIR / f"{path.stem}-{digest}.arrow"
+
+
+def _write_ipc(table, target: Path) -> None:
+    import pyarrow.feather as feather
+    target.parent.mkdir(parents=True, exist_ok=True)
+    # drop sidecars of older versions of the same table
+    for old in target.parent.glob(f"{target.name.rsplit('-', 1)[0]}-*.arrow"):
+        if old != target:
+            old.unlink(missing_ok=True)
+    tmp = target.with_suffix(f".tmp{os.getpid()}")
+    feather.write_feather(table, tmp, compression="uncompressed")
+    os.replace(tmp, target)
+
+
+def _mmap_ipc(target: Path):
+    import pyarrow as pa
+    with pa.memory_map(str(target), "r") as source:
+        return pa.ipc.open_file(source).read_all()
+
+
+def read_arrow(path, columns: list[str] | None = None):
+    """
+    pyarrow.Table for a parquet file (or a directory of them), memory-mapped from its IPC sidecar and cached per
+    (path, mtime, size).
+    """
+    import pyarrow.parquet as pq
+    path = Path(path).resolve()
+    stamp = _stamp(path)
+    with _lock:
+        hit = _cache.get(str(path))
+        if hit is not None and hit[0] == stamp:
+            table = hit[1]
+        else:
+            side = _sidecar(path, stamp)
+            if side.exists():
+                table = _mmap_ipc(side)
+            else:
+                table = pq.read_table(path)
+                try:
+                    _write_ipc(table, side)
+                    table = _mmap_ipc(side)
+                except OSError as ex:
+                    # read-only or full cache dir: keep serving the in-memory table
+                    print(f"[tables] no IPC sidecar for {path}: {ex}")
+            _cache[str(path)] = (stamp, table)
+    return table.select(columns) if columns else table
+
+
+def read_frame(path, columns: list[str] | None = None) -> pd.DataFrame:
+    return read_arrow(path, columns).to_pandas()
+
+
+def write_table(df: pd.DataFrame, path, **parquet_kwargs) -> Path:
+    """
+    Write `df` as parquet (as the flows always did) plus its IPC sidecar, and seed the cache with the memory map.
+    """
+    import pyarrow as pa
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    df.to_parquet(path, index=False, **parquet_kwargs)
+    resolved = path.resolve()
+    stamp = _stamp(resolved)
+    with _lock:
+        try:
+            side = _sidecar(resolved, stamp)
+            _write_ipc(pa.Table.from_pandas(df, preserve_index=False), side)
+            _cache[str(resolved)] = (stamp, _mmap_ipc(side))
+        except OSError as ex:
+            # no sidecar: drop any stale entry and let the next read_arrow parse the parquet file
+            _cache.pop(str(resolved), None)
+            print(f"[tables] no IPC sidecar for {path}: {ex}")
+    return path
+
+
+def as_frame(data, columns: list[str] | None = None) -> pd.DataFrame:
+    """
+    Normalise a train/monitor input (DataFrame, pyarrow.Table or parquet path) to a DataFrame.
+    """
+    if isinstance(data, pd.DataFrame):
+        return data[columns] if columns else data
+    if isinstance(data, (str, os.PathLike)):
+        return read_frame(data, columns)
+    if hasattr(data, "to_pandas"):
+        return (data.select(columns) if columns else data).to_pandas()
+    raise TypeError(f"expected a DataFrame, pyarrow.Table or path, got {type(data).__name__}")
+
+
+def clear_cache() -> None:
+    with _lock:
+        _cache.clear()
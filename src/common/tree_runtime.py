@@ -0,0 +1,212 @@
+from pathlib import Path
+import json
+import os
+import numpy as np
+
+ARRAYS = ["feature", "threshold", "left", "right", "value", "roots"]
+
+
+class FlatEnsemble:
+    """
+    A fitted sklearn tree ensemble flattened into contiguous node arrays:
+
+      feature[int32], threshold[float64], left/right[int32] (global node ids, -1 at leaves),
+      value[float64, n_nodes x n_outputs] and roots[int32, n_trees].
+
+    Prediction walks all (row, tree) pairs level by level with numpy gathers, dropping pairs as
+    they reach a leaf, so there is no per-tree Python or joblib overhead. Leaf values are summed
+    in tree order like sklearn, so outputs match `predict` / `predict_proba` up to float rounding. Missing
+    values (NaN, JSON null) are scored as 0.0, the value training and bulk scoring fill them with.
+    """
+    SHARED_ARRAYS = ARRAYS + ["is_leaf"]   # see src/common/shared_arrays.py
+
+    def __init__(self, arrays: dict, meta: dict):
+        self.meta = meta
+        for name in ARRAYS:
+            setattr(self, name, arrays[name])
+        self.is_leaf = self.left < 0
+        self.feature_names = meta.get("feature_names")
+        self.classes = np.asarray(meta["classes"]) if meta.get("classes") is not None else None
+
+    @property
+    def arrays(self) -> dict:
+        return {name: getattr(self, name) for name in ARRAYS}
+
+    @classmethod
+    def from_sklearn(cls, model, feature_names: list[str] | None = None) -> "FlatEnsemble":
+        """
+        Supports RandomForest/ExtraTrees regressors and classifiers and squared-error GradientBoostingRegressor.
+        """
+        name = type(model).__name__
+        if name in ("RandomForestRegressor", "ExtraTreesRegressor"):
+            kind, trees, base, scale = "regression", list(model.estimators_), 0.0, 1.0
+        elif name in ("RandomForestClassifier", "ExtraTreesClassifier"):
+            if getattr(model, "n_outputs_", 1) != 1:
+                raise TypeError("multi-output classifiers are not supported")
+            kind, trees, base, scale = "classification", list(model.estimators_), 0.0, 1.0
+        elif name == "GradientBoostingRegressor":
+            if getattr(model, "loss", "squared_error") != "squared_error" or not hasattr(model.init_, "constant_"):
+                raise TypeError("only squared_error GradientBoostingRegressor with a constant init is supported")
+            kind, trees = "regression", [t[0] for t in model.estimators_]
+            base, scale = float(np.ravel(model.init_.constant_)[0]), float(model.learning_rate)
+        else:
+            raise TypeError(f"cannot flatten {name}")
+
+        feats, thrs, lefts, rights, vals, roots = [], [], [], [], [], []
+        offset = 0
+        for est in trees:
+            t = est.tree_
+            leaf = t.children_left < 0
+            roots.append(offset)
+            feats.append(np.where(leaf, 0, t.feature).astype(np.int32))
+            thrs.append(t.threshold.astype(np.float64))
+            lefts.append(np.where(leaf, -1, t.children_left + offset).astype(np.int32))
+            rights.append(np.where(leaf, -1, t.children_right + offset).astype(np.int32))
+            v = t.value[:, 0, :].astype(np.float64)
+            if kind == "classification":
+                # per-tree class probabilities, as DecisionTreeClassifier.predict_proba computes them
+                norm = v.sum(axis=1, keepdims=True)
+                norm[norm == 0.0] = 1.0
+                v = v / norm
+            elif scale != 1.0:
+                v = scale * v
+            vals.append(v)
+            offset += t.node_count
+
+        arrays = {
+            "feature": np.concatenate(feats), "threshold": np.concatenate(thrs),
+            "left": np.concatenate(lefts), "right": np.concatenate(rights),
+            "value": np.ascontiguousarray(np.concatenate(vals)), "roots": np.asarray(roots, dtype=np.int32),
+        }
+        names = feature_names if feature_names is not None else getattr(model, "feature_names_in_", None)
+        meta = {
+            "source": name, "kind": kind, "n_trees": len(trees), "n_features": int(model.n_features_in_),
+            "feature_names": list(names) if names is not None else None,
+            "classes": model.classes_.tolist() if kind == "classification" else None,
+            "base": base, "average": name != "GradientBoostingRegressor",
+        }
+        return cls(arrays, meta)
+
+    def save(self, path) -> Path:
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        for name in ARRAYS:
+            np.save(path / f"{name}.npy", self.arrays[name])
+        (path / "meta.json").write_text(json.dumps(self.meta))
+        return path
+
+    @classmethod
+    def load(cls, path, mmap_mode: str | None = None) -> "FlatEnsemble":
+        path = Path(path)
+        arrays = {name: np.load(path / f"{name}.npy", mmap_mode=mmap_mode) for name in ARRAYS}
+        return cls(arrays, json.loads((path / "meta.json").read_text()))
+
+    def _raw(self, X: np.ndarray, chunk_rows: int = 2048, n_threads: int | None = None) -> np.ndarray:
+        # sklearn compares float32 inputs against float64 thresholds; do the same for identical splits
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        n, n_features = X.shape
+        if n_features != self.meta["n_features"]:
+            raise ValueError(f"expected {self.meta['n_features']} features, got {n_features}")
+        out = np.empty((n, self.value.shape[1]))
+        starts = range(0, n, chunk_rows)
+        if len(starts) == 1:
+            self._raw_chunk(X, out)
+            return out
+        # numpy releases the GIL in the gathers, so large batches scale across threads
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(n_threads or min(len(starts), os.cpu_count() or 1)) as ex:
+            list(ex.map(lambda s: self._raw_chunk(X[s:s + chunk_rows], out[s:s + chunk_rows]), starts))
+        return out
+
+    def _raw_chunk(self, xc: np.ndarray, out: np.ndarray) -> None:
+        m, n_features = xc.shape
+        n_trees = len(self.roots)
+        xflat = xc.ravel()
+        # one slot per (tree, row), tree-major so the reduction below adds trees in order
+        node = np.repeat(self.roots, m)
+        base_idx = np.tile(np.arange(m, dtype=np.int64) * n_features, n_trees)
+        active = np.flatnonzero(~self.is_leaf[node])
+        while active.size:
+            nd = node[active]
+            go_left = xflat[base_idx[active] + self.feature[nd]] <= self.threshold[nd]
+            nxt = np.where(go_left, self.left[nd], self.right[nd])
+            node[active] = nxt
+            active = active[~self.is_leaf[nxt]]
+        acc = self.value[node].reshape(n_trees, m, -1).sum(axis=0)
+        if self.meta["average"]:
+            acc /= n_trees
+        out[:] = acc + self.meta["base"]
+
+    def predict(self, X) -> np.ndarray:
+        """
+        Regression: predictions [n]. Classification: predicted labels [n].
+        """
+        raw = self._raw(self._as_matrix(X))
+        if self.meta["kind"] == "classification":
+            return self.classes[np.argmax(raw, axis=1)]
+        return raw[:, 0]
+
+    def predict_proba(self, X) -> np.ndarray:
+        if self.meta["kind"] != "classification":
+            raise AttributeError("predict_proba is only available for classifiers")
+        return self._raw(self._as_matrix(X))
+
+    def positive_proba(self, X) -> np.ndarray:
+        """
+        Probability of class 1 (or of the last class if 1 is not a label).
+        """
+        proba = self.predict_proba(X)
+        pos = np.flatnonzero(self.classes == 1)
+        return proba[:, pos[0] if pos.size else -1]
+
+    def _as_matrix(self, X) -> np.ndarray:
+        # missing values score as 0.0, as in training (fillna(0.0)); a NaN would otherwise go right at every split
+        if hasattr(X, "columns"):
+            cols = self.feature_names or list(X.columns)
+            X = X[cols].to_numpy(dtype=np.float64)
+        X = np.asarray(X, dtype=np.float64)
+        return np.nan_to_num(X, nan=0.0, posinf=np.inf, neginf=-np.inf) if np.isnan(X).any() else X
+
+    def row(self, features: dict) -> np.ndarray:
+        """
+        Single-row matrix in training column order from a feature dict.
+        """
+        missing = [c for c in self.feature_names if c not in features]
+        if missing:
+            raise ValueError(f"missing features: {missing}")
+        # JSON null / NaN from the online store -> 0.0, as in training and bulk scoring
+        row = np.array([[features[c] for c in self.feature_names]], dtype=np.float64)
+        return np.nan_to_num(row, nan=0.0, posinf=np.inf, neginf=-np.inf)
+
+
+FLAT_ARTIFACT_PATH = "flat_model"
+
+
+def log_flat_model(model, feature_names: list[str], artifact_path: str = FLAT_ARTIFACT_PATH) -> bool:
+    """
+    Log the flattened form of `model` next to the pickled one in the active MLflow run.
+    Returns False (nothing logged) for estimators the runtime cannot flatten, e.g. hist_gbm/lightgbm/xgboost.
+    """
+    import tempfile
+    import mlflow
+    try:
+        flat = FlatEnsemble.from_sklearn(model, feature_names)
+    except TypeError as ex:
+        print(f"[tree_runtime] not flattening: {ex}")
+        return False
+    from src.common.registry import log_artifacts
+    with tempfile.TemporaryDirectory() as tmp:
+        log_artifacts(mlflow.active_run(), flat.save(tmp), artifact_path)
+    return True
+
+
+def load_flat_model(run_id: str, artifact_path: str = FLAT_ARTIFACT_PATH) -> FlatEnsemble | None:
+    """
+    Download and load the flattened model logged by `log_flat_model`; None if the run has none.
+    """
+    import mlflow
+    try:
+        local = mlflow.artifacts.download_artifacts(run_id=run_id, artifact_path=artifact_path)
+    except Exception:
+        return None
+    return FlatEnsemble.load(local)
@@ -0,0 +1,213 @@
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import math
+import os
+import time
+import numpy as np
+import pandas as pd
+import yaml
+
+PARAMS_DIR = Path(os.environ.get("PARAMS_DIR", "/app/params"))
+
+# metric -> (higher is better, needs labels)
+METRICS = {
+    "mape": (False, True),
+    "r2": (True, True),
+    "auc": (True, True),
+    "silhouette": (True, False),
+}
+
+_DATA = {}
+
+
+def load_params(model_key: str, params_dir: Path = PARAMS_DIR) -> dict:
+    """
+    Parsed params/<model_key>.yaml; {} if the file is missing or empty.
+    """
+    path = Path(params_dir) / f"{model_key}.yaml"
+    if not path.exists():
+        return {}
+    return yaml.safe_load(path.read_text()) or {}
+
+
+def load_search_config(model_key: str, params_dir: Path = PARAMS_DIR, backend: str | None = None) -> dict:
+    """
+    The `tuning:` section of params/<model_key>.yaml. `tuning.space` is the space for the default
+    backend; `tuning.backends.<backend>` overrides it (and any other key) for a specific backend.
+    """
+    cfg = dict(load_params(model_key, params_dir).get("tuning") or {})
+    overrides = (cfg.pop("backends", None) or {})
+    if backend is not None and backend != cfg.get("default_backend", "rf"):
+        if backend not in overrides:
+            return {}
+        cfg.update(overrides[backend])
+    return cfg
+
+
+def sample_candidates(space: dict, n: int, seed: int = 42) -> list[dict]:
+    """
+    Draw `n` distinct configurations. A list is a categorical choice; a mapping
+    {low, high, log?, int?} is a (log-)uniform range.
+    """
+    rng = np.random.default_rng(seed)
+    seen, out = set(), []
+    for _ in range(n * 20):
+        cand = {}
+        for name, spec in space.items():
+            if isinstance(spec, dict):
+                lo, hi = float(spec["low"]), float(spec["high"])
+                v = math.exp(rng.uniform(math.log(lo), math.log(hi))) if spec.get("log") else rng.uniform(lo, hi)
+                cand[name] = int(round(v)) if spec.get("int") else float(v)
+            else:
+                v = spec[rng.integers(len(spec))]
+                cand[name] = v.item() if hasattr(v, "item") else v
+        key = tuple(sorted(cand.items(), key=lambda kv: kv[0]))
+        if key not in seen:
+            seen.add(key)
+            out.append(cand)
+        if len(out) == n:
+            break
+    return out
+
+
+def _init_worker(X_fit, y_fit, X_val, y_val):
+    _DATA.update(X_fit=X_fit, y_fit=y_fit, X_val=X_val, y_val=y_val)
+
+
+def _score(metric: str, model, X_val, y_val) -> float:
+    if metric == "mape":
+        from sklearn.metrics import mean_absolute_percentage_error
+        return float(mean_absolute_percentage_error(y_val, model.predict(X_val)))
+    if metric == "r2":
+        from sklearn.metrics import r2_score
+        return float(r2_score(y_val, model.predict(X_val)))
+    if metric == "auc":
+        from sklearn.metrics import roc_auc_score
+        return float(roc_auc_score(y_val, model.predict_proba(X_val)[:, 1]))
+    if metric == "silhouette":
+        from sklearn.metrics import silhouette_score
+        labels = model.predict(X_val)
+        if len(np.unique(labels)) < 2:
+            return -1.0
+        return float(silhouette_score(X_val, labels, sample_size=min(len(X_val), 10_000), random_state=42))
+    raise ValueError(f"unknown metric {metric}")
+
+
+def _evaluate(job):
+    trial_id, estimator_cls, base_params, params, fraction, metric, seed = job
+    X_fit, y_fit = _DATA["X_fit"], _DATA["y_fit"]
+    n = len(X_fit)
+    if fraction < 1.0:
+        idx = np.random.default_rng(seed + trial_id).choice(n, max(2, int(n * fraction)), replace=False)
+        X_fit = X_fit[idx]
+        y_fit = y_fit[idx] if y_fit is not None else None
+    # the configuration training will use (backend defaults + configured params), with the trial's overrides
+    est = estimator_cls(**{**base_params, **params})
+    defaults = est.get_params()
+    # one core per trial: parallelism comes from the process pool
+    est.set_params(**{k: v for k, v in {"n_jobs": 1, "random_state": seed}.items()
+                      if k in defaults and k not in params})
+    t0 = time.perf_counter()
+    try:
+        est.fit(X_fit) if y_fit is None else est.fit(X_fit, y_fit)
+        score = _score(metric, est, _DATA["X_val"], _DATA["y_val"])
+    except Exception as ex:  # a bad configuration loses the round instead of killing the search
+        print(f"[tuning] trial {trial_id} {params} failed: {ex}")
+        score = float("nan")
+    return trial_id, score, time.perf_counter() - t0
+
+
+def successive_halving(estimator_cls, X, y, candidates: list[dict], metric: str, eta: int = 3,
+                       min_fraction: float = 0.1, val_fraction: float = 0.2, n_workers: int = 0,
+                       seed: int = 42, base_params: dict | None = None) -> tuple[dict, pd.DataFrame]:
+    """
+    Successive halving over row-subsample budgets: every candidate is fit on `min_fraction` of the
+    training rows, the best 1/eta move on to eta x more data, ... until the survivors see all rows.
+    Each trial is `estimator_cls(**base_params, **candidate)`.
+    Rungs run in a process pool (data shipped once per worker), so wall time shrinks with core count.
+    Returns (best params, trials frame).
+    """
+    higher_better, supervised = METRICS[metric]
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y) if (supervised and y is not None) else None
+
+    rng = np.random.default_rng(seed)
+    perm = rng.permutation(len(X))
+    n_val = max(1, int(len(X) * val_fraction))
+    val, fit = perm[:n_val], perm[n_val:]
+    data = (X[fit], y[fit] if y is not None else None, X[val], y[val] if y is not None else None)
+
+    n_rungs = int(math.log(1.0 / min_fraction, eta) + 1e-9) + 1 if min_fraction < 1.0 else 1
+    alive = list(range(len(candidates)))
+    rows = []
+    workers = n_workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=min(workers, len(candidates)), initializer=_init_worker,
+                             initargs=data) as pool:
+        for rung in range(n_rungs):
+            fraction = 1.0 if rung == n_rungs - 1 else min(1.0, min_fraction * eta ** rung)
+            jobs = [(i, estimator_cls, base_params or {}, candidates[i], fraction, metric, seed) for i in alive]
+            results = list(pool.map(_evaluate, jobs))
+            for trial_id, score, secs in results:
+                rows.append({"trial": trial_id, "rung": rung, "fraction": fraction, metric: score,
+                             "fit_seconds": secs, **{f"param_{k}": v for k, v in candidates[trial_id].items()}})
+            ranked = sorted((r for r in results if not math.isnan(r[1])), key=lambda r: r[1], reverse=higher_better)
+            if not ranked:
+                break
+            alive = [r[0] for r in ranked[:max(1, math.ceil(len(alive) / eta))]]
+            if len(alive) == 1:
+                break
+
+    trials = pd.DataFrame(rows)
+    best = candidates[alive[0]] if alive else {}
+    return best, trials
+
+
+def log_trials(trials: pd.DataFrame, metric: str, best: dict):
+    """
+    Bulk-log the search to the active MLflow run: one log_batch per 1000 metrics, the full
+    trials table as a JSON artifact and the winning params as `best_*`.
+    """
+    import mlflow
+    from mlflow.entities import Metric, Param
+    from src.common.mlflow_client import client
+
+    run = mlflow.active_run()
+    if run is None or trials.empty:
+        return
+    mc, ts = client(), int(time.time() * 1000)
+    metrics = [Metric(f"tuning_{metric}_rung{int(r.rung)}", float(getattr(r, metric)), ts, int(r.trial))
+               for r in trials.itertuples() if not math.isnan(getattr(r, metric))]
+    params = [Param(f"best_{k}", str(v)) for k, v in best.items()]
+    params.append(Param("tuning_trials", str(trials["trial"].nunique())))
+    for i in range(0, max(len(metrics), 1), 1000):
+        mc.log_batch(run.info.run_id, metrics=metrics[i:i + 1000], params=params if i == 0 else [])
+    mlflow.log_table(trials, artifact_file="tuning/trials.json")
+
+
+def tune_model(model_key: str, estimator_cls, X, y=None, metric: str | None = None,
+               backend: str | None = None, params_dir: Path = PARAMS_DIR, base_params: dict | None = None) -> dict:
+    """
+    Tune `estimator_cls` on (X, y) with the search space in params/<model_key>.yaml and log the trials
+    to the active run. `base_params` are the params the final model is built with (e.g. the backend's
+    defaults); each trial overrides them with its candidate. Returns the best params, or {} when no search
+    space is configured.
+    """
+    cfg = load_search_config(model_key, params_dir, backend)
+    if not cfg.get("space"):
+        print(f"[tuning] no search space in {model_key}.yaml for backend {backend or 'default'}; using defaults")
+        return {}
+    metric = cfg.get("metric", metric)
+    candidates = sample_candidates(cfg["space"], int(cfg.get("n_candidates", 27)), int(cfg.get("seed", 42)))
+    t0 = time.perf_counter()
+    best, trials = successive_halving(
+        estimator_cls, X, y, candidates, metric,
+        eta=int(cfg.get("eta", 3)),
+        min_fraction=float(cfg.get("min_fraction", 0.1)),
+        n_workers=int(cfg.get("n_workers", 0)),
+        seed=int(cfg.get("seed", 42)),
+        base_params=base_params,
+    )
+    log_trials(trials, metric, best)
+    print(f"[tuning] {model_key}: {len(trials)} fits over {len(candidates)} candidates in "
+          f"{time.perf_counter() - t0:.1f}s -> {best}")
+    return best
@@ -1,32 +1,68 @@
 from prometheus_client import start_http_server, Gauge
 from pathlib import Path
+import json
 import time
 
 SCORE_FILE = Path("/app/data/monitoring/clv_drift_score.txt")
 AUC_FILE = Path("/app/data/monitoring/campaign_auc.txt")
 AUC_DELTA_FILE = Path("/app/data/monitoring/campaign_auc_delta.txt")
+AUC_DAILY_FILE = Path("/app/data/monitoring/campaign_auc_daily.txt")
+ECE_FILE = Path("/app/data/monitoring/campaign_ece.txt")
+LIFT_FILE = Path("/app/data/monitoring/campaign_lift_at_10.txt")
 PRICING_VIOLATIONS_FILE = Path("/app/data/monitoring/pricing_guardrail_violations.txt")
 REC_COVERAGE_FILE = Path("/app/data/monitoring/recommender_coverage.txt")
 REC_NOVELTY_FILE = Path("/app/data/monitoring/recommender_novelty.txt")
+# last result per flow task, written by src/monitoring/task_profiler.py when TASK_PROFILING is on
+TASK_PROFILE_DIR = Path("/app/data/monitoring/tasks")
+TASK_FIELDS = {
+    "wall_s": ("flow_task_wall_seconds", "Wall time of the last run of a flow task"),
+    "cpu_s": ("flow_task_cpu_seconds", "CPU time of the last run of a flow task"),
+    "peak_rss_mb": ("flow_task_peak_rss_mb", "Peak process RSS during the last run of a flow task"),
+    "rows_in": ("flow_task_rows_in", "Rows passed into the last run of a flow task"),
+    "rows_out": ("flow_task_rows_out", "Rows returned by the last run of a flow task"),
+    "finished_at": ("flow_task_finished_timestamp", "Unix time the last run of a flow task finished"),
+}
 
 def read_float(p: Path) -> float:
     try: return float(p.read_text().strip())
     except: return 0.0
 
+def read_task_profiles(d: Path) -> list[dict]:
+    out = []
+    for p in sorted(d.glob("*.json")):
+        try: out.append(json.loads(p.read_text()))
+        except: continue
+    return out
+
 if __name__ == "__main__":
     clv_g = Gauge("clv_drift_score", "Share of drifted columns from Evidently (0..1)")
     auc_g = Gauge("propensity_auc", "Current AUC for campaign propensity model")
     auc_delta_g = Gauge("propensity_auc_delta", "Current AUC minus reference AUC")
+    auc_daily_g = Gauge("propensity_auc_daily", "AUC of the latest daily window")
+    ece_g = Gauge("propensity_ece", "Expected calibration error of the latest weekly window")
+    lift_g = Gauge("propensity_lift_at_10", "Lift in the top 10% of scores, latest weekly window")
     pricing_viol_g = Gauge("pricing_guardrail_violations", "Pricing guardrail violations in last run")
     rec_cov_g = Gauge("recommender_coverage", "Recommender coverage across catalog (0..1)")
     rec_nov_g = Gauge("recommender_novelty", "Recommender novelty (avg inverse popularity)")
 
+    task_g = {k: Gauge(name, doc, ["flow", "task"]) for k, (name, doc) in TASK_FIELDS.items()}
+    task_ok_g = Gauge("flow_task_success", "1 if the last run of a flow task succeeded", ["flow", "task"])
+
     start_http_server(9100)
     while True:
         clv_g.set(read_float(SCORE_FILE))
         auc_g.set(read_float(AUC_FILE))
         auc_delta_g.set(read_float(AUC_DELTA_FILE))
+        auc_daily_g.set(read_float(AUC_DAILY_FILE))
+        ece_g.set(read_float(ECE_FILE))
+        lift_g.set(read_float(LIFT_FILE))
         pricing_viol_g.set(read_float(PRICING_VIOLATIONS_FILE))
         rec_cov_g.set(read_float(REC_COVERAGE_FILE))
         rec_nov_g.set(read_float(REC_NOVELTY_FILE))
+        for prof in read_task_profiles(TASK_PROFILE_DIR):
+            labels = (prof.get("flow", "adhoc"), prof.get("task", "unknown"))
+            for key, g in task_g.items():
+                if prof.get(key) is not None:
+                    g.labels(*labels).set(prof[key])
+            task_ok_g.labels(*labels).set(1.0 if prof.get("status") == "ok" else 0.0)
         time.sleep(15)
@@ -0,0 +1,214 @@
+"""
+Opt-in per-task profiling for the Prefect flows.
+
+Use `@profiled` under `@task`, or `@profiled_task(...)` in place of `@task`. Each call records wall and CPU seconds,
+peak RSS (sampled from /proc), rows in (DataFrame / Arrow / array arguments) and rows out (the return value). With
+TASK_PROFILING=flamegraph it also records a collapsed-stack profile sampled from the task's thread, in
+flamegraph.pl / speedscope "folded" format. Results go to:
+
+- MLflow: metrics task.<task>.* plus task_profiles/<flow>__<task>.json (and .folded). They land on the run the task
+  created itself, e.g. a training run; otherwise on one run per Prefect flow run in TASK_PROFILE_EXPERIMENT.
+- TASK_PROFILE_DIR/<flow>__<task>.json: the last result per task, published by the metrics exporter as flow_task_*
+  gauges.
+
+TASK_PROFILING=off (default) | on | flamegraph, read at call time. Recording problems are printed, never raised.
+"""
+from collections import Counter
+import functools
+import json
+import os
+from pathlib import Path
+import sys
+import threading
+import time
+
+PROFILE_DIR = Path(os.environ.get("TASK_PROFILE_DIR", "/app/data/monitoring/tasks"))
+EXPERIMENT = os.environ.get("TASK_PROFILE_EXPERIMENT", "flow_profiles")
+SAMPLE_S = float(os.environ.get("TASK_PROFILE_SAMPLE_MS", "10")) / 1e3
+
+_lock = threading.Lock()
+_profile_runs: dict[str, str] = {}   # prefect flow run id -> mlflow run id
+
+
+def mode() -> str:
+    return os.environ.get("TASK_PROFILING", "off").lower()
+
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3
+
+
+def count_rows(obj) -> int | None:
+    """
+    Rows of a DataFrame / Series / ndarray / Arrow table, summed over tuples and lists of them; None otherwise.
+    """
+    if isinstance(obj, (tuple, list)):
+        counts = [c for c in map(count_rows, obj) if c is not None]
+        return sum(counts) if counts else None
+    num_rows = getattr(obj, "num_rows", None)
+    if isinstance(num_rows, int):
+        return num_rows
+    shape = getattr(obj, "shape", None)
+    if isinstance(shape, tuple) and shape:
+        return int(shape[0])
+    return None
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})"
+
+
+class _Sampler(threading.Thread):
+    """
+    Peak RSS of the process and, optionally, folded call stacks of one thread, every SAMPLE_S seconds.
+    """
+
+    def __init__(self, thread_id: int, stacks: bool):
+        super().__init__(daemon=True, name="task-profiler")
+        self.thread_id, self.collect = thread_id, stacks
+        self.peak = rss_mb()
+        self.stacks: Counter = Counter()
+        self._stop_evt = threading.Event()
+
+    def run(self):
+        while not self._stop_evt.wait(SAMPLE_S):
+            self.peak = max(self.peak, rss_mb())
+            if self.collect:
+                frame = sys._current_frames().get(self.thread_id)
+                names = []
+                while frame is not None:
+                    if frame.f_code.co_filename != __file__:   # leave out the profiler's own wrapper frames
+                        names.append(_frame_name(frame))
+                    frame = frame.f_back
+                if names:
+                    self.stacks[";".join(reversed(names))] += 1
+
+    def stop(self):
+        self._stop_evt.set()
+        self.join()
+        self.peak = max(self.peak, rss_mb())
+
+
+def _prefect_context(default_task: str) -> tuple[str, str, str | None]:
+    """
+    (flow name, task name, flow run id) of the running Prefect task; fallbacks outside Prefect.
+    """
+    try:
+        from prefect.context import FlowRunContext, TaskRunContext
+        flow_ctx, task_ctx = FlowRunContext.get(), TaskRunContext.get()
+    except Exception:
+        return "adhoc", default_task, None
+    flow = flow_ctx.flow.name if flow_ctx else "adhoc"
+    task = task_ctx.task.name if task_ctx else default_task
+    flow_run_id = task_ctx.task_run.flow_run_id if task_ctx else (flow_ctx.flow_run.id if flow_ctx else None)
+    return flow, task, None if flow_run_id is None else str(flow_run_id)
+
+
+def _last_run_id() -> str | None:
+    # only consult mlflow if something in this process already imported it
+    if "mlflow" not in sys.modules:
+        return None
+    try:
+        run = sys.modules["mlflow"].last_active_run()
+        return None if run is None else run.info.run_id
+    except Exception:
+        return None
+
+
+def _profile_run(flow: str, flow_run_id: str | None) -> str:
+    from src.common.mlflow_client import client
+    key = flow_run_id or flow
+    with _lock:
+        if key not in _profile_runs:
+            c = client()
+            exp = c.get_experiment_by_name(EXPERIMENT)
+            exp_id = exp.experiment_id if exp is not None else c.create_experiment(EXPERIMENT)
+            run = c.create_run(exp_id, run_name=f"{flow}-profile",
+                               tags={"prefect_flow": flow, "prefect_flow_run_id": str(flow_run_id)})
+            _profile_runs[key] = run.info.run_id
+        return _profile_runs[key]
+
+
+def _record(result: dict, stacks: Counter, run_id: str | None) -> None:
+    stem = f"{result['flow']}__{result['task']}"
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    paths = [PROFILE_DIR / f"{stem}.json"]
+    tmp = paths[0].with_suffix(".json.tmp")
+    tmp.write_text(json.dumps(result))
+    os.replace(tmp, paths[0])    # the exporter never reads a half-written file
+    if stacks:
+        paths.append(PROFILE_DIR / f"{stem}.folded")
+        paths[1].write_text("".join(f"{stack} {n}\n" for stack, n in stacks.most_common()))
+
+    from src.common.mlflow_client import client
+    from src.common.registry import log_batch
+    own_run = run_id is not None
+    run_id = run_id or _profile_run(result["flow"], result["flow_run_id"])
+    prefix = f"task.{result['task']}"
+    metrics = {f"{prefix}.{k}": result[k] for k in ("wall_s", "cpu_s", "peak_rss_mb", "rss_delta_mb", "rows_in",
+                                                     "rows_out") if result[k] is not None}
+    log_batch(run_id, metrics=metrics)
+    for path in paths:
+        client().log_artifact(run_id, str(path), artifact_path="task_profiles")
+    if not own_run:
+        client().set_terminated(run_id)   # FINISHED with the latest end time; later tasks can still log to it
+
+
+def _call(fn, args, kwargs):
+    flamegraph = mode() == "flamegraph"
+    flow, task, flow_run_id = _prefect_context(fn.__name__)
+    before = _last_run_id()
+    sampler = _Sampler(threading.get_ident(), stacks=flamegraph)
+    rss0 = sampler.peak
+    sampler.start()
+    t0, c0 = time.perf_counter(), time.process_time()
+    status, out = "failed", None
+    try:
+        out = fn(*args, **kwargs)
+        status = "ok"
+        return out
+    finally:
+        wall, cpu = time.perf_counter() - t0, time.process_time() - c0
+        sampler.stop()
+        result = {
+            "flow": flow, "task": task, "flow_run_id": flow_run_id, "status": status, "finished_at": time.time(),
+            "wall_s": round(wall, 4), "cpu_s": round(cpu, 4), "peak_rss_mb": round(sampler.peak, 1),
+            "rss_delta_mb": round(sampler.peak - rss0, 1),
+            "rows_in": count_rows(list(args) + list(kwargs.values())), "rows_out": count_rows(out),
+        }
+        after = _last_run_id()
+        try:
+            _record(result, sampler.stacks, after if after != before else None)
+        except Exception as ex:
+            print(f"[task_profiler] could not record {flow}/{task}: {ex}")
+        print(f"[task_profiler] {flow}/{task} {status} wall={result['wall_s']}s cpu={result['cpu_s']}s "
+              f"peak_rss={result['peak_rss_mb']}MB rows {result['rows_in']}->{result['rows_out']}")
+
+
+def profiled(fn):
+    """
+    Instrument fn when TASK_PROFILING is on; a plain call otherwise. Put it under @task.
+    """
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if mode() in ("on", "flamegraph"):
+            return _call(fn, args, kwargs)
+        return fn(*args, **kwargs)
+    return wrapper
+
+
+def profiled_task(__fn=None, **task_kwargs):
+    """
+    Drop-in for prefect's @task / @task(...) that also applies @profiled.
+    """
+    from prefect import task
+
+    def decorate(fn):
+        return task(profiled(fn), **task_kwargs)
+    return decorate(__fn) if __fn is not None else decorate
@@ -0,0 +1,134 @@
+"""
+Mergeable, time-windowed classifier metrics.
+
+Each scored row lands in a (window, score bin) cell holding positive/negative counts and the score sum. Cells add
+up, so AUC, calibration error and lift for any range of windows come from the stored histograms without rescoring.
+Rows must be keyed by event time, with labels that depend only on events inside their own window (e.g. one row per
+customer-day). Then a window's contents stop changing once it closes, and stored windows never need rescoring.
+"""
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+N_BINS = 100
+FREQS = ("daily", "weekly")
+STATE_COLUMNS = ["model_version", "freq", "window", "bin", "pos", "neg", "score_sum"]
+
+
+def window_start(ts: pd.Series, freq: str) -> pd.Series:
+    ts = pd.to_datetime(ts)
+    if freq == "daily":
+        return ts.dt.floor("D")
+    if freq == "weekly":
+        return ts.dt.to_period("W-SUN").dt.start_time  # Monday-based weeks
+    raise ValueError(f"unknown window frequency {freq!r}; choose from {FREQS}")
+
+
+def histogram_state(scores, y, windows: pd.Series, n_bins: int = N_BINS) -> pd.DataFrame:
+    """
+    Sparse per-(window, bin) counts for one batch of scored rows.
+    """
+    scores = np.clip(np.asarray(scores, dtype=np.float64), 0.0, 1.0)
+    y = np.asarray(y).astype(bool)
+    bins = np.minimum((scores * n_bins).astype(np.int64), n_bins - 1)
+    codes, uniq = pd.factorize(pd.Series(windows), sort=True)
+    cell = codes.astype(np.int64) * n_bins + bins
+    size = len(uniq) * n_bins
+    pos = np.bincount(cell[y], minlength=size)
+    neg = np.bincount(cell[~y], minlength=size)
+    score_sum = np.bincount(cell, weights=scores, minlength=size)
+    nz = np.flatnonzero(pos + neg)
+    return pd.DataFrame({
+        "window": np.asarray(uniq)[nz // n_bins], "bin": nz % n_bins,
+        "pos": pos[nz], "neg": neg[nz], "score_sum": score_sum[nz],
+    })
+
+
+def merge_bins(cells: pd.DataFrame, n_bins: int = N_BINS) -> pd.DataFrame:
+    return cells.groupby("bin")[["pos", "neg", "score_sum"]].sum().reindex(range(n_bins), fill_value=0)
+
+
+def metrics_from_bins(h: pd.DataFrame, lift_fraction: float = 0.1) -> dict:
+    """
+    AUC (ties within a bin count half), expected calibration error and lift in the top `lift_fraction` of scores.
+    """
+    pos = h["pos"].to_numpy(dtype=np.float64)
+    neg = h["neg"].to_numpy(dtype=np.float64)
+    count = pos + neg
+    n, n_pos = count.sum(), pos.sum()
+    out = {"n": int(n), "positives": int(n_pos), "auc": None, "ece": None, "lift": None}
+    if n == 0:
+        return out
+    n_neg = n - n_pos
+    if n_pos > 0 and n_neg > 0:
+        neg_below = np.cumsum(neg) - neg
+        out["auc"] = float(((pos * neg_below).sum() + 0.5 * (pos * neg).sum()) / (n_pos * n_neg))
+    occupied = count > 0
+    mean_score = h["score_sum"].to_numpy()[occupied] / count[occupied]
+    out["ece"] = float(np.sum(count[occupied] / n * np.abs(pos[occupied] / count[occupied] - mean_score)))
+    if n_pos > 0:
+        # walk bins from the top score down until lift_fraction of rows are covered (last bin taken pro rata)
+        take = np.clip(lift_fraction * n - (np.cumsum(count[::-1]) - count[::-1]), 0, count[::-1])
+        rate = np.divide(pos[::-1], count[::-1], out=np.zeros_like(count), where=count[::-1] > 0)
+        top_rate = float((take * rate).sum() / take.sum())
+        out["lift"] = float(top_rate / (n_pos / n))
+    return out
+
+
+def load_state(path: Path) -> pd.DataFrame:
+    if Path(path).exists():
+        return pd.read_parquet(path)
+    return pd.DataFrame({c: pd.Series(dtype=t) for c, t in zip(
+        STATE_COLUMNS, ["object", "object", "datetime64[ns]", "int64", "int64", "int64", "float64"])})
+
+
+def save_state(state: pd.DataFrame, path: Path) -> None:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    state.to_parquet(tmp, index=False)
+    tmp.replace(path)
+
+
+def resume_from(state: pd.DataFrame, model_version: str) -> pd.Timestamp | None:
+    """
+    Earliest window start that still needs (re)scoring for `model_version`: the latest stored window of the
+    coarsest frequency, which may have been partial last run. None means no state yet (score everything).
+    """
+    mine = state[state["model_version"] == str(model_version)]
+    if mine.empty:
+        return None
+    return min(mine.loc[mine["freq"] == f, "window"].max() for f in FREQS if (mine["freq"] == f).any())
+
+
+def update_state(state: pd.DataFrame, scores, y, ts: pd.Series, model_version: str,
+                 since: pd.Timestamp | None) -> pd.DataFrame:
+    """
+    Replace every stored window starting at or after `since` with histograms of the freshly scored rows
+    (which must be all rows with ts >= since); earlier windows are kept as they are, so rows must never move to a
+    later window or change label after their own window is stored.
+    """
+    parts = [histogram_state(scores, y, window_start(ts, f)).assign(freq=f) for f in FREQS]
+    new = pd.concat(parts, ignore_index=True).assign(model_version=str(model_version))[STATE_COLUMNS]
+    keep = state["model_version"] != str(model_version)
+    if since is not None:
+        keep |= state["window"] < since
+    return pd.concat([state[keep], new], ignore_index=True) if keep.any() else new
+
+
+def window_metrics(state: pd.DataFrame, model_version: str, freq: str, start=None, end=None) -> dict:
+    """
+    Metrics over the merged windows of one frequency in [start, end] (either bound optional).
+    """
+    cells = state[(state["model_version"] == str(model_version)) & (state["freq"] == freq)]
+    if start is not None:
+        cells = cells[cells["window"] >= pd.Timestamp(start)]
+    if end is not None:
+        cells = cells[cells["window"] <= pd.Timestamp(end)]
+    return metrics_from_bins(merge_bins(cells))
+
+
+def per_window_table(state: pd.DataFrame, model_version: str) -> pd.DataFrame:
+    mine = state[state["model_version"] == str(model_version)]
+    rows = [{"freq": f, "window": w, **metrics_from_bins(merge_bins(g))} for (f, w), g in mine.groupby(["freq", "window"])]
+    return pd.DataFrame(rows)
@@ -1,24 +1,30 @@
-import os
-import mlflow, mlflow.sklearn
+import mlflow
 import pandas as pd
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import r2_score
 from sklearn.ensemble import GradientBoostingRegressor
+from src.common.schemas import PRICING_FEATURES
+from src.common.tuning import tune_model
+from src.common.tables import as_frame
+from src.common.mlflow_client import configure
+from src.common.registry import log_and_register, log_batch
 
-def train_pricing(feats_path: str):
-    mlflow.set_tracking_uri(os.environ.get("MLFLOW_TRACKING_URI", "http://mlflow:5000"))
-    mlflow.set_experiment("pricing_experiment")
+def train_pricing(feats_path, params: dict | None = None, tune: bool = False):
+    configure("pricing_experiment")
 
-    df = pd.read_parquet(feats_path).copy()
+    # feats_path: parquet path, DataFrame or pyarrow.Table
+    df = as_frame(feats_path)
     # Target proxy: price_sensitivity (from features builder)
     y = df["price_sensitivity"].fillna(0.0)
-    X = df[["avg_price","units","revenue","avg_discount","premium_share"]].fillna(0.0)
+    X = df[PRICING_FEATURES].fillna(0.0)
 
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-    with mlflow.start_run(run_name="pricing_gbr"):
-        model = GradientBoostingRegressor(random_state=42)
+    with mlflow.start_run(run_name="pricing_gbr") as run:
+        params = dict(params or {})
+        if tune:
+            params.update(tune_model("pricing", GradientBoostingRegressor, X_train, y_train, metric="r2"))
+        model = GradientBoostingRegressor(random_state=42, **params)
         model.fit(X_train, y_train)
         r2 = r2_score(y_test, model.predict(X_test))
-        mlflow.log_metric("r2", float(r2))
-        mlflow.log_params({"model": "GBR"})
-        mlflow.sklearn.log_model(model, "model", registered_model_name="pricing_model")
+        log_batch(run.info.run_id, metrics={"r2": r2}, params={"model": "GBR", **params})
+        log_and_register(model, "pricing_model", run)
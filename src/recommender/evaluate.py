@@ -0,0 +1,131 @@
+"""
+Offline ranking evaluation of the ALS recommender against a time-based holdout.
+
+The model is trained on interactions before a cutoff; every known user who bought a known item after it, one they
+had not bought before, is an evaluation user. Their top-k over the whole catalog (training purchases excluded) is
+scored against those holdout items: precision@k, recall@k, MAP@k (AP normalised by min(|relevant|, k)) and NDCG@k
+with binary relevance, averaged over evaluation users, plus catalog coverage of the recommended lists.
+
+All users are scored; there is no per-user Python code. Users go in chunks through the shared thread pool
+(`batch_inference.map_chunks`): one factor matmul per chunk, training items masked in place, top-k by
+argpartition, and hits found by searching the chunk's sorted (row, item) holdout keys. A chunk holds as many users
+as fit EVAL_SCORE_BUDGET_MB (default 64) of scores, so memory stays at a few chunks whatever the user count.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.common.batch_inference import catalog_coverage, map_chunks
+
+KS = (5, 10, 20)
+SCORE_BUDGET_MB = float(os.environ.get("EVAL_SCORE_BUDGET_MB", "64"))
+
+
+def holdout_cutoff(timestamps, holdout_days: float) -> pd.Timestamp:
+    """
+    Start of the holdout window: `holdout_days` before the latest timestamp.
+    """
+    return pd.to_datetime(timestamps).max() - pd.Timedelta(days=holdout_days)
+
+
+def _positions(ids: pd.Series, index: dict) -> np.ndarray:
+    # id -> model position, -1 for ids the model doesn't know; one hash lookup pass instead of a per-row dict map
+    keys = pd.Index(list(index))
+    pos = np.fromiter(index.values(), dtype=np.int64, count=len(index))
+    found = keys.get_indexer(ids.astype(str))
+    return np.where(found >= 0, pos[found], -1)
+
+
+def _csr(rows: np.ndarray, cols: np.ndarray, n_rows: int) -> tuple[np.ndarray, np.ndarray]:
+    order = np.lexsort((cols, rows))
+    indptr = np.zeros(n_rows + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=n_rows), out=indptr[1:])
+    return indptr, cols[order]
+
+
+def relevance(rec, train_ui: pd.DataFrame, holdout: pd.DataFrame):
+    """
+    Evaluation users and what they are scored against.
+
+    Returns (user positions [n], relevant CSR (indptr, indices), training CSR (indptr, indices)), rows in user
+    order. Relevant items are the holdout items known to the model that the user did not already have in
+    `train_ui`; users left with none are not evaluated.
+    """
+    n_items = len(rec.item_index)
+    hu, hi = _positions(holdout["customer_id"], rec.user_index), _positions(holdout["product_id"], rec.item_index)
+    known = (hu >= 0) & (hi >= 0)
+    h_keys = np.unique(hu[known] * n_items + hi[known])
+
+    users = np.unique(h_keys // n_items)
+    tu = _positions(train_ui["customer_id"], rec.user_index)
+    mine = np.isin(tu, users)
+    ti = _positions(train_ui.loc[mine, "product_id"], rec.item_index)
+    t_keys = np.unique(tu[mine][ti >= 0] * n_items + ti[ti >= 0])
+    h_keys = h_keys[~np.isin(h_keys, t_keys, assume_unique=True)]   # repeat purchases can't be recommended
+
+    users = np.unique(h_keys // n_items)
+    rel_rows = np.searchsorted(users, h_keys // n_items)
+    t_keys = t_keys[np.isin(t_keys // n_items, users)]
+    train_rows = np.searchsorted(users, t_keys // n_items)
+    return (users, _csr(rel_rows, h_keys % n_items, len(users)),
+            _csr(train_rows, t_keys % n_items, len(users)))
+
+
+def hits(top: np.ndarray, indptr: np.ndarray, indices: np.ndarray, n_items: int) -> np.ndarray:
+    """
+    [n, k] bool: top[r, j] is one of row r's relevant items (CSR rows sorted by item, as built by `relevance`).
+    """
+    counts = np.diff(indptr)
+    keys = np.repeat(np.arange(len(top)), counts) * n_items + indices[indptr[0]:indptr[-1]]
+    want = np.arange(len(top))[:, None] * n_items + top
+    pos = np.searchsorted(keys, want).clip(max=max(len(keys) - 1, 0))
+    return (top >= 0) & (keys[pos] == want) if len(keys) else np.zeros(top.shape, dtype=bool)
+
+
+def ranking_sums(hit: np.ndarray, n_relevant: np.ndarray, ks=KS) -> dict:
+    """
+    Per-k sums over rows of precision, recall, average precision and NDCG (the caller divides by the user count).
+    """
+    out = {}
+    ranks = np.arange(1, hit.shape[1] + 1)
+    discount = 1.0 / np.log2(ranks + 1)
+    ideal = np.concatenate([[0.0], np.cumsum(discount)])   # ideal DCG for 0..K relevant items
+    for k in ks:
+        h = hit[:, :k]
+        n_hit = h.sum(axis=1)
+        cap = np.minimum(n_relevant, k)
+        out[f"precision_at_{k}"] = float((n_hit / k).sum())
+        out[f"recall_at_{k}"] = float((n_hit / n_relevant).sum())
+        out[f"map_at_{k}"] = float(((np.cumsum(h, axis=1) / ranks[:k] * h).sum(axis=1) / cap).sum())
+        out[f"ndcg_at_{k}"] = float(((h * discount[:k]).sum(axis=1) / ideal[cap]).sum())
+    return out
+
+
+def evaluate_als(rec, train_ui: pd.DataFrame, holdout: pd.DataFrame, ks=KS, chunk_rows: int | None = None,
+                 workers: int = 0) -> dict:
+    """
+    Ranking metrics of an ALSRecommender trained on `train_ui` against `holdout` interactions (customer_id,
+    product_id), as a flat dict ready for mlflow.log_metrics.
+    """
+    ks = tuple(sorted(ks))
+    n_items = len(rec.item_index)
+    users, (rel_ptr, rel_idx), (train_ptr, train_idx) = relevance(rec, train_ui, holdout)
+    out = {"eval_users": len(users), "eval_holdout_items": len(rel_idx)}
+    if len(users) == 0:
+        return out
+    k_max = min(ks[-1], n_items)
+    chunk_rows = chunk_rows or max(1, int(SCORE_BUDGET_MB * 1e6 / (12 * n_items)))   # scores + argpartition ids
+
+    def score(rows: np.ndarray):
+        s, e = rows[0], rows[-1] + 1
+        exclude = (train_ptr[s:e + 1] - train_ptr[s], train_idx[train_ptr[s]:train_ptr[e]])
+        top, _ = rec.top_k(rec.user_vectors(users[s:e]), k_max, chunk_rows=e - s, exclude=exclude)
+        hit = hits(top, rel_ptr[s:e + 1] - rel_ptr[s], rel_idx[rel_ptr[s]:rel_ptr[e]], n_items)
+        return ranking_sums(hit, np.diff(rel_ptr[s:e + 1]), [k for k in ks if k <= k_max]), np.unique(top[:, :ks[0]])
+
+    parts = map_chunks(score, np.arange(len(users)), chunk_rows, workers)
+    for key in parts[0][0]:
+        out[key] = sum(p[0][key] for p in parts) / len(users)
+    out[f"coverage_at_{ks[0]}"] = catalog_coverage(np.concatenate([p[1] for p in parts]), n_items)
+    return out
@@ -0,0 +1,59 @@
+"""
+Implicit-ALS fold-in: factors for new or changed users (or items) from their interactions, solved in closed form
+against the fixed opposite-side factors. Same objective as the `implicit` library with confidence = strength and
+preference = 1 for observed pairs (Hu, Koren & Volinsky 2008):
+
+    x_u = (YtY + reg*I + sum_i (c_ui - 1) y_i y_i^T)^-1  sum_i c_ui y_i
+"""
+import numpy as np
+
+
+def gram(factors: np.ndarray) -> np.ndarray:
+    """
+    YtY of the fixed side; computed once and shared by every solve.
+    """
+    f = np.asarray(factors, dtype=np.float64)
+    return f.T @ f
+
+
+def fold_in(fixed: np.ndarray, idx, confidence, reg: float, YtY: np.ndarray | None = None) -> np.ndarray:
+    """
+    One row's factor vector from its interactions: `idx` rows of `fixed` with `confidence` weights.
+    """
+    fixed = np.asarray(fixed)
+    n_factors = fixed.shape[1]
+    idx = np.asarray(idx, dtype=np.int64)
+    if idx.size == 0:
+        return np.zeros(n_factors, dtype=fixed.dtype)
+    c = np.asarray(confidence, dtype=np.float64)
+    Y = fixed[idx].astype(np.float64)
+    A = (gram(fixed) if YtY is None else YtY) + reg * np.eye(n_factors)
+    A += (Y * (c - 1.0)[:, None]).T @ Y
+    b = Y.T @ c
+    return np.linalg.solve(A, b).astype(fixed.dtype)
+
+
+def fold_in_many(fixed: np.ndarray, indptr, indices, data, reg: float, YtY: np.ndarray | None = None) -> np.ndarray:
+    """
+    Factor vectors for every row of a CSR-style (indptr, indices, data) interaction block; [n_rows, n_factors].
+    """
+    YtY = gram(fixed) if YtY is None else YtY
+    out = np.zeros((len(indptr) - 1, np.asarray(fixed).shape[1]), dtype=np.asarray(fixed).dtype)
+    for r in range(len(indptr) - 1):
+        s, e = indptr[r], indptr[r + 1]
+        if e > s:
+            out[r] = fold_in(fixed, indices[s:e], data[s:e], reg, YtY)
+    return out
+
+
+def interactions_csr(df, row_col: str, col_col: str, col_index: dict, value_col: str = "strength"):
+    """
+    Group interactions by `row_col` into CSR arrays over the known `col_index`; pairs with unknown columns are dropped.
+    Returns (row ids, indptr, indices, data).
+    """
+    cols = df[col_col].astype(str).map(col_index)
+    df = df.assign(_col=cols).dropna(subset=["_col"])
+    df = df.groupby([df[row_col].astype(str), "_col"], sort=True)[value_col].sum().reset_index()
+    rows, starts = np.unique(df[row_col].to_numpy(), return_index=True)
+    indptr = np.append(starts, len(df))
+    return rows, indptr, df["_col"].to_numpy(dtype=np.int64), df[value_col].to_numpy(dtype=np.float64)
@@ -0,0 +1,39 @@
+"""
+Reduced-precision storage for factor matrices.
+
+- float32: as trained.
+- float16: half the memory. Values are rounded to about 3 significant digits.
+- int8: a quarter of the memory, plus one float32 scale per row. Each row is quantized symmetrically to [-127, 127]
+  with scale = max|row| / 127, so every row keeps its own dynamic range. The rounding error per coordinate is at
+  most 0.4% of the row's largest coordinate.
+
+Scoring always runs in float32 on dequantized rows, because numpy's BLAS has no float16 / int8 GEMM.
+ALSRecommender expands only the user rows of the chunk being scored, so the user matrix stays resident at its
+stored size. The much smaller item side is expanded once per process.
+"""
+import numpy as np
+
+FACTOR_DTYPES = ("float32", "float16", "int8")
+
+
+def quantize_rows(x: np.ndarray, dtype: str) -> tuple[np.ndarray, np.ndarray | None]:
+    """
+    (stored matrix, per-row float32 scales or None) for `x` in storage dtype `dtype`.
+    """
+    if dtype not in FACTOR_DTYPES:
+        raise ValueError(f"unknown factor dtype {dtype!r}; choose from {FACTOR_DTYPES}")
+    x = np.asarray(x, dtype=np.float32)
+    if dtype != "int8":
+        return x.astype(dtype, copy=False), None
+    scales = np.abs(x).max(axis=1) / 127.0 if x.size else np.ones(len(x), dtype=np.float32)
+    scales = np.where(scales > 0, scales, 1.0).astype(np.float32)
+    q = np.clip(np.rint(x / scales[:, None]), -127, 127).astype(np.int8)
+    return q, scales
+
+
+def dequantize_rows(q: np.ndarray, scales: np.ndarray | None = None) -> np.ndarray:
+    """
+    float32 rows of a stored matrix (or of a slice / fancy-indexed subset of it, with the matching scales).
+    """
+    out = np.asarray(q, dtype=np.float32)
+    return out * scales[:, None] if scales is not None else out
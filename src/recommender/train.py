@@ -1,33 +1,161 @@
-import os
-import mlflow
+import mlflow, mlflow.pyfunc
+import numpy as np
 import pandas as pd
+from src.common.mlflow_client import configure
+from src.common.tables import as_frame
 
-def train_cooccurrence(ui_path: str):
-    """
-    Build simple co-occurrence scores: for each item, items co-purchased with it.
-    Store a mapping as an artifact (CSV).
-    """
-    mlflow.set_tracking_uri(os.environ.get("MLFLOW_TRACKING_URI", "http://mlflow:5000"))
-    mlflow.set_experiment("recommender_experiment")
-
-    ui = pd.read_parquet(ui_path)
-    # build item -> set of users
-    item_users = ui.groupby("product_id")["customer_id"].apply(set).to_dict()
-    # co-occurrence: score(i,j) = |users(i) ∩ users(j)|
-    items = list(item_users.keys())
-    rows = []
-    for i in items:
-        ui_i = item_users[i]
-        for j in items:
-            if j == i:
-                continue
-            score = len(ui_i.intersection(item_users[j]))
-            if score > 0:
-                rows.append((i, j, score))
-    co = pd.DataFrame(rows, columns=["item","item_rec","score"])
+class FallbackRecommender(mlflow.pyfunc.PythonModel):
+    """
+    Cold-start tiers behind ALS, served from compact precomputed arrays:
+      - co-occurrence: each item's top-N co-purchased items (CSR), scored from a customer's recent purchases
+      - popularity: catalog positions sorted by number of distinct buyers
+    A request touches at most len(recent) * N neighbour entries plus k popular items.
+    """
+    SHARED_ARRAYS = ("co_indptr", "co_indices", "co_scores", "popular", "recent_indptr", "recent_items")
+
+    def __init__(self, item_ids, co_indptr, co_indices, co_scores, popular, user_ids, recent_indptr, recent_items):
+        self.item_ids = np.asarray(item_ids, dtype=object)
+        self.item_index = {p: i for i, p in enumerate(self.item_ids)}
+        self.co_indptr, self.co_indices, self.co_scores = co_indptr, co_indices, co_scores
+        self.popular = popular
+        self.user_index = {u: i for i, u in enumerate(user_ids)}
+        self.recent_indptr, self.recent_items = recent_indptr, recent_items
+
+    def recent_for(self, user_id) -> np.ndarray:
+        r = self.user_index.get(user_id)
+        if r is None:
+            return np.empty(0, dtype=np.int64)
+        return self.recent_items[self.recent_indptr[r]:self.recent_indptr[r + 1]]
+
+    def positions(self, product_ids) -> np.ndarray:
+        return np.array([self.item_index[p] for p in map(str, product_ids) if p in self.item_index], dtype=np.int64)
+
+    def popular_top(self, k: int, exclude=()) -> np.ndarray:
+        exclude = set(int(e) for e in exclude)
+        return np.array([p for p in self.popular[:k + len(exclude)] if p not in exclude][:k], dtype=np.int64)
+
+    def cooccurrence_top(self, seeds: np.ndarray, k: int):
+        """
+        Items co-purchased with `seeds`, scored by summed co-occurrence counts; seeds themselves excluded.
+        """
+        if len(seeds) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        idx = np.concatenate([self.co_indices[self.co_indptr[s]:self.co_indptr[s + 1]] for s in seeds])
+        sc = np.concatenate([self.co_scores[self.co_indptr[s]:self.co_indptr[s + 1]] for s in seeds])
+        keep = ~np.isin(idx, seeds)
+        cand, inv = np.unique(idx[keep], return_inverse=True)
+        total = np.bincount(inv, weights=sc[keep], minlength=len(cand))
+        top = np.argsort(-total, kind="stable")[:k]
+        return cand[top], total[top]
+
+    def recommend(self, user_id, k: int = 5, recent_items=None):
+        """
+        (tier, rec_list): co-occurrence from `recent_items` (or the customer's stored recent purchases),
+        backfilled from popularity; popularity alone when nothing is known about the customer.
+        """
+        seeds = self.positions(recent_items) if recent_items else self.recent_for(user_id)
+        items, scores = self.cooccurrence_top(seeds, k)
+        recs = [{"product_id": str(self.item_ids[i]), "score": float(s)} for i, s in zip(items, scores)]
+        tier = "cooccurrence" if recs else "popularity"
+        if len(recs) < k:
+            for i in self.popular_top(k - len(recs), exclude=np.concatenate([seeds, items])):
+                recs.append({"product_id": str(self.item_ids[i]), "score": 0.0})
+        return tier, recs
+
+    def predict(self, context, model_input):
+        """
+        model_input: DataFrame with customer_id, optional k (default 5) and optional recent_items (list of product_id)
+        Returns: list[dict] {"customer_id", "tier", "rec_list"} per input row
+        """
+        ks = model_input["k"].fillna(5).astype(int).tolist() if "k" in model_input else [5] * len(model_input)
+        recent = model_input["recent_items"].tolist() if "recent_items" in model_input else [None] * len(model_input)
+        out = []
+        for uid, k, items in zip(model_input["customer_id"].tolist(), ks, recent):
+            tier, recs = self.recommend(str(uid), k, items if isinstance(items, (list, tuple, np.ndarray)) else None)
+            out.append({"customer_id": uid, "tier": tier, "rec_list": recs})
+        return out
+
+
+def cooccurrence_top_n(ui: pd.DataFrame, item_index: dict, user_index: dict, top_n: int = 50, chunk_items: int = 2048):
+    """
+    Per-item top-N co-purchased items as CSR (indptr, indices, scores), score(i, j) = #customers who bought both.
+    Built from the sparse customer x item incidence matrix, a block of item rows at a time.
+    """
+    from scipy.sparse import csr_matrix
+    rows = ui["customer_id"].map(user_index).to_numpy()
+    cols = ui["product_id"].map(item_index).to_numpy()
+    X = csr_matrix((np.ones(len(ui), dtype=np.float32), (rows, cols)), shape=(len(user_index), len(item_index)))
+    X.data[:] = 1.0  # duplicate (customer, item) rows count once
+    XT = X.T.tocsr()
+    indptr, indices, scores = [0], [], []
+    for start in range(0, len(item_index), chunk_items):
+        block = (XT[start:start + chunk_items] @ X).tocsr()
+        block.setdiag(0)
+        block.eliminate_zeros()
+        for r in range(block.shape[0]):
+            s, e = block.indptr[r], block.indptr[r + 1]
+            idx, val = block.indices[s:e], block.data[s:e]
+            if len(val) > top_n:
+                sel = np.argpartition(-val, top_n)[:top_n]
+                idx, val = idx[sel], val[sel]
+            order = np.argsort(-val, kind="stable")
+            indices.append(idx[order])
+            scores.append(val[order])
+            indptr.append(indptr[-1] + len(idx))
+    cat = lambda parts, dt: np.concatenate(parts).astype(dt) if parts else np.empty(0, dtype=dt)
+    return np.asarray(indptr, dtype=np.int64), cat(indices, np.int32), cat(scores, np.float32)
+
+
+def recent_purchases(tx: pd.DataFrame, item_index: dict, per_user: int = 10):
+    """
+    Each customer's last `per_user` distinct purchased items (by timestamp) as CSR over catalog positions.
+    """
+    tx = tx[["customer_id", "product_id", "timestamp"]].astype({"customer_id": str, "product_id": str})
+    tx = tx[tx["product_id"].isin(item_index)]
+    tx = tx.sort_values("timestamp", ascending=False).drop_duplicates(["customer_id", "product_id"])
+    tx = tx.groupby("customer_id", sort=True).head(per_user).sort_values("customer_id", kind="stable")
+    users, starts = np.unique(tx["customer_id"].to_numpy(), return_index=True)
+    return users, np.append(starts, len(tx)).astype(np.int64), tx["product_id"].map(item_index).to_numpy(np.int32)
+
+
+def train_cooccurrence(ui_path, tx_path=None, top_n: int = 50, recent_per_user: int = 10,
+                       n_popular: int = 500):
+    """
+    Build the co-occurrence + popularity fallback tiers and register them as `recommender_fallback_model`.
+    Recent purchases come from `tx_path` (transactions with timestamps) when given, else each customer's
+    strongest items in the user-item table. Both accept a parquet path, DataFrame or pyarrow.Table.
+    """
+    configure("recommender_experiment")
+
+    ui = as_frame(ui_path)
+    ui = ui.assign(customer_id=ui["customer_id"].astype(str), product_id=ui["product_id"].astype(str))
+    item_ids = np.sort(ui["product_id"].unique())
+    item_index = {p: i for i, p in enumerate(item_ids)}
+    user_index = {u: i for i, u in enumerate(np.sort(ui["customer_id"].unique()))}
+
+    co_indptr, co_indices, co_scores = cooccurrence_top_n(ui, item_index, user_index, top_n=top_n)
+    buyers = ui.groupby("product_id")["customer_id"].nunique()
+    popular = buyers.reindex(item_ids).fillna(0).to_numpy().argsort(kind="stable")[::-1][:n_popular].astype(np.int32)
+
+    if tx_path is not None:
+        users, recent_indptr, recent = recent_purchases(as_frame(tx_path, ["customer_id", "product_id", "timestamp"]), item_index, recent_per_user)
+    else:
+        strongest = ui.assign(timestamp=ui["strength"])  # strongest first, same ordering code path
+        users, recent_indptr, recent = recent_purchases(strongest, item_index, recent_per_user)
+
+    model = FallbackRecommender(item_ids, co_indptr, co_indices, co_scores, popular, users, recent_indptr, recent)
 
     with mlflow.start_run(run_name="cooccurrence"):
+        mlflow.log_params({"top_n": top_n, "recent_per_user": recent_per_user, "n_popular": n_popular})
+        mlflow.log_metrics({"n_items": len(item_ids), "n_users": len(users), "cooccurrence_nnz": len(co_indices)})
+        # long-format top-N table kept as a browsable artifact
         out_path = "cooccurrence.parquet"
-        co.to_parquet(out_path, index=False)
+        src = np.repeat(np.arange(len(item_ids)), np.diff(co_indptr))
+        pd.DataFrame({"item": item_ids[src], "item_rec": item_ids[co_indices], "score": co_scores}).to_parquet(out_path, index=False)
         mlflow.log_artifact(out_path)
-        # You can register a pyfunc later; for now we’ll load this artifact in the API.
+        mlflow.pyfunc.log_model(
+            artifact_path="model",
+            python_model=model,
+            registered_model_name="recommender_fallback_model",
+        )
+    return model
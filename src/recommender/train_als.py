@@ -1,52 +1,187 @@
-import os
 import mlflow
 import mlflow.pyfunc
+import os
 import numpy as np
 import pandas as pd
-from scipy.sparse import coo_matrix
-from implicit.als import AlternatingLeastSquares
+from src.recommender.foldin import fold_in, gram
+from src.recommender.quantize import dequantize_rows, quantize_rows
+from src.common.mlflow_client import configure
+from src.common.tables import as_frame
+
+ALS_FACTOR_DTYPE = os.environ.get("ALS_FACTOR_DTYPE", "float32")
+
 
 class ALSRecommender(mlflow.pyfunc.PythonModel):
-    def __init__(self, user_factors, item_factors, user_index, item_index):
-        self.user_factors = user_factors
-        self.item_factors = item_factors
+    SHARED_ARRAYS = ("user_factors", "item_factors", "user_scales", "item_scales")   # see src/common/shared_arrays.py
+
+    def __init__(self, user_factors, item_factors, user_index, item_index, reg: float = 1e-2,
+                 factor_dtype: str = "float32"):
+        # factors are stored as float32, float16 or int8 + per-row scales (src/recommender/quantize.py)
+        self.factor_dtype = factor_dtype
+        self.user_factors, self.user_scales = quantize_rows(user_factors, factor_dtype)
+        self.item_factors, self.item_scales = quantize_rows(item_factors, factor_dtype)
         self.user_index = user_index   # dict: user_id -> internal index
         self.item_index = item_index   # dict: item_id -> internal index
+        self.reg = reg                 # ALS regularization, reused by fold-in solves
         self.rev_item_index = {v: k for k, v in item_index.items()}
+        self.item_ids = np.array([self.rev_item_index[i] for i in range(len(item_index))], dtype=object)
+
+    def user_vectors(self, rows) -> np.ndarray:
+        """
+        float32 factors of users at internal positions `rows`; only these rows are dequantized.
+        """
+        scales = getattr(self, "user_scales", None)
+        return dequantize_rows(self.user_factors[rows], None if scales is None else scales[rows])
+
+    def user_matrix(self) -> np.ndarray:
+        return self.user_vectors(slice(None))
+
+    def item_matrix(self) -> np.ndarray:
+        """
+        float32 item factors for scoring. The catalog is small next to the user base, so a reduced-precision item
+        side is dequantized once and cached.
+        """
+        if self.item_factors.dtype == np.float32:
+            return self.item_factors
+        if getattr(self, "_item_f32", None) is None:
+            self._item_f32 = dequantize_rows(self.item_factors, getattr(self, "item_scales", None))
+        return self._item_f32
+
+    def _item_gram(self):
+        # YtY of the item side, shared by every user fold-in until the item factors change
+        if getattr(self, "_item_yty", None) is None:
+            self._item_yty = gram(self.item_matrix())
+        return self._item_yty
+
+    def top_k(self, vectors: np.ndarray, k: int = 5, chunk_rows: int = 4096, exclude=None):
+        """
+        Top-k catalog positions and scores for user factor vectors [n, f]: one matmul per chunk of users.
+        `exclude` = (indptr, indices): CSR of catalog positions to leave out per vector row (e.g. already bought);
+        slots that only excluded items could fill come back as position -1.
+        """
+        items = self.item_matrix()
+        n_items = items.shape[0]
+        k = max(0, min(int(k), n_items))
+        top = np.full((len(vectors), k), -1, dtype=np.int64)
+        top_scores = np.full((len(vectors), k), np.nan, dtype=np.float32)
+        if k == 0:
+            return top, top_scores
+        for s in range(0, len(vectors), chunk_rows):
+            scores = vectors[s:s + chunk_rows] @ items.T
+            if exclude is not None:
+                indptr, indices = exclude
+                bounds = indptr[s:s + len(scores) + 1]
+                rows = np.repeat(np.arange(len(scores)), np.diff(bounds))
+                scores[rows, indices[bounds[0]:bounds[-1]]] = -np.inf
+            idx = np.argpartition(scores, -k, axis=1)[:, -k:] if k < n_items else np.tile(np.arange(n_items), (len(scores), 1))
+            part = np.take_along_axis(scores, idx, axis=1)
+            order = np.argsort(-part, axis=1, kind="stable")
+            part = np.take_along_axis(part, order, axis=1)
+            top[s:s + chunk_rows] = np.where(np.isneginf(part), -1, np.take_along_axis(idx, order, axis=1))
+            top_scores[s:s + chunk_rows] = part
+        return top, top_scores
+
+    def recommend_batch(self, user_ids, k: int = 5, chunk_rows: int = 4096):
+        """
+        Top-k catalog positions and scores for many users at once: [n, k] arrays, position -1 / score nan for
+        unknown users. Scores come from one factor matmul per chunk of users.
+        """
+        ui = np.fromiter((self.user_index.get(u, -1) for u in user_ids), dtype=np.int64, count=len(user_ids))
+        known = np.flatnonzero(ui >= 0)
+        top_known, scores_known = self.top_k(self.user_vectors(ui[known]), k, chunk_rows)
+        top = np.full((len(ui), top_known.shape[1]), -1, dtype=np.int64)
+        top_scores = np.full(top.shape, np.nan, dtype=np.float32)
+        top[known], top_scores[known] = top_known, scores_known
+        return top, top_scores
+
+    def fold_in_user(self, item_ids, strengths=None) -> np.ndarray | None:
+        """
+        Factor vector for a user from a few interactions (unknown items are ignored), without retraining.
+        """
+        strengths = [1.0] * len(item_ids) if strengths is None else strengths
+        pairs = [(self.item_index[str(p)], float(w)) for p, w in zip(item_ids, strengths) if str(p) in self.item_index]
+        if not pairs:
+            return None
+        idx, conf = zip(*pairs)
+        return fold_in(self.item_matrix(), idx, conf, self.reg, self._item_gram())
+
+    def add_users(self, user_ids, vectors: np.ndarray):
+        """
+        Overwrite factors of known users and append new ones.
+        """
+        vectors, scales = quantize_rows(vectors, getattr(self, "factor_dtype", "float32"))
+        pos = np.array([self.user_index.get(u, -1) for u in user_ids], dtype=np.int64)
+        self.user_factors[pos[pos >= 0]] = vectors[pos >= 0]
+        new = np.flatnonzero(pos < 0)
+        for j, i in enumerate(new):
+            self.user_index[user_ids[i]] = len(self.user_factors) + j
+        self.user_factors = np.vstack([self.user_factors, vectors[new]])
+        if scales is not None:
+            self.user_scales[pos[pos >= 0]] = scales[pos >= 0]
+            self.user_scales = np.concatenate([self.user_scales, scales[new]])
+
+    def add_items(self, item_ids, vectors: np.ndarray):
+        """
+        Overwrite factors of known items and append new ones (extends the catalog).
+        """
+        vectors, scales = quantize_rows(vectors, getattr(self, "factor_dtype", "float32"))
+        pos = np.array([self.item_index.get(p, -1) for p in item_ids], dtype=np.int64)
+        self.item_factors[pos[pos >= 0]] = vectors[pos >= 0]
+        new = np.flatnonzero(pos < 0)
+        for j, i in enumerate(new):
+            self.item_index[item_ids[i]] = len(self.item_factors) + j
+            self.rev_item_index[len(self.item_factors) + j] = item_ids[i]
+        self.item_factors = np.vstack([self.item_factors, vectors[new]])
+        if scales is not None:
+            self.item_scales[pos[pos >= 0]] = scales[pos >= 0]
+            self.item_scales = np.concatenate([self.item_scales, scales[new]])
+        self.item_ids = np.array([self.rev_item_index[i] for i in range(len(self.item_index))], dtype=object)
+        self._item_yty = self._item_f32 = None
 
     def predict(self, context, model_input):
         """
         model_input: DataFrame with columns:
           - customer_id (str/int)
           - k (int, optional; default 5)
+          - recent_items (list of product_id, optional): folded in on the fly for users the model does not know
+          - recent_strengths (list of float, optional; default 1.0 each)
         Returns: list[dict] one row per input: {"customer_id":..., "rec_list":[{"product_id":..., "score":...}, ...]}
         """
-        results = []
-        for _, row in model_input.iterrows():
-            user_id = row.get("customer_id")
-            k = int(row.get("k", 5))
-            ui = self.user_index.get(user_id)
-            if ui is None:
-                results.append({"customer_id": user_id, "rec_list": []})
+        user_ids = model_input["customer_id"].tolist()
+        ks = model_input["k"].fillna(5).astype(int).to_numpy() if "k" in model_input else np.full(len(user_ids), 5)
+        recent = model_input["recent_items"].tolist() if "recent_items" in model_input else [None] * len(user_ids)
+        strengths = model_input["recent_strengths"].tolist() if "recent_strengths" in model_input else [None] * len(user_ids)
+        results = [None] * len(user_ids)
+
+        def emit(i, items, scores):
+            recs = [{"product_id": str(self.item_ids[j]), "score": float(sc)} for j, sc in zip(items, scores) if j >= 0]
+            results[i] = {"customer_id": user_ids[i], "rec_list": recs}
+
+        # one vectorized pass per distinct k (requests almost always share it)
+        for k in np.unique(ks):
+            pos = np.flatnonzero(ks == k)
+            top, top_scores = self.recommend_batch([user_ids[i] for i in pos], int(k))
+            for i, items, scores in zip(pos, top, top_scores):
+                emit(i, items, scores)
+        # cold users with a few interactions: closed-form fold-in against the item factors
+        for i, uid in enumerate(user_ids):
+            if uid in self.user_index or not isinstance(recent[i], (list, tuple, np.ndarray)) or len(recent[i]) == 0:
                 continue
-            # score all items: user_factors[ui] dot item_factors.T
-            scores = self.item_factors @ self.user_factors[ui]
-            # top-k indices
-            idx = np.argpartition(scores, -k)[-k:]
-            top_sorted = idx[np.argsort(scores[idx])[::-1]]
-            recs = [{"product_id": str(self.rev_item_index[i]), "score": float(scores[i])} for i in top_sorted]
-            results.append({"customer_id": user_id, "rec_list": recs})
+            vec = self.fold_in_user(recent[i], strengths[i] if isinstance(strengths[i], (list, tuple, np.ndarray)) else None)
+            if vec is not None:
+                top, top_scores = self.top_k(vec[None, :], int(ks[i]))
+                emit(i, top[0], top_scores[0])
         return results
 
 
-def train_implicit_als(ui_path: str, factors: int = 64, reg: float = 1e-2, iterations: int = 20):
+def fit_als(ui, factors: int = 64, reg: float = 1e-2, iterations: int = 20,
+            factor_dtype: str = "float32") -> ALSRecommender:
     """
-    ui_path: path to user-item interactions parquet with columns [customer_id, product_id, strength]
+    ALSRecommender fitted on `ui` (DataFrame [customer_id, product_id, strength]), factors stored as `factor_dtype`.
     """
-    mlflow.set_tracking_uri(os.environ.get("MLFLOW_TRACKING_URI", "http://mlflow:5000"))
-    mlflow.set_experiment("recommender_als_experiment")
+    from scipy.sparse import coo_matrix
+    from implicit.als import AlternatingLeastSquares
 
-    ui = pd.read_parquet(ui_path)
     users = ui["customer_id"].astype(str).unique().tolist()
     items = ui["product_id"].astype(str).unique().tolist()
     user_index = {u: i for i, u in enumerate(users)}
@@ -70,18 +205,50 @@ def train_implicit_als(ui_path: str, factors: int = 64, reg: float = 1e-2, itera
     user_factors_wrapped = item_factors
     item_factors_wrapped = user_factors
 
-    class ALSWrapper(mlflow.pyfunc.PythonModel):
-        def load_context(self, context):
-            pass
+    return ALSRecommender(user_factors_wrapped, item_factors_wrapped, user_index, item_index, reg=reg,
+                          factor_dtype=factor_dtype)
+
+
+def train_implicit_als(ui_path, factors: int = 64, reg: float = 1e-2, iterations: int = 20, holdout=None,
+                       holdout_train=None, holdout_cutoff=None, factor_dtype: str | None = None):
+    """
+    ui_path: user-item interactions (parquet path, DataFrame or pyarrow.Table) with columns [customer_id, product_id, strength]
+    holdout / holdout_train: interactions after / before `holdout_cutoff` (same columns). When given, a separate model
+    is fitted on `holdout_train` only and its precision / recall / MAP / NDCG @k against `holdout`
+    (src/recommender/evaluate.py) are logged to a nested `als_holdout_eval` run. The registered model is always
+    fitted on all of `ui_path`.
+    factor_dtype: float32 | float16 | int8 storage of the logged factors (default ALS_FACTOR_DTYPE); the holdout
+    metrics are computed on the stored factors
+    """
+    factor_dtype = factor_dtype or ALS_FACTOR_DTYPE
+    if (holdout is None) != (holdout_train is None):
+        raise ValueError("holdout and holdout_train must be given together")
+    configure("recommender_als_experiment")
 
-        def predict(self, context, model_input):
-            recommender = ALSRecommender(user_factors_wrapped, item_factors_wrapped, user_index, item_index)
-            return recommender.predict(context, model_input)
+    ui = as_frame(ui_path)
+    params = {"factors": factors, "reg": reg, "iterations": iterations, "factor_dtype": factor_dtype}
+    # logged directly (not via a closure) so consumers can unwrap it and call recommend_batch
+    recommender = fit_als(ui, factors, reg, iterations, factor_dtype)
 
     with mlflow.start_run(run_name=f"als_f{factors}_it{iterations}"):
         artifacts = {}
+        mlflow.log_params({"factor_dtype": factor_dtype})
+        mlflow.log_metrics({"factor_mb": sum(a.nbytes for a in (recommender.user_factors, recommender.item_factors,
+                                                               recommender.user_scales, recommender.item_scales)
+                                             if a is not None) / 2**20})
+        if holdout is not None:
+            from src.recommender.evaluate import evaluate_als
+            train_ui = as_frame(holdout_train)
+            evaluated = fit_als(train_ui, factors, reg, iterations, factor_dtype)
+            metrics = evaluate_als(evaluated, train_ui, as_frame(holdout))
+            del evaluated
+            with mlflow.start_run(run_name="als_holdout_eval", nested=True) as eval_run:
+                mlflow.log_params({**params, "holdout_cutoff": str(holdout_cutoff)})
+                mlflow.log_metrics(metrics)
+            mlflow.set_tag("holdout_eval_run_id", eval_run.info.run_id)
+            print(f"[als] holdout (model fitted before {holdout_cutoff}): {metrics}")
         mlflow.pyfunc.log_model(
             artifact_path="model",
-            python_model=ALSWrapper(),
+            python_model=recommender,
             registered_model_name="recommender_als_model",
         )
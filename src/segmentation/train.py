@@ -1,19 +1,24 @@
-import os
 import mlflow, mlflow.sklearn
 import pandas as pd
 from sklearn.preprocessing import StandardScaler
 from sklearn.cluster import KMeans
+from src.common.schemas import SEGMENTATION_FEATURES
+from src.common.tuning import tune_model
+from src.common.tables import as_frame
+from src.common.mlflow_client import configure
 
-def train_kmeans(feats_path: str, k: int = 6):
-    mlflow.set_tracking_uri(os.environ.get("MLFLOW_TRACKING_URI", "http://mlflow:5000"))
-    mlflow.set_experiment("segmentation_experiment")
+def train_kmeans(feats_path, k: int = 6, tune: bool = False):
+    configure("segmentation_experiment")
 
-    df = pd.read_parquet(feats_path)
-    X = df[["recency_days","tx_count","monetary","avg_discount","avg_qty","age","loyalty_level"]].fillna(0.0)
+    # feats_path: parquet path, DataFrame or pyarrow.Table
+    df = as_frame(feats_path)
+    X = df[SEGMENTATION_FEATURES].fillna(0.0)
     scaler = StandardScaler()
     Xs = scaler.fit_transform(X)
 
-    with mlflow.start_run(run_name=f"kmeans_k={k}"):
+    with mlflow.start_run(run_name="kmeans_tuned" if tune else f"kmeans_k={k}"):
+        if tune:
+            k = int(tune_model("segmentation", KMeans, Xs, metric="silhouette").get("n_clusters", k))
         km = KMeans(n_clusters=k, random_state=42, n_init="auto")
         labels = km.fit_predict(Xs)
 
@@ -1,31 +1,74 @@
-import os
+import time
 import mlflow, mlflow.pyfunc
+import numpy as np
 import pandas as pd
 from sklearn.preprocessing import StandardScaler
 from sklearn.cluster import KMeans
+from src.common.schemas import SEGMENTATION_FEATURES
+from src.common.mlflow_client import configure, resolve
+from src.common.tables import as_frame
 
 class SegmentationModel(mlflow.pyfunc.PythonModel):
-    def __init__(self, scaler, kmeans, feature_cols):
-        self.scaler = scaler
-        self.kmeans = kmeans
-        self.feature_cols = feature_cols
+    """
+    Nearest-centroid assignment on standardized features, stored as raw arrays (mean, scale, centers).
+    The scaler is folded into the distance weights, so assignment is one matmul + argmin on the raw features.
+    """
+    SHARED_ARRAYS = ("mean", "scale", "centers", "_W", "_b")   # see src/common/shared_arrays.py
+
+    def __init__(self, mean, scale, centers, feature_cols):
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.centers = np.asarray(centers, dtype=np.float64)
+        self.feature_cols = list(feature_cols)
+        self._fold()
+
+    @classmethod
+    def from_sklearn(cls, scaler, kmeans, feature_cols):
+        return cls(scaler.mean_, scaler.scale_, kmeans.cluster_centers_, feature_cols)
+
+    def _fold(self):
+        # argmin_k |(x - mean)/scale - c_k|^2 = argmin_k (x @ W + b)_k with W = -2 (C/scale)^T, b = |C|^2 + 2 C.(mean/scale)
+        c_over_scale = self.centers / self.scale
+        self._W = np.ascontiguousarray(-2.0 * c_over_scale.T)
+        self._b = (self.centers ** 2).sum(axis=1) + 2.0 * c_over_scale @ self.mean
+
+    def __getstate__(self):
+        return {"mean": self.mean, "scale": self.scale, "centers": self.centers, "feature_cols": self.feature_cols}
+
+    def __setstate__(self, state):
+        if "kmeans" in state:
+            # models logged before the raw-array layout pickled the sklearn scaler + KMeans
+            state = {"mean": state["scaler"].mean_, "scale": state["scaler"].scale_,
+                     "centers": state["kmeans"].cluster_centers_, "feature_cols": state["feature_cols"]}
+        self.__init__(state["mean"], state["scale"], state["centers"], state["feature_cols"])
+
+    def assign(self, X: np.ndarray) -> np.ndarray:
+        """
+        Cluster ids for a [n, n_features] array in feature_cols order; NaN counts as 0 like the training fillna.
+        """
+        X = np.asarray(X, dtype=np.float64)
+        if np.isnan(X).any():
+            X = np.nan_to_num(X, nan=0.0)
+        return np.argmin(X @ self._W + self._b, axis=1)
 
     def predict(self, context, model_input):
         """
-        model_input: DataFrame with features matching self.feature_cols
+        model_input: DataFrame with features matching self.feature_cols (or an array in that column order)
         Returns: list of cluster_id integers
         """
-        X = model_input[self.feature_cols].fillna(0.0)
-        Xs = self.scaler.transform(X)
-        labels = self.kmeans.predict(Xs)
-        return labels.tolist()
+        if isinstance(model_input, pd.DataFrame):
+            cols = list(model_input.columns)
+            X = model_input.to_numpy(dtype=np.float64) if cols == self.feature_cols else \
+                model_input.reindex(columns=self.feature_cols).to_numpy(dtype=np.float64)
+        else:
+            X = model_input
+        return self.assign(X).tolist()
 
-def train_segmentation_pyfunc(feats_path: str, k: int = 6):
-    mlflow.set_tracking_uri(os.environ.get("MLFLOW_TRACKING_URI", "http://mlflow:5000"))
-    mlflow.set_experiment("segmentation_experiment")
+def train_segmentation_pyfunc(feats_path, k: int = 6):
+    configure("segmentation_experiment")
 
-    df = pd.read_parquet(feats_path)
-    feature_cols = ["recency_days","tx_count","monetary","avg_discount","avg_qty","age","loyalty_level"]
+    df = as_frame(feats_path)
+    feature_cols = SEGMENTATION_FEATURES
     X = df[feature_cols].fillna(0.0)
 
     scaler = StandardScaler().fit(X)
@@ -36,6 +79,106 @@ def train_segmentation_pyfunc(feats_path: str, k: int = 6):
         mlflow.log_params({"k": k})
         mlflow.pyfunc.log_model(
             artifact_path="model",
-            python_model=SegmentationModel(scaler, km, feature_cols),
+            python_model=SegmentationModel.from_sklearn(scaler, km, feature_cols),
             registered_model_name="segmentation_model"
         )
+
+
+# --- mini-batch training streamed from the (optionally partitioned) gold table ---
+
+def iter_feature_batches(feats_path: str, feature_cols: list[str], batch_size: int = 65_536):
+    """
+    Yield float64 [n, n_features] blocks from a parquet file or partitioned directory without loading it whole.
+    """
+    import pyarrow.dataset as ds
+    dataset = ds.dataset(feats_path, format="parquet")
+    # minimal readahead: memory stays at about one row group + one batch
+    for batch in dataset.to_batches(columns=feature_cols, batch_size=batch_size, batch_readahead=1, fragment_readahead=1):
+        if batch.num_rows == 0:
+            continue
+        X = np.column_stack([batch.column(c).to_numpy(zero_copy_only=False) for c in feature_cols]).astype(np.float64)
+        yield np.nan_to_num(X, nan=0.0)
+
+
+def streaming_scaler(feats_path: str, feature_cols: list[str], batch_size: int = 65_536):
+    """
+    One pass of merged per-batch moments -> (mean, scale, n_rows), matching StandardScaler (population std).
+    """
+    n, mean, m2 = 0, np.zeros(len(feature_cols)), np.zeros(len(feature_cols))
+    for X in iter_feature_batches(feats_path, feature_cols, batch_size):
+        nb, mb = len(X), X.mean(axis=0)
+        m2b = ((X - mb) ** 2).sum(axis=0)
+        delta = mb - mean
+        tot = n + nb
+        mean = mean + delta * nb / tot
+        m2 = m2 + m2b + delta ** 2 * n * nb / tot
+        n = tot
+    scale = np.sqrt(m2 / max(n, 1))
+    scale[scale == 0.0] = 1.0
+    return mean, scale, n
+
+
+def production_centroids(name: str = "segmentation_model"):
+    """
+    (mean, scale, centers) of the current Production segmentation model, or None.
+    """
+    try:
+        ref = resolve(name)
+        if ref is None:
+            raise LookupError(f"no Production version of {name}")
+        inner = mlflow.pyfunc.load_model(ref.uri).unwrap_python_model()
+        return inner.mean, inner.scale, inner.centers
+    except Exception as ex:
+        print(f"[segmentation] no Production centroids to warm-start from: {ex}")
+        return None
+
+
+def train_segmentation_minibatch(feats_path: str, k: int = 6, batch_size: int = 65_536, epochs: int = 3,
+                                 warm_start: bool = True, register: bool = True):
+    """
+    MiniBatchKMeans over streamed batches of the gold table, initialised from the Production centroids
+    (mapped into the refreshed scaler's space) when their k matches. Memory is bounded by `batch_size`.
+    """
+    from sklearn.cluster import MiniBatchKMeans
+    configure("segmentation_experiment")
+    feature_cols = SEGMENTATION_FEATURES
+
+    t0 = time.perf_counter()
+    mean, scale, n_rows = streaming_scaler(feats_path, feature_cols, batch_size)
+    prev = production_centroids() if warm_start else None
+    if prev is not None and len(prev[2]) == k:
+        old_mean, old_scale, old_centers = prev
+        init = ((old_centers * old_scale + old_mean) - mean) / scale
+        init_source = "production"
+    else:
+        # cold start: full KMeans on the first batch only (bounded cost), refined by the streamed updates
+        first = next(iter_feature_batches(feats_path, feature_cols, batch_size))
+        init = KMeans(n_clusters=k, random_state=42, n_init="auto").fit((first - mean) / scale).cluster_centers_
+        init_source = "first_batch"
+
+    # one centre update per streamed block (partial_fit treats each call as one mini-batch)
+    mbk = MiniBatchKMeans(n_clusters=k, init=init, n_init=1, batch_size=batch_size, random_state=42)
+    for _ in range(epochs):
+        for X in iter_feature_batches(feats_path, feature_cols, batch_size):
+            mbk.partial_fit((X - mean) / scale)
+    model = SegmentationModel(mean, scale, mbk.cluster_centers_, feature_cols)
+    fit_s = time.perf_counter() - t0
+
+    # inertia over the full table, streamed, for comparison with full-batch KMeans runs
+    inertia = 0.0
+    for X in iter_feature_batches(feats_path, feature_cols, batch_size):
+        Xs = (X - mean) / scale
+        inertia += float(((Xs - model.centers[model.assign(X)]) ** 2).sum())
+
+    if register:
+        with mlflow.start_run(run_name=f"minibatch_kmeans_k={k}"):
+            mlflow.log_params({"k": k, "mode": "minibatch", "batch_size": batch_size, "epochs": epochs,
+                               "init": init_source})
+            mlflow.log_metrics({"fit_seconds": fit_s, "inertia": inertia, "n_rows": n_rows})
+            mlflow.pyfunc.log_model(
+                artifact_path="model",
+                python_model=model,
+                registered_model_name="segmentation_model"
+            )
+    print(f"[segmentation] minibatch k={k} rows={n_rows} init={init_source} fit={fit_s:.2f}s inertia={inertia:.1f}")
+    return model
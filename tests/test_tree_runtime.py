@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.common.tree_runtime import FlatEnsemble
+
+ensemble = pytest.importorskip("sklearn.ensemble")
+
+
+def _data(n=400, seed=0):
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame(rng.standard_normal((n, 5)), columns=[f"f{i}" for i in range(5)])
+    y = X["f0"] * 2 + X["f1"] ** 2 + 0.1 * rng.standard_normal(n)
+    return X, y
+
+
+@pytest.mark.parametrize("cls", ["RandomForestRegressor", "ExtraTreesRegressor", "GradientBoostingRegressor"])
+def test_regressor_matches_sklearn(cls):
+    X, y = _data()
+    model = getattr(ensemble, cls)(n_estimators=20, max_depth=6, random_state=0).fit(X, y)
+    flat = FlatEnsemble.from_sklearn(model)
+    np.testing.assert_allclose(flat.predict(X), model.predict(X), rtol=1e-9, atol=1e-9)
+    row = X.iloc[0].to_dict()
+    np.testing.assert_allclose(flat.predict(flat.row(row)), model.predict(X.iloc[[0]]), rtol=1e-9, atol=1e-9)
+
+
+@pytest.mark.parametrize("cls", ["RandomForestClassifier", "ExtraTreesClassifier"])
+def test_classifier_matches_sklearn(cls, tmp_path):
+    X, y = _data()
+    labels = (y > y.median()).astype(int)
+    model = getattr(ensemble, cls)(n_estimators=20, max_depth=6, random_state=0).fit(X, labels)
+    # round-trip through save/load (mmap), as the API and shared-memory paths load it
+    flat = FlatEnsemble.load(FlatEnsemble.from_sklearn(model).save(tmp_path / "flat"), mmap_mode="r")
+    np.testing.assert_allclose(flat.predict_proba(X), model.predict_proba(X), rtol=1e-9, atol=1e-9)
+    np.testing.assert_array_equal(flat.predict(X), model.predict(X))
+    np.testing.assert_allclose(flat.positive_proba(X), model.predict_proba(X)[:, 1], rtol=1e-9, atol=1e-9)
+    assert flat.row(X.iloc[0].to_dict()).shape == (1, X.shape[1])
+
+
+def test_missing_values_score_as_zero():
+    X, y = _data()
+    model = ensemble.RandomForestRegressor(n_estimators=20, max_depth=6, random_state=0).fit(X, y)
+    flat = FlatEnsemble.from_sklearn(model)
+    missing = X.iloc[:50].copy()
+    missing.iloc[::2, 0] = np.nan
+    expected = model.predict(missing.fillna(0.0))
+    np.testing.assert_allclose(flat.predict(missing), expected, rtol=1e-9, atol=1e-9)
+    np.testing.assert_allclose(flat.predict(missing.to_numpy()), expected, rtol=1e-9, atol=1e-9)
+    row = {**X.iloc[0].to_dict(), "f0": None}
+    np.testing.assert_allclose(flat.predict(flat.row(row)), model.predict(X.iloc[[0]].assign(f0=0.0)),
+                               rtol=1e-9, atol=1e-9)